@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""Compare two benchmark runs.
+
+Prints the ratio of new to old times for each benchmark case and stage
+found in both runs, and exits with status 1 if any case is slower than the
+threshold. Run from the repository root:
+
+    python -m benchmarks.compare benchmark-old.json benchmark-new.json
+"""
+
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    # Dict of (key, flavour, n_points, n_columns, stage) to time
+    with open(path) as f:
+        results = json.load(f)["results"]
+
+    return {
+        (r["key"], r["flavour"], r["n_points"], r["n_columns"], r["stage"]): r[
+            "time"
+        ]
+        for r in results
+        if "error" not in r
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="new / old time ratio above which a case is a regression",
+    )
+    args = parser.parse_args(argv)
+
+    old = load(args.old)
+    new = load(args.new)
+
+    regressions = 0
+    for case in sorted(old.keys() & new.keys()):
+        ratio = new[case] / old[case]
+        flag = ""
+        if ratio > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        key, flavour, n_points, n_columns, stage = case
+        print(
+            f"{key:12} {flavour:8} {n_points:>5}x{n_columns:<5} {stage:17}"
+            f"{old[case]:10.4f}s {new[case]:10.4f}s {ratio:7.2f}x{flag}"
+        )
+
+    print(f"{regressions} regressions above {args.threshold:.2f}x")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+"""Benchmark suite.
+
+Times `Fitter.run_scipy`, `Fitter.statistics` and `Fitter.calc_monte_carlo`
+for every fitting function accepted by `functions.construct` and each of
+its flavours, over a grid of titration point and y column counts. Data are
+generated from the model functions with known parameters, see
+`bindfit.synthetic`, and the error of the recovered parameters recorded.
+
+Results are written as JSON, see `benchmarks/compare.py` to compare two
+runs. Run from the repository root:
+
+    python -m benchmarks.run
+    python -m benchmarks.run --keys nmr1to2 uv1to2 --points 10 100 --mc-iter 0
+"""
+
+
+import argparse
+import copy
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import scipy
+
+from bindfit import fitter, functions, synthetic
+
+
+# Species of the general stoichiometry models benchmarked, HG and HG2
+GENERIC_SPECIES = [(1, 1), (1, 2)]
+
+# True parameters of the general stoichiometry models, the overall
+# formation constants of GENERIC_SPECIES
+GENERIC_PARAMS = {
+    "b11": {"init": 1e3, "bounds": {"min": 0.0, "max": None}},
+    "b12": {"init": 1e5, "bounds": {"min": 0.0, "max": None}},
+}
+
+# Keys of functions.construct not benchmarked: placeholders without a
+# fitting function, and the inhibitor response test function, whose
+# objective doesn't return the fit coefficients Fitter expects
+SKIPPED_KEYS = ["nmrdata", "uvdata", "inhibitor"]
+
+
+def cases():
+    """Yield (key, flavour, params, species) of every benchmarked function.
+
+    `params` holds the true parameters of the generated data as initial
+    values.
+    """
+    for kind in ("nmr", "uv"):
+        for model, flavours in fitter.MODEL_FLAVOURS.items():
+            for flavour in flavours:
+                yield (
+                    kind + model,
+                    flavour,
+                    fitter.model_params(model, flavour),
+                    None,
+                )
+        yield kind + "generic", "none", GENERIC_PARAMS, GENERIC_SPECIES
+
+
+def timed(func, repeat):
+    # Minimum time of repeated calls of func(), and its last return value
+    times = []
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        value = func()
+        times.append(time.perf_counter() - tic)
+    return min(times), value
+
+
+def benchmark(key, flavour, params, species, n_points, n_columns, args):
+    """Benchmark one function and dataset size.
+
+    Returns
+    -------
+    records : `list`
+        One dict per timed stage.
+    """
+    params_true = np.array([p["init"] for _, p in sorted(params.items())])
+
+    def make_fitter():
+        # Fresh function and Fitter, so no state is shared between repeats
+        function = functions.construct(key, flavour=flavour, species=species)
+        return fitter.Fitter.from_arrays(xdata, ydata, function)
+
+    xdata, ydata = synthetic.dataset(
+        key,
+        {name: p["init"] for name, p in params.items()},
+        n_points=n_points,
+        n_columns=n_columns,
+        flavour=flavour,
+        species=species,
+        seed=args.seed,
+    )
+
+    # Start away from the true parameters
+    params_init = copy.deepcopy(params)
+    for p in params_init.values():
+        p["init"] = p["init"] * 1.5 if p["init"] else 1.0
+
+    case = {
+        "key": key,
+        "flavour": flavour,
+        "n_points": n_points,
+        "n_columns": n_columns,
+    }
+
+    def run():
+        f = make_fitter()
+        f.run_scipy(copy.deepcopy(params_init), method=args.method)
+        return f
+
+    t, f = timed(run, args.repeat)
+    records = [
+        dict(
+            case,
+            stage="run_scipy",
+            time=t,
+            nfev=f.optimizer["nfev"],
+            nit=f.optimizer["nit"],
+            success=bool(f.optimizer["success"]),
+            ssr=float(f.result.ssr),
+            params_true=params_true.tolist(),
+            params_fit=np.asarray(f._params_raw).tolist(),
+            # Relative error of the recovered parameters
+            params_error=(
+                np.abs(f._params_raw / params_true - 1)
+                if all(params_true)
+                else np.abs(f._params_raw - params_true)
+            ).tolist(),
+        )
+    ]
+
+    t, _ = timed(
+        lambda: f.statistics(
+            f._params_raw, f.fit, f.coeffs_raw, f.residuals, xdata=f.xdata
+        ),
+        args.repeat,
+    )
+    records.append(dict(case, stage="statistics", time=t))
+
+    if args.mc_iter:
+        base = copy.deepcopy(f.params)
+
+        def monte_carlo():
+            f.params = copy.deepcopy(base)
+            return f.calc_monte_carlo(
+                args.mc_iter,
+                [0.01, 0.01],
+                0.005,
+                method=args.method,
+                seed=args.seed,
+            )
+
+        t, _ = timed(monte_carlo, args.repeat)
+        records.append(
+            dict(case, stage="calc_monte_carlo", time=t, n_iter=args.mc_iter)
+        )
+
+    return records
+
+
+def metadata():
+    # Machine and code version the benchmarks were run on
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--keys",
+        nargs="+",
+        help="functions.construct keys to benchmark, defaults to all",
+    )
+    parser.add_argument(
+        "--points",
+        nargs="+",
+        type=int,
+        default=[10, 100, 1000],
+        help="numbers of titration points",
+    )
+    parser.add_argument(
+        "--columns",
+        nargs="+",
+        type=int,
+        default=[1, 100, 2000],
+        help="numbers of y columns",
+    )
+    parser.add_argument(
+        "--mc-iter",
+        type=int,
+        default=10,
+        help="Monte Carlo iterations, 0 to skip",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--method", default="Nelder-Mead")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output",
+        help="output JSON file, defaults to benchmark-<commit>.json",
+    )
+    args = parser.parse_args(argv)
+
+    meta = metadata()
+    meta["args"] = vars(args)
+    records = []
+
+    for key, flavour, params, species in cases():
+        if args.keys and key not in args.keys:
+            continue
+
+        for n_points in args.points:
+            for n_columns in args.columns:
+                label = f"{key} {flavour} {n_points}x{n_columns}"
+                try:
+                    r = benchmark(
+                        key,
+                        flavour,
+                        params,
+                        species,
+                        n_points,
+                        n_columns,
+                        args,
+                    )
+                except Exception as e:
+                    # Record failures, and carry on with the other cases
+                    r = [
+                        {
+                            "key": key,
+                            "flavour": flavour,
+                            "n_points": n_points,
+                            "n_columns": n_columns,
+                            "error": repr(e),
+                        }
+                    ]
+                    print(f"{label}: {e!r}", file=sys.stderr)
+                else:
+                    print(
+                        label
+                        + ": "
+                        + ", ".join(
+                            f"{s['stage']} {s['time']:.4f}s" for s in r
+                        )
+                    )
+                records.extend(r)
+
+    output = args.output or "benchmark-{}.json".format(
+        (meta["commit"] or "unknown")[:7]
+    )
+    with open(output, "w") as f:
+        json.dump(
+            {"meta": meta, "skipped": SKIPPED_KEYS, "results": records},
+            f,
+            indent=1,
+        )
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
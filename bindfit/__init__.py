@@ -1,3 +1,25 @@
-__all__ = ["fitter", "functions", "helpers"]
+import importlib
 
-from . import fitter, functions, helpers
+__all__ = [
+    "batch",
+    "cache",
+    "fitter",
+    "functions",
+    "helpers",
+    "instrument",
+    "result",
+    "solvers",
+    "synthetic",
+]
+
+
+def __getattr__(name):
+    # Import submodules on first access, so importing the package alone
+    # doesn't load numpy, scipy or pandas
+    if name in __all__:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,161 @@
+"""Batched nonlinear least squares.
+
+Levenberg-Marquardt minimisation of many independent least squares problems
+with the same number of parameters at once. Every iteration evaluates the
+residuals of all unconverged problems in a single call, so the Python
+overhead of the optimiser is shared across the batch.
+"""
+
+
+import numpy as np
+
+
+def least_squares(
+    fun,
+    p0,
+    bounds=None,
+    max_iter=200,
+    ftol=1e-12,
+    xtol=1e-12,
+):
+    """Minimise the sum of squares of a batch of residual functions.
+
+    Each problem is solved independently with its own Levenberg-Marquardt
+    damping and convergence test. Jacobians are calculated by forward finite
+    differences, with one batched residual evaluation per parameter, and
+    steps are projected onto the parameter bounds.
+
+    Parameters
+    ----------
+    fun : `function`
+        Residual function `fun(params, index)`, returning the B' x R array of
+        residuals of the problems `index` (length B' integer array) at the
+        B' x P parameters `params`.
+    p0 : `ndarray`
+        B x P array of initial parameters, one row per problem.
+    bounds : `tuple`, optional
+        (min, max) parameter bounds, each broadcastable to B x P. None
+        entries are unbounded.
+    max_iter : `int`, optional
+        Maximum number of iterations per problem.
+    ftol : `float`, optional
+        Relative reduction in the sum of squares at which a problem is
+        converged.
+    xtol : `float`, optional
+        Relative parameter step at which a problem is converged.
+
+    Returns
+    -------
+    p : `ndarray`
+        B x P array of optimised parameters.
+    cost : `ndarray`
+        Length B array of sums of squares of the residuals at p.
+    nit : `ndarray`
+        Length B array of iterations used by each problem.
+    """
+    p = np.array(p0, dtype=np.float64, ndmin=2)
+    n_batch, n_params = p.shape
+
+    if bounds is None:
+        bounds = (None, None)
+    lo, hi = (
+        np.broadcast_to(
+            np.array(b, dtype=np.float64) if b is not None else fill,
+            p.shape,
+        )
+        for b, fill in zip(bounds, (-np.inf, np.inf))
+    )
+    lo = np.where(np.isnan(lo), -np.inf, lo)
+    hi = np.where(np.isnan(hi), np.inf, hi)
+    p = np.clip(p, lo, hi)
+
+    index = np.arange(n_batch)
+    r = fun(p, index).reshape(n_batch, -1)
+    cost = np.square(r).sum(axis=1)
+
+    lam = np.full(n_batch, 1e-3)
+    nit = np.zeros(n_batch, dtype=int)
+    active = np.isfinite(cost)
+
+    # Jacobians are only recalculated after accepted steps
+    jac = np.empty(r.shape + (n_params,))
+    stale = np.ones(n_batch, dtype=bool)
+
+    for _ in range(max_iter):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+
+        update = idx[stale[idx]]
+        if update.size:
+            jac[update] = _jacobian(fun, p[update], r[update], update, hi)
+            stale[update] = False
+
+        j = jac[idx]
+        jtj = np.einsum("bri,brj->bij", j, j)
+        grad = np.einsum("bri,br->bi", j, r[idx])
+
+        # Marquardt scaling of the damping term by the diagonal of J'J
+        diag = np.diagonal(jtj, axis1=1, axis2=2)
+        diag = np.maximum(
+            diag,
+            np.finfo(np.float64).eps
+            * np.maximum(diag.max(axis=1, keepdims=True), 1.0),
+        )
+        step = -np.linalg.solve(
+            jtj + lam[idx, np.newaxis, np.newaxis] * _diag(diag),
+            grad[:, :, np.newaxis],
+        )[:, :, 0]
+
+        p_new = np.clip(p[idx] + step, lo[idx], hi[idx])
+        r_new = fun(p_new, idx).reshape(idx.size, -1)
+        cost_new = np.square(r_new).sum(axis=1)
+
+        nit[idx] += 1
+        accept = cost_new < cost[idx]
+
+        # Converged on a small relative decrease in SSR or a small step
+        small_step = np.all(
+            np.abs(p_new - p[idx]) <= xtol * (np.abs(p[idx]) + xtol), axis=1
+        )
+        small_decrease = cost[idx] - cost_new <= ftol * cost[idx]
+        done = (accept & small_decrease) | small_step | ~np.any(grad, axis=1)
+
+        a = idx[accept]
+        p[a] = p_new[accept]
+        r[a] = r_new[accept]
+        cost[a] = cost_new[accept]
+        stale[a] = True
+        lam[a] = np.maximum(lam[a] / 3, 1e-12)
+
+        reject = idx[~accept]
+        lam[reject] *= 4
+
+        # Stop problems that can no longer make progress
+        done |= lam[idx] > 1e16
+        active[idx[done]] = False
+
+    return p, cost, nit
+
+
+def _jacobian(fun, p, r, index, hi):
+    # Forward difference Jacobian of the residuals, B x R x P
+    jac = np.empty(r.shape + (p.shape[1],))
+    for i in range(p.shape[1]):
+        step = np.sqrt(np.finfo(np.float64).eps) * np.maximum(
+            np.abs(p[:, i]), 1.0
+        )
+        # Step backwards at upper bounds
+        step = np.where(p[:, i] + step > hi[index, i], -step, step)
+
+        p_shift = np.copy(p)
+        p_shift[:, i] += step
+        r_shift = fun(p_shift, index).reshape(r.shape)
+        jac[:, :, i] = (r_shift - r) / step[:, np.newaxis]
+
+    return jac
+
+
+def _diag(d):
+    # Stack of diagonal matrices from a B x P array
+    return d[:, :, np.newaxis] * np.eye(d.shape[1])
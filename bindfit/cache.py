@@ -0,0 +1,184 @@
+"""Content-addressed cache of fit results.
+
+Fit results are keyed by a stable hash of the input data arrays and every
+option that affects the fit, so identical fits submitted again are served
+from the cache instead of being recomputed. Results are held in a bounded
+in-memory LRU tier, optionally backed by an on-disk tier that persists
+between processes.
+"""
+
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def key(*parts):
+    """Calculate the cache key of a set of fit inputs.
+
+    Parameters
+    ----------
+    *parts
+        Input arrays and options. Arrays are hashed by content, dtype and
+        shape. Options may be nested dicts, lists and tuples of strings,
+        numbers, None and callables (identified by module, qualified name,
+        name and model coefficient names).
+
+    Returns
+    -------
+    key : `string`
+        Hex SHA-256 digest, stable between processes.
+    """
+    return hashlib.sha256(
+        json.dumps(_canonical(parts), sort_keys=True).encode()
+    ).hexdigest()
+
+
+def _canonical(obj):
+    # Convert fit inputs to a JSON serialisable form that identifies them
+    if isinstance(obj, np.ndarray):
+        obj = np.ascontiguousarray(obj)
+        return [
+            "ndarray",
+            obj.dtype.str,
+            obj.shape,
+            hashlib.sha256(obj.tobytes()).hexdigest(),
+        ]
+    elif isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    elif isinstance(obj, np.generic):
+        return obj.item()
+    elif callable(obj):
+        # Closures built by the same factory (e.g. functions.stoichiometry)
+        # share a qualified name, so their name and coefficients, which
+        # identify the model, are included
+        return [
+            "callable",
+            getattr(obj, "__module__", None),
+            getattr(obj, "__qualname__", type(obj).__name__),
+            getattr(obj, "__name__", None),
+            _canonical(getattr(obj, "coeffs", None)),
+        ]
+    else:
+        return obj
+
+
+class ResultCache:
+    """Cache of fit results dicts.
+
+    Parameters
+    ----------
+    maxsize : `int`, optional
+        Maximum number of results held in memory. Least recently used
+        results are evicted first.
+    path : `string`, optional
+        Directory for the on-disk tier. If None, results are only held in
+        memory.
+
+    Attributes
+    ----------
+    hits : `int`
+        Number of lookups served from the cache (either tier).
+    disk_hits : `int`
+        Number of lookups served from the on-disk tier.
+    misses : `int`
+        Number of lookups not found in the cache.
+    """
+
+    def __init__(self, maxsize=128, path=None):
+        self.maxsize = maxsize
+        self.path = path
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def __getstate__(self):
+        # Locks can't be pickled. Copies sent to other processes start with
+        # an empty in-memory tier, and share the on-disk tier.
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_memory"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._memory)
+
+    def get(self, key):
+        """Return a copy of the results cached under key, or None."""
+        with self._lock:
+            results = self._memory.get(key)
+            if results is not None:
+                self._memory.move_to_end(key)
+
+        if results is None and self.path is not None:
+            results = self._load(key)
+            if results is not None:
+                self._store(key, results)
+                with self._lock:
+                    self.disk_hits += 1
+
+        with self._lock:
+            if results is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        # Callers are free to modify the results they are given
+        return None if results is None else pickle.loads(results)
+
+    def put(self, key, results):
+        """Cache a copy of results under key."""
+        results = pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)
+        self._store(key, results)
+
+        if self.path is not None:
+            # Write then rename, so readers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=self.path)
+            with os.fdopen(fd, "wb") as f:
+                f.write(results)
+            os.replace(tmp, self._filename(key))
+
+    def clear(self):
+        """Empty the in-memory tier and reset the counters."""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def _store(self, key, results):
+        # Add pickled results to the in-memory tier, evicting the least
+        # recently used
+        with self._lock:
+            self._memory[key] = results
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def _load(self, key):
+        # Pickled results from the on-disk tier, or None
+        try:
+            with open(self._filename(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _filename(self, key):
+        return os.path.join(self.path, key + ".pkl")
@@ -1,15 +1,28 @@
+import contextlib
+import copy
+import functools
+import os
+import threading
 import time
-from itertools import product
 
-import pandas as pd
 import numpy as np
-import numpy.matlib as ml
 
-import scipy
-import scipy.optimize
-from scipy import stats
+from . import batch, cache, functions, helpers, instrument
+from .result import FitResult
 
-from . import helpers
+
+class FitCancelled(Exception):
+    """Raised from an optimiser callback to abandon a running fit."""
+
+
+def _result_property(name):
+    # Read only Fitter attribute from the last fit result, None before
+    # fitting
+    return property(
+        lambda self: (
+            None if self.result is None else getattr(self.result, name)
+        )
+    )
 
 
 class Fitter:
@@ -19,7 +32,8 @@ class Fitter:
     ----------
     data : pandas.DataFrame, MxN matrix
         Input data matrix with M columns of index variables (e.g. Host, Guest)
-        and N columns observed data variables
+        and N columns observed data variables. See `Fitter.from_arrays` to
+        fit data arrays instead.
     function : function
         The fitter function to use for optimisation
     normalise : boolean, optional
@@ -50,19 +64,47 @@ class Fitter:
         Whether to normalise the x data before fitting
     dilution_correction: boolean, optional
         Whether to apply dilution correction to the y data before fitting
+    svd_rank : int or "auto", optional
+        If set, optimise against the y data truncated to this many leading
+        singular components ("auto" to choose the rank from the singular
+        value spectrum). The data are never truncated below the number of
+        linear components of the model. Fit, residuals and coefficients are
+        calculated at full resolution from the optimised parameters.
+        Useful for separable models fitted to many y variables (e.g. UV-vis
+        spectra).
+    cache : cache.ResultCache, optional
+        If set, results of fits of the Fitter's own data are looked up in
+        and saved to this cache, keyed by the input data and all fit
+        options.
+    lean : boolean, optional
+        If True, fit results do not keep the fit curve and residuals, only
+        the parameters, coefficients, molefractions and statistics.
+    profiler : instrument.Profiler, optional
+        If set, fits record the time spent in each stage and in every
+        evaluation of the fitting function to this profiler, see
+        `fit_profile`.
     params : dict
         Dict of initial values for parameters passed to the fitting func
         See above for example format
+    result : FitResult
+        Populated after fitting, results of the last fit. The fit arrays
+        below are views of its array block.
     time : string
         Populated after fitting, total time taken to fit
     fit : array_like, MxN matrix
-        Fit curve matrix, same dimensions as ydata
+        Fit curve matrix, same dimensions as ydata (None if lean)
     residuals : array_like, MxN matrix
-        Observed data fit residuals matrix, same dimensions as ydata
+        Observed data fit residuals matrix, same dimensions as ydata (None
+        if lean)
     coeffs : array_like, (1:1 - 2|1:2 - 3)xM matrix
         Fit coefficients
     molefrac : array_like, (1:1 - 2|1:2 - 3)xN matrix
         Fit molefractions
+    covariance : array_like, PxP matrix
+        Covariance matrix of the optimised parameters, sorted by name
+    optimizer : dict
+        Optimiser function evaluation and iteration counts and convergence
+        status (nfev, nit, status, success, message)
     """
 
     # Dict mapping model function names to coefficient names
@@ -93,7 +135,41 @@ class Fitter:
         normalise=True,
         # Whether to apply dilution correction before fitting
         dilution_correction=False,
+        # Number of singular components of ydata to optimise against
+        svd_rank=None,
+        # Fit result cache
+        cache=None,
+        # Whether to drop the fit curve and residuals from results
+        lean=False,
+        # Fit stage profiler
+        profiler=None,
     ):
+        self.function = function
+
+        # Preprocessed y data and their Gram matrix factor, see _prepared
+        self._prep = None
+
+        # Fitter options
+        self.normalise = normalise
+        self.dilution_correction = dilution_correction
+        self.svd_rank = svd_rank
+        self.cache = cache
+        self.lean = lean
+        self.profiler = profiler
+
+        if data is None:
+            # Data arrays set by Fitter.from_arrays
+            self.data = None
+        else:
+            self._set_data(data)
+
+        # Populated on Fitter.run
+        self.result = None
+        self.params = params  # Initialise with optimised param results
+        # from previous run
+        # Used with post-fit Monte Carlo calculation
+
+    def _set_data(self, data):
         # Data in pandas DataFrame format, with x columns set as index
         self.data = data
 
@@ -101,37 +177,52 @@ class Fitter:
         # TODO: Ideally should modify other functions to use dataframe format
         # But this is the quickest solution for the moment
         # Bindfit expects each variable as row
-        # np.asarray(list()) required to convert index list of tuples to normal
-        # numpy matrix
         # xdata : array_like, 2xN matrix
         #     Host/Guest data matrix, one variable per row
         # ydata : array_like, MxN matrix
         #     Observed data matrix, one variable per row
-        self.xdata = np.transpose(np.asarray(list(data.index.to_numpy())))
-        self.ydata = np.transpose(data.to_numpy())
-
-        self.function = function
+        self._set_arrays(*_frame_arrays(data))
 
-        # Fitter options
-        self.normalise = normalise
-        self.dilution_correction = dilution_correction
+    def _set_arrays(self, xdata, ydata):
+        self.xdata = np.asarray(xdata, dtype=np.float64)
+        self.ydata = np.atleast_2d(np.asarray(ydata, dtype=np.float64))
 
         # Apply dilution correction
         # TODO: Does this belong here? Or should it only be applied temporarily
         # during the fit?
-        if dilution_correction:
+        if self.dilution_correction:
             self.ydata = helpers.dilute(self.xdata[0], self.ydata)
 
-        # Populated on Fitter.run
-        self._params_raw = None
-        self.params = params  # Initialise with optimised param results
-        # from previous run
-        # Used with post-fit Monte Carlo calculation
-        self.time = None
-        self.fit = None
-        self.residuals = None
-        self.coeffs = None
-        self.molefrac = None
+        # Results memoised for the previous data are no longer needed
+        if self.function is not None:
+            self.function.clear_memo()
+
+    @classmethod
+    def from_arrays(cls, xdata, ydata, function, **kwargs):
+        """Create a Fitter from data arrays instead of a DataFrame.
+
+        Fitting from arrays doesn't import pandas. Fit results tables are
+        labelled with integer positions instead of the DataFrame index and
+        columns.
+
+        Parameters
+        ----------
+        xdata : `ndarray`
+            2 x N array of Host and Guest concentrations.
+        ydata : `ndarray`
+            M x N array of observed data, one variable per row.
+        function : function
+            The fitter function to use for optimisation.
+        **kwargs
+            Fitter options, see `Fitter`.
+
+        Returns
+        -------
+        fitter : `Fitter`
+        """
+        fitter = cls(None, function, **kwargs)
+        fitter._set_arrays(xdata, ydata)
+        return fitter
 
     def _preprocess(self, ydata):
         # Preprocess data based on Fitter options
@@ -143,6 +234,22 @@ class Fitter:
 
         return d
 
+    def _prepared(self):
+        # Preprocessed y data and the factor of their Gram matrix (see
+        # helpers.gram_factor). Calculated once for the Fitter's data and
+        # options, and shared with shallow copies of the Fitter (see
+        # fit_all_models).
+        prep = self._prep
+        if (
+            prep is None
+            or prep[0] is not self.ydata
+            or prep[1] != (self.normalise)
+        ):
+            y = self._preprocess(self.ydata)
+            prep = (self.ydata, self.normalise, y, helpers.gram_factor(y))
+            self._prep = prep
+        return prep[2], prep[3]
+
     def _postprocess(self, ydata, yfit):
         # Postprocess fitted data based on Fitter options
         f = yfit
@@ -152,6 +259,20 @@ class Fitter:
 
         return f
 
+    def _compress(self, y, x, params):
+        # Truncate preprocessed data to its leading singular components for
+        # optimisation. Only applies to separable models, whose residuals are
+        # invariant to rotations of the y variables. Never truncated below
+        # the number of linear components of the model (design matrix rows
+        # at the given parameters).
+        if self.svd_rank is None or not self.function.separable:
+            return y
+
+        molefrac_raw, _ = self.function.design(np.asarray(params), x)
+        return helpers.compress(
+            y, self.svd_rank, min_rank=molefrac_raw.shape[0]
+        )
+
     def run_scipy(
         self,
         params_init,
@@ -159,6 +280,7 @@ class Fitter:
         xdata=None,
         ydata=None,
         method="Nelder-Mead",
+        callback=None,
     ):
         """Fit data given initial parameter guesses.
 
@@ -168,7 +290,7 @@ class Fitter:
             Initial parameter guesses for fitter.
         save : `boolean`
             If True, process and save optimisation results.
-            If False, return raw optimised params.
+            If False, return the `FitResult`.
         xdata : `ndarray`, optional
             Modified input array.
             (used with save=False for Monte Carlo error calculation)
@@ -177,10 +299,30 @@ class Fitter:
             (used with save=False for Monte Carlo error calculation)
         method : `string`, optional
             The fitting method to use.
+        callback : `function`, optional
+            Called by the optimiser after each iteration with the current
+            parameter array, as for scipy.optimize.minimize. Exceptions raised
+            from it abandon the fit. Fits with a callback bypass the result
+            cache.
         """
+        _check_params(self.function, params_init)
+
+        if (
+            self.cache is not None
+            and xdata is None
+            and ydata is None
+            and callback is None
+        ):
+            return self._run_cached(
+                self.run_scipy, params_init, save, method=method
+            )
+
         # Set input data
         x = self.xdata if xdata is None else xdata
-        y = self._preprocess(self.ydata if ydata is None else ydata)
+        if ydata is None:
+            y, gram_factor = self._prepared()
+        else:
+            y, gram_factor = self._preprocess(ydata), None
 
         # Sort parameter dict into ordered array of parameters and bounds
         p = []
@@ -189,17 +331,379 @@ class Fitter:
             p.append(value["init"])
             b.append([value["bounds"]["min"], value["bounds"]["max"]])
 
+        objective, args = self._objective(x, y, p, gram_factor=gram_factor)
+
+        import scipy.optimize
+
         # Run optimizer
-        tic = time.perf_counter()
-        result = scipy.optimize.minimize(
-            self.function.objective,
-            p,
-            bounds=b,
-            args=(x, y, True),
-            method=method if method else "Nelder-Mead",
-            tol=1e-18,
+        with self._instrument("minimize"):
+            tic = time.perf_counter()
+            # Objective looked up once instrumented, so profiled fits time
+            # every evaluation
+            result = scipy.optimize.minimize(
+                getattr(self.function, objective),
+                p,
+                bounds=b,
+                args=args,
+                method=method if method else "Nelder-Mead",
+                tol=1e-18,
+                callback=callback,
+            )
+            toc = time.perf_counter()
+
+        with self._instrument("results"):
+            results = self._results(
+                params_init,
+                result.x,
+                x,
+                y,
+                ydata=ydata,
+                time=toc - tic,
+                optimizer=_optimizer_info(result),
+            )
+
+        if save:
+            # Save fit results to object instance
+            self.result = results
+            self.params = results.params
+
+            # self.calc_monte_carlo(5, [0.02, 0.01], 0.005)
+        else:
+            # Return results without saving
+            return results
+
+    def _objective(self, x, y, params, compress=True, gram_factor=None):
+        # Name of the scalar SSR objective method of the function and its
+        # extra arguments, for input x data, preprocessed y data and initial
+        # parameters. If compress is False, the y data are never truncated
+        # (see svd_rank). gram_factor is the precalculated Gram matrix factor
+        # of the full y data, if available.
+        # Separable models minimise the SSR from the data Gram matrix, so the
+        # per evaluation cost is independent of the number of y variables
+        if self.function.separable:
+            if compress and self.svd_rank is not None:
+                gram_factor = helpers.gram_factor(self._compress(y, x, params))
+            elif gram_factor is None:
+                gram_factor = helpers.gram_factor(y)
+            return "objective_gram", (x, gram_factor)
+        else:
+            return "objective", (x, y, True)
+
+    async def run_scipy_async(
+        self,
+        params_init,
+        save=True,
+        method="Nelder-Mead",
+        executor=None,
+        progress=None,
+    ):
+        """Fit data given initial parameter guesses without blocking the
+        event loop.
+
+        Runs `run_scipy` on an executor. If the awaiting task is cancelled,
+        the fit is abandoned at the end of the current optimiser iteration.
+
+        Parameters
+        ----------
+        params_init : `dict`
+            Initial parameter guesses for fitter.
+        save : `boolean`
+            If True, process and save optimisation results.
+            If False, return the `FitResult`.
+        method : `string`, optional
+            The fitting method to use.
+        executor : `concurrent.futures.ThreadPoolExecutor`, optional
+            Thread pool to run the fit on. If None, the event loop's default
+            executor is used.
+        progress : `function`, optional
+            Called on the event loop thread after each optimiser iteration
+            with the number of iterations so far and the current parameter
+            array.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        cancelled = threading.Event()
+        nit = 0
+
+        def callback(xk, *args):
+            # Runs on the worker thread between optimiser iterations
+            nonlocal nit
+            if cancelled.is_set():
+                raise FitCancelled()
+            nit += 1
+            if progress is not None:
+                loop.call_soon_threadsafe(progress, nit, np.copy(xk))
+
+        try:
+            results = await loop.run_in_executor(
+                executor,
+                functools.partial(
+                    self.run_scipy,
+                    params_init,
+                    save=False,
+                    method=method,
+                    callback=callback,
+                ),
+            )
+        except asyncio.CancelledError:
+            # Stop the worker at its next iteration
+            cancelled.set()
+            raise
+
+        if save:
+            # Save fit results to object instance
+            self.result = results
+            self.params = results.params
+        else:
+            # Return results without saving
+            return results
+
+    def run_least_squares(
+        self,
+        params_init,
+        save=True,
+        xdata=None,
+        ydata=None,
+        method="trf",
+        jac="2-point",
+        max_nfev=None,
+    ):
+        """Fit data given initial parameter guesses, using a least squares
+        optimiser on the residual vector.
+
+        Trust region and Levenberg-Marquardt solvers make use of the structure
+        of the residuals, and usually converge in far fewer function
+        evaluations than minimising their sum of squares directly.
+
+        Parameters
+        ----------
+        params_init : `dict`
+            Initial parameter guesses for fitter.
+        save : `boolean`
+            If True, process and save optimisation results.
+            If False, return the `FitResult`.
+        xdata : `ndarray`, optional
+            Modified input array.
+            (used with save=False for Monte Carlo error calculation)
+        ydata : `ndarray`, optional
+            Modified input array.
+            (used with save=False for Monte Carlo error calculation)
+        method : `string`, optional
+            The scipy.optimize.least_squares method to use.
+            One of: `trf`, `dogbox`, `lm` (unbounded parameters only).
+        jac : `string` or `function`, optional
+            Jacobian of the residual vector, as for
+            scipy.optimize.least_squares. Defaults to finite differences.
+        max_nfev : `int`, optional
+            Maximum number of function evaluations, as for
+            scipy.optimize.least_squares. Defaults to scipy's (100 per
+            parameter for `trf`).
+        """
+        _check_params(self.function, params_init)
+
+        if self.cache is not None and xdata is None and ydata is None:
+            return self._run_cached(
+                self.run_least_squares,
+                params_init,
+                save,
+                method=method,
+                jac=jac,
+                max_nfev=max_nfev,
+            )
+
+        # Set input data
+        x = self.xdata if xdata is None else xdata
+        if ydata is None:
+            y, _ = self._prepared()
+        else:
+            y = self._preprocess(ydata)
+
+        # Sort parameter dict into ordered array of parameters and bounds
+        # (None bounds are unbounded)
+        p = []
+        b_min = []
+        b_max = []
+        for key, value in sorted(params_init.items()):
+            p.append(value["init"])
+            b_min.append(value["bounds"]["min"])
+            b_max.append(value["bounds"]["max"])
+        b_min = [-np.inf if b is None else b for b in b_min]
+        b_max = [np.inf if b is None else b for b in b_max]
+
+        import scipy.optimize
+
+        # Run optimizer
+        with self._instrument("least_squares"):
+            # Look up the function's own methods again once instrumented,
+            # so profiled fits time every evaluation
+            if getattr(jac, "__self__", None) is self.function:
+                jac = getattr(self.function, jac.__name__)
+
+            tic = time.perf_counter()
+            result = scipy.optimize.least_squares(
+                self.function.residuals,
+                p,
+                bounds=(b_min, b_max),
+                args=(x, self._compress(y, x, p)),
+                method=method if method else "trf",
+                jac=jac,
+                x_scale="jac",
+                ftol=1e-15,
+                xtol=1e-15,
+                gtol=1e-15,
+                max_nfev=max_nfev,
+            )
+            toc = time.perf_counter()
+
+        with self._instrument("results"):
+            results = self._results(
+                params_init,
+                result.x,
+                x,
+                y,
+                ydata=ydata,
+                time=toc - tic,
+                optimizer=_optimizer_info(result),
+            )
+
+        if save:
+            # Save fit results to object instance
+            self.result = results
+            self.params = results.params
+        else:
+            # Return results without saving
+            return results
+
+    def run_varpro(
+        self,
+        params_init,
+        save=True,
+        xdata=None,
+        ydata=None,
+        method="trf",
+        max_nfev=None,
+    ):
+        """Fit data given initial parameter guesses, using variable
+        projection.
+
+        Least squares fit of the nonlinear parameters only, with the linear
+        fit coefficients projected out and the Jacobian of the projected
+        residuals calculated from the design matrix derivatives (see
+        `BaseFunction.jacobian`).
+
+        Falls back to a finite difference Jacobian for models whose linear
+        coefficients are constrained (non-normalised UV models).
+
+        Parameters
+        ----------
+        See `run_least_squares`.
+        """
+        return self.run_least_squares(
+            params_init,
+            save=save,
+            xdata=xdata,
+            ydata=ydata,
+            method=method,
+            jac=(
+                self.function.jacobian
+                if self.function.separable
+                else "2-point"
+            ),
+            max_nfev=max_nfev,
         )
-        toc = time.perf_counter()
+
+    def _run_cached(self, run, params_init, save, **kwargs):
+        # Look up fit results in the result cache, fitting and caching them
+        # on a miss. All inputs that affect the results form the key, only
+        # the initial values and bounds of the parameters (fits add their
+        # results to the params dict).
+        key = cache.key(
+            self.xdata,
+            self.ydata,
+            run,
+            {
+                name: {"init": param["init"], "bounds": param["bounds"]}
+                for name, param in params_init.items()
+            },
+            kwargs,
+            {
+                "fitter": self.function.fitter,
+                "f": self.function.f,
+                "flavour": self.function.flavour,
+                "function_normalise": self.function.normalise,
+                "warm_start": self.function.warm_start,
+                "normalise": self.normalise,
+                "dilution_correction": self.dilution_correction,
+                "svd_rank": self.svd_rank,
+                "lean": self.lean,
+            },
+        )
+
+        with self._span("cache"):
+            results = self.cache.get(key)
+        if results is None:
+            # Fit without the cache
+            results = run(
+                params_init,
+                save=False,
+                xdata=self.xdata,
+                ydata=self.ydata,
+                **kwargs,
+            )
+            self.cache.put(key, results)
+        else:
+            # Update the caller's params dict with the results, as fits do
+            for name, param in results.params.items():
+                params_init[name].update(param)
+            results.params = params_init
+
+        if save:
+            # Save fit results to object instance
+            self.result = results
+            self.params = results.params
+        else:
+            # Return results without saving
+            return results
+
+    @property
+    def function(self):
+        """Fitting function, its instrumented copy within profiled fit
+        stages (see `instrument.Profiler.instrument`)"""
+        return instrument.active(self._function)
+
+    @function.setter
+    def function(self, function):
+        self._function = function
+
+    def _span(self, name):
+        # Profiler span timing a fit stage, no-op without a profiler
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.span(name)
+
+    def _instrument(self, name):
+        # Profiler span timing a fit stage and every fitting function
+        # evaluation within it, no-op without a profiler
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.instrument(self.function, name)
+
+    def _results(
+        self,
+        params_init,
+        params_opt,
+        x,
+        y,
+        ydata=None,
+        time=None,
+        optimizer=None,
+    ):
+        # Populate fit results from optimised parameters
+        # x, y: input data used in the fit (y preprocessed)
+        # ydata: modified raw input y data, if not fitting self.ydata
+        # time: time taken to fit
+        # optimizer: optimiser counts and status, see _optimizer_info
 
         # Calculate fitted data with optimised parameters.
         # Force molefraction (not free concentration) calculation for proper
@@ -213,55 +717,65 @@ class Fitter:
             coeffs,
             molefrac,
         ) = self.function.objective(
-            result.x, x, y, scalar=False, ydata_init=ydata_init
+            params_opt, x, y, scalar=False, ydata_init=ydata_init
         )
 
-        # Postprocessing
-        # Populate fit results dict
-        results = {}
-
-        # Save time taken to fit
-        results["time"] = toc - tic
-
-        # Save raw optimised params arra
-        results["_params_raw"] = result.x
-
-        # Postprocess (denormalise) and save fitted data
+        # Postprocess (denormalise) fitted data
         fit = self._postprocess(
             self.ydata if ydata is None else ydata, fit_norm
         )
-        results["fit"] = fit
-
-        results["residuals"] = residuals
-
-        results["coeffs"] = coeffs
-        results["coeffs_raw"] = coeffs_raw
-
-        # Calculate final molefrac (including host, function-specific)
-        results["molefrac"] = molefrac
-        results["molefrac_raw"] = molefrac_raw
 
         # Calculate fit uncertainty statistics
-        err = self.statistics(result.x, fit, coeffs_raw, residuals)
+        with self._span("calc_covariance"):
+            covariance = self.calc_covariance(
+                params_opt, coeffs_raw, residuals, xdata=x
+            )
+        with self._span("statistics"):
+            err = self.statistics(
+                params_opt, fit, coeffs_raw, residuals, covariance=covariance
+            )
 
         # Parse final optimised parameters and errors into parameters dict
-        results["params"] = self.function.format_params(
-            params_init, result.x, err
+        with self._span("format_params"):
+            params = self.function.format_params(params_init, params_opt, err)
+
+        # Pack results, labelled for the pandas tables
+        results = FitResult(
+            params,
+            time,
+            helpers.ssr(residuals),
+            (
+                None if self.data is None else self.data.index,
+                None if self.data is None else self.data.columns,
+                self._coeff_names(),
+            ),
+            lean=self.lean,
+            optimizer=optimizer,
+            params_raw=params_opt,
+            covariance=covariance,
+            coeffs=coeffs,
+            coeffs_raw=coeffs_raw,
+            molefrac=molefrac,
+            molefrac_raw=molefrac_raw,
+            fit=fit,
+            residuals=residuals,
         )
 
-        if save:
-            # Save fit results dict to object instance
-            for key, value in results.items():
-                setattr(self, key, value)
+        return results
 
-            # self.calc_monte_carlo(5, [0.02, 0.01], 0.005)
-        else:
-            # Return results dict without saving
-            return results
-
-    def statistics(self, params, fit, coeffs, residuals):
+    def statistics(
+        self, params, fit, coeffs, residuals, xdata=None, covariance=None
+    ):
         """Calculate fit statistics.
 
+        Parameters
+        ----------
+        xdata : `ndarray`, optional
+            Input x data of the fit, defaults to `xdata`.
+        covariance : `ndarray`, optional
+            Precalculated parameter covariance matrix, see
+            `calc_covariance`.
+
         Returns
         -------
         ci : `float`
@@ -270,70 +784,99 @@ class Fitter:
         # Standard deviation of calculated y
         # Standard deviation of calculated coefficients
         """
-        # Calculate deLevie uncertainty
-        d = np.float64(1e-6)  # delta
-
-        # 0. Calculate partial differentials for each parameter
-        diffs = []
-        for i, pi in enumerate(params):
-            # Shift the ith parameter's value by delta
-            pi_shift = pi * (1 + d)
-            params_shift = np.copy(params)
-            params_shift[i] = pi_shift
-
-            # Calculate fit with modified parameter set
-            x = self.xdata
-            y = self._preprocess(self.ydata)
-            ydata_init = self.ydata[:, 0]
-            fit_shift_norm, _, _, _, _, _ = self.function.objective(
-                params_shift,
-                x,
-                y,
-                scalar=False,
-                ydata_init=ydata_init,
-                fit_coeffs=coeffs,
+        if covariance is None:
+            covariance = self.calc_covariance(
+                params, coeffs, residuals, xdata=xdata
             )
-            fit_shift = self._postprocess(self.ydata, fit_shift_norm)
-
-            # Calculate partial differential
-            # Flatten numerator into 1D array (TODO: is this correct?)
-            num = (fit_shift - fit).flatten()
-            denom = pi_shift - pi
-            diffs.append(np.divide(num, denom))
 
-        diffs = np.array(diffs)
-
-        # 1. Calculate PxP matrix M and invert
-        P = len(params)
-        M = np.zeros((P, P))
-        for i, j in product(range(P), range(P)):
-            M[i, j] = np.sum(diffs[i] * diffs[j])
+        # Standard deviations sigma of P parameters pi
+        sigma = np.sqrt(np.diagonal(covariance))
 
-        M_inv = np.linalg.inv(M)
-        m_diag = np.diagonal(M_inv)
-
-        # 2. Calculate standard deviations sigma of P parameters pi
-        # Sum of squares of residuals
-        ssr = np.sum(np.square(residuals))
         # Degrees of freedom:
         # N datapoints - N fitted params - N calculated coefficients
         d_free = self.ydata.size - len(params) - coeffs.size
 
-        sigma = np.sqrt((m_diag * ssr) / (d_free - 1))
-
-        # 3. Calculate confidence intervals
+        # Calculate confidence intervals
         # Calculate t-value at 95%
         # Studnt, n=d_free, p<0.05, 2-tail
-        t = stats.t.ppf(1 - 0.025, d_free)
+        # (Student's t inverse CDF, as scipy.stats.t.ppf without importing
+        # scipy.stats)
+        from scipy.special import stdtrit
+
+        t = stdtrit(d_free, 1 - 0.025)
 
         # ci = np.array([params - t * sigma, params + t * sigma])
         ci_percent = (t * sigma) / params * 100
 
         return ci_percent
 
-    def calc_monte_carlo(self, n_iter, xdata_error, ydata_error, method=None):
+    def calc_covariance(self, params, coeffs, residuals, xdata=None):
+        """Calculate the covariance matrix of the optimised parameters.
+
+        deLevie asymptotic covariance: the inverse of the P x P matrix M of
+        products of the derivatives of the fit with respect to each parameter
+        (at fixed fit coefficients), scaled by SSR / (d_free - 1).
+
+        The fit derivatives are calculated from the design matrix
+        derivatives (see `BaseFunction.design_jacobian`), analytically where
+        the model function provides them and otherwise by finite differences
+        evaluated in a single batched model call.
+
+        Parameters
+        ----------
+        params : `ndarray`
+            Optimised parameters.
+        coeffs : `ndarray`
+            Raw fit coefficients.
+        residuals : `ndarray`
+            Fit residuals.
+        xdata : `ndarray`, optional
+            Input x data of the fit, defaults to `xdata`.
+
+        Returns
+        -------
+        covariance : `ndarray`
+            P x P parameter covariance matrix.
+        """
+        x = self.xdata if xdata is None else xdata
+
+        # 0. Calculate partial differentials of the fit for each parameter,
+        # flattened
+        d_molefrac_raw = self.function.design_jacobian(params, x)
+        diffs = np.einsum("pcn,cm->pmn", d_molefrac_raw, coeffs).reshape(
+            len(params), -1
+        )
+
+        # 1. Calculate PxP matrix M and invert
+        M = diffs.dot(diffs.T)
+        M_inv = np.linalg.inv(M)
+
+        # 2. Scale by residual variance
+        # Sum of squares of residuals
+        ssr = np.sum(np.square(residuals))
+        # Degrees of freedom:
+        # N datapoints - N fitted params - N calculated coefficients
+        d_free = self.ydata.size - len(params) - coeffs.size
+
+        return M_inv * ssr / (d_free - 1)
+
+    def calc_monte_carlo(
+        self,
+        n_iter,
+        xdata_error,
+        ydata_error,
+        method=None,
+        seed=None,
+        executor=None,
+        max_workers=None,
+    ):
         """Calculate fit error using Monte Carlo method.
 
+        Each iteration draws its input data perturbations from its own
+        generator, spawned from a `numpy.random.SeedSequence`, so results for
+        a given seed are reproducible however the iterations are split
+        between workers.
+
         Parameters
         ----------
         n_iter : `int`
@@ -342,115 +885,599 @@ class Fitter:
             N array of N percentage errors corresponding to N rows of xdata.
         ydata_error : `float`
             Float corresponding to N percentage error on each row of ydata.
+        method : `string`, optional
+            The fitting method to use, see `run_scipy`.
+        seed : `int` or `numpy.random.SeedSequence`, optional
+            Seed for the perturbation generators. If None, fresh entropy is
+            drawn from the OS.
+        executor : `concurrent.futures.Executor`, optional
+            Executor to run the iterations on. Not shut down on return.
+        max_workers : `int`, optional
+            If given and no executor is provided, run the iterations on a
+            process pool with this many workers. Otherwise iterations are run
+            serially in this process.
 
         Returns
         -------
         Something.
         """
-        xdata = self.xdata
-        ydata = self.ydata
-
-        # Convert params results to params_init array to use as input
-        # to run_scipy
-        # TODO: make params_init same format as params result
-        # params_init = {}
-        # for key, param in self.params.items():
-        #     params_init[key] = param["value"]
-
         # Copy parameter results array and set inital values to optimised
         # parameter results to use as input to run_scipy
+        # (from the raw results, aggregation models format some values as
+        # lists)
         params_init = {}
-        for key, param in self.params.items():
+        for (key, param), value in zip(
+            sorted(self.params.items()), self._params_raw
+        ):
             params_init[key] = param
-            params_init[key]["init"] = param["value"]
+            params_init[key]["init"] = value
+
+        # One independent seed per iteration
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        seeds = seed.spawn(n_iter)
+
+        args = (self, params_init, xdata_error, ydata_error, method)
+
+        if executor is None and max_workers is None:
+            params_arr = _monte_carlo_chunk(seeds, *args)
+        else:
+            # Split iterations into a few chunks per worker to balance load
+            n_chunks = min(n_iter, 4 * (max_workers or os.cpu_count() or 1))
+            chunks = [c.tolist() for c in np.array_split(seeds, n_chunks)]
+
+            if executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                    params_arr = self._map_chunks(pool, chunks, args)
+            else:
+                params_arr = self._map_chunks(executor, chunks, args)
 
-        params_arr = np.zeros((n_iter, len(params_init)))
+        return self._monte_carlo_errors(params_arr, self._params_raw)
 
-        for n in range(n_iter):
-            # Calculate error multiplier arrays matching ydata, xdata shapes
-            xdata_error_arr = (
-                np.random.standard_normal(xdata.shape)
-                * ml.repmat(xdata_error, xdata.shape[1], 1).T
-                + 1
+    async def calc_monte_carlo_async(
+        self,
+        n_iter,
+        xdata_error,
+        ydata_error,
+        method=None,
+        seed=None,
+        executor=None,
+        chunk_size=10,
+        progress=None,
+    ):
+        """Calculate fit error using Monte Carlo method without blocking the
+        event loop.
+
+        Iterations are run in chunks on an executor, as in
+        `calc_monte_carlo`, and give the same errors for a given seed. If the
+        awaiting task is cancelled, chunks not yet started are dropped.
+
+        Parameters
+        ----------
+        n_iter : `int`
+            Number of Monte Carlo iterations.
+        xdata_error : `ndarray`
+            N array of N percentage errors corresponding to N rows of xdata.
+        ydata_error : `float`
+            Float corresponding to N percentage error on each row of ydata.
+        method : `string`, optional
+            The fitting method to use, see `run_scipy`.
+        seed : `int` or `numpy.random.SeedSequence`, optional
+            Seed for the perturbation generators. If None, fresh entropy is
+            drawn from the OS.
+        executor : `concurrent.futures.Executor`, optional
+            Executor to run the chunks on, threads or processes. If None, the
+            event loop's default executor is used.
+        chunk_size : `int`, optional
+            Number of iterations per chunk.
+        progress : `function`, optional
+            Called on the event loop thread as each chunk completes with the
+            number of iterations completed so far and `n_iter`.
+
+        Returns
+        -------
+        params : `dict`
+            Parameters dict, updated with Monte Carlo errors as by
+            `calc_monte_carlo`.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+
+        # Set inital values to optimised parameter results, as in
+        # calc_monte_carlo
+        params_init = {}
+        for (key, param), value in zip(
+            sorted(self.params.items()), self._params_raw
+        ):
+            params_init[key] = param
+            params_init[key]["init"] = value
+
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        seeds = seed.spawn(n_iter)
+
+        futures = [
+            loop.run_in_executor(
+                executor,
+                _monte_carlo_chunk,
+                seeds[i : i + chunk_size],
+                self,
+                params_init,
+                xdata_error,
+                ydata_error,
+                method,
             )
-            ydata_error_arr = (
-                np.random.standard_normal(ydata.shape) * ydata_error + 1
+            for i in range(0, n_iter, chunk_size)
+        ]
+
+        try:
+            done = 0
+            for future in asyncio.as_completed(futures):
+                done += len(await future)
+                if progress is not None:
+                    progress(done, n_iter)
+        except BaseException:
+            # Drop chunks not yet started on cancellation or failure
+            for future in futures:
+                future.cancel()
+            raise
+
+        # Chunks are complete, collect them in iteration order
+        params_arr = np.concatenate([future.result() for future in futures])
+
+        return self._monte_carlo_errors(params_arr, self._params_raw)
+
+    def calc_monte_carlo_batch(
+        self,
+        n_iter,
+        xdata_error,
+        ydata_error,
+        seed=None,
+        max_iter=200,
+    ):
+        """Calculate fit error using Monte Carlo method, refitting all
+        iterations at once.
+
+        The perturbed input data of all iterations are generated as one
+        stacked array and refitted together with the batched optimiser used
+        by `BatchFitter`, starting from the optimised parameters. Only the
+        optimised parameters of each iteration are calculated (no fit
+        statistics or results formatting). Requires a separable function.
+
+        Parameters
+        ----------
+        n_iter : `int`
+            Number of Monte Carlo iterations.
+        xdata_error : `ndarray`
+            N array of N percentage errors corresponding to N rows of xdata.
+        ydata_error : `float`
+            Float corresponding to N percentage error on each row of ydata.
+        seed : `int` or `numpy.random.SeedSequence`, optional
+            Seed for the perturbation generator. If None, fresh entropy is
+            drawn from the OS.
+        max_iter : `int`, optional
+            Maximum number of optimiser iterations per Monte Carlo iteration.
+
+        Returns
+        -------
+        params : `dict`
+            Parameters dict, updated with Monte Carlo errors as by
+            `calc_monte_carlo`.
+        """
+        if not self.function.separable:
+            raise ValueError("Batch fitting requires a separable function")
+
+        params_arr = self._monte_carlo_batch(
+            n_iter,
+            xdata_error,
+            ydata_error,
+            np.random.default_rng(seed),
+            max_iter=max_iter,
+        )
+
+        return self._monte_carlo_errors(params_arr, self._params_raw)
+
+    def calc_monte_carlo_adaptive(
+        self,
+        xdata_error,
+        ydata_error,
+        tol=0.5,
+        chunk_size=100,
+        max_iter=10000,
+        max_time=None,
+        seed=None,
+        method=None,
+    ):
+        """Calculate fit error using Monte Carlo method, running iterations
+        until the error estimates converge.
+
+        Iterations are run in chunks. After each chunk the percentage errors
+        are recalculated from all iterations so far, and iteration stops once
+        no error changed by more than `tol` over the last chunk, or the
+        iteration or time budget is used up.
+
+        Chunks are refitted at once as in `calc_monte_carlo_batch` for
+        separable functions, and serially as in `calc_monte_carlo` otherwise.
+
+        Parameters
+        ----------
+        xdata_error : `ndarray`
+            N array of N percentage errors corresponding to N rows of xdata.
+        ydata_error : `float`
+            Float corresponding to N percentage error on each row of ydata.
+        tol : `float`, optional
+            Convergence tolerance of the Monte Carlo errors, in percentage
+            points.
+        chunk_size : `int`, optional
+            Number of iterations between convergence checks.
+        max_iter : `int`, optional
+            Maximum total number of iterations.
+        max_time : `float`, optional
+            Time budget in seconds, checked between chunks.
+        seed : `int` or `numpy.random.SeedSequence`, optional
+            Seed for the perturbation generators. If None, fresh entropy is
+            drawn from the OS.
+        method : `string`, optional
+            The fitting method to use for non-separable functions, see
+            `run_scipy`.
+
+        Returns
+        -------
+        params : `dict`
+            Parameters dict, updated with Monte Carlo errors as by
+            `calc_monte_carlo`, and for each parameter the change in its
+            errors over the last chunk (`mc_precision`, percentage points,
+            NaN if only one chunk was run) and the total number of iterations
+            (`mc_iter`).
+        """
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+
+        if self.function.separable:
+            rng = np.random.default_rng(seed)
+            params_opt = self._params_raw
+        else:
+            # Set inital values to optimised parameter results, as in
+            # calc_monte_carlo
+            params_init = {}
+            for (key, param), value in zip(
+                sorted(self.params.items()), self._params_raw
+            ):
+                params_init[key] = param
+                params_init[key]["init"] = value
+            params_opt = self._params_raw
+
+        tic = time.perf_counter()
+        params_arr = np.empty((0, len(self.params)))
+        errors = None
+        precision = np.full(len(self.params), np.nan)
+
+        while params_arr.shape[0] < max_iter:
+            n = min(chunk_size, max_iter - params_arr.shape[0])
+
+            if self.function.separable:
+                chunk = self._monte_carlo_batch(
+                    n, xdata_error, ydata_error, rng
+                )
+            else:
+                chunk = _monte_carlo_chunk(
+                    seed.spawn(n),
+                    self,
+                    params_init,
+                    xdata_error,
+                    ydata_error,
+                    method,
+                )
+            params_arr = np.concatenate((params_arr, chunk))
+
+            errors_new = self._monte_carlo_percentages(params_arr, params_opt)
+            if errors is not None:
+                precision = np.abs(errors_new - errors).max(axis=1)
+            errors = errors_new
+
+            if np.all(precision <= tol):
+                break
+            if max_time is not None and time.perf_counter() - tic > max_time:
+                break
+
+        self._monte_carlo_errors(params_arr, params_opt)
+        for i, (key, param) in enumerate(sorted(self.params.items())):
+            param["mc_precision"] = precision[i]
+            param["mc_iter"] = params_arr.shape[0]
+
+        return self.params
+
+    def calc_profile(
+        self,
+        level=0.95,
+        step=None,
+        max_steps=40,
+        method=None,
+        executor=None,
+        max_workers=None,
+    ):
+        """Calculate fit errors from profile likelihood confidence intervals.
+
+        For each parameter, the parameter is fixed at a grid of values
+        stepping away from its optimum in each direction, and the other
+        parameters refitted at each value, starting from their values at the
+        previous grid point. The interval limits are where the refitted SSR
+        exceeds the optimum by the F test threshold at the given confidence
+        level, interpolated between grid points. Unlike the linearised
+        errors of `statistics`, the intervals may be asymmetric, and end at
+        the parameter bounds or extend to infinity where the data don't
+        constrain the parameter.
+
+        Profiles and the threshold are always calculated from the full
+        resolution data, ignoring `svd_rank`.
+
+        The walks away from the optimum in each direction for each parameter
+        are independent, and can be spread across a worker pool.
+
+        Parameters
+        ----------
+        level : `float`, optional
+            Confidence level of the intervals.
+        step : `float`, optional
+            Grid step of each walk, relative to the optimised parameter
+            value (in log space for positive parameters). Defaults to half
+            the linearised relative standard error of each parameter, within
+            0.01 and 0.5.
+        max_steps : `int`, optional
+            Maximum number of grid points per walk. Walks that don't reach
+            the threshold give limits at the parameter bounds (infinite if
+            unbounded).
+        method : `string`, optional
+            The fitting method to use, see `run_scipy`.
+        executor : `concurrent.futures.Executor`, optional
+            Executor to run the walks on. Not shut down on return.
+        max_workers : `int`, optional
+            If given and no executor is provided, run the walks on a process
+            pool with this many workers. Otherwise walks are run serially in
+            this process.
+
+        Returns
+        -------
+        params : `dict`
+            Parameters dict, updated with the lower and upper percentage
+            errors of each parameter (`profile`), as for the Monte Carlo
+            errors of `calc_monte_carlo`.
+        """
+        from scipy.special import fdtri
+
+        params_opt = np.asarray(self._params_raw, dtype=np.float64)
+        bounds = []
+        for key, value in sorted(self.params.items()):
+            b_min = value["bounds"]["min"]
+            b_max = value["bounds"]["max"]
+            bounds.append(
+                [
+                    -np.inf if b_min is None else b_min,
+                    np.inf if b_max is None else b_max,
+                ]
             )
 
-            # Calculated shifted input data
-            xdata_shift = xdata * xdata_error_arr
-            ydata_shift = ydata * ydata_error_arr
+        # Reference SSR at the optimum, of the full resolution data
+        y, gram_factor = self._prepared()
+        objective, args = self._objective(
+            self.xdata, y, params_opt, False, gram_factor
+        )
+        objective = getattr(self.function, objective)
 
-            results = self.run_scipy(
-                params_init=params_init,
-                save=False,
-                xdata=xdata_shift,
-                ydata=ydata_shift,
-                method=method,
+        if self.svd_rank is not None and self.function.separable:
+            # The optimum of the compressed data is refined against the full
+            # resolution data the profiles and threshold are calculated from
+            import scipy.optimize
+
+            params_opt = scipy.optimize.minimize(
+                objective,
+                params_opt,
+                bounds=bounds,
+                args=args,
+                method=method if method else "Nelder-Mead",
+                tol=1e-18,
+            ).x
+
+        ssr = objective(params_opt, *args)
+
+        # F test SSR increase for one fixed parameter at the given level
+        # Degrees of freedom:
+        # N datapoints - N fitted params - N calculated coefficients
+        d_free = self.ydata.size - len(params_opt) - np.size(self.coeffs_raw)
+        threshold = ssr * fdtri(1, d_free, level) / d_free
+
+        if step is None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rel = np.sqrt(np.diagonal(self.covariance)) / np.abs(
+                    params_opt
+                )
+            step = np.clip(np.nan_to_num(rel / 2, nan=0.5), 0.01, 0.5)
+        else:
+            step = np.full(len(params_opt), step)
+
+        # One walk per parameter and direction
+        walks = [
+            (
+                self,
+                i,
+                d,
+                params_opt,
+                bounds,
+                step[i],
+                ssr,
+                threshold,
+                max_steps,
+                method,
             )
+            for i in range(len(params_opt))
+            for d in (-1, 1)
+        ]
 
-            # Log resulting params
-            params_arr[n] = results["_params_raw"]
+        if executor is None and max_workers is None:
+            limits = [_profile_walk(*walk) for walk in walks]
+        elif executor is None:
+            from concurrent.futures import ProcessPoolExecutor
 
-        percentile_params = np.percentile(params_arr, [2.5, 97.5], axis=0).T
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                limits = list(pool.map(_profile_walk, *zip(*walks)))
+        else:
+            limits = list(executor.map(_profile_walk, *zip(*walks)))
+
+        # P x 2 array of lower and upper limits, relative to the fitted
+        # parameters
+        limits = np.reshape(limits, (-1, 2))
+        p = np.asarray(self._params_raw, dtype=np.float64)[:, np.newaxis]
+        errors = (100 * (limits - p)) / p
 
-        # Calculate errors and update input params dict with results
         for i, (key, param) in enumerate(sorted(self.params.items())):
-            p = param["value"]  # Actual param result
-            per = percentile_params[i]  # Calc'd percentile for this param
+            param["profile"] = list(errors[i])
+
+        return self.params
 
-            lower = (100 * (per[0] - p)) / p
-            upper = (100 * (per[1] - p)) / p
+    def _monte_carlo_batch(
+        self, n_iter, xdata_error, ydata_error, rng, max_iter=200
+    ):
+        # Refit n_iter perturbed copies of the input data at once, returns
+        # n_iter x P array of optimised parameters
+
+        # Calculate error multiplier arrays for all iterations at once
+        xdata_error_arr = (
+            rng.standard_normal((n_iter,) + self.xdata.shape)
+            * np.asarray(xdata_error)[:, np.newaxis]
+            + 1
+        )
+        ydata_error_arr = (
+            rng.standard_normal((n_iter,) + self.ydata.shape) * ydata_error + 1
+        )
+
+        # Calculated shifted input data
+        xdata_shift = self.xdata * xdata_error_arr
+        ydata_shift = self._preprocess(self.ydata * ydata_error_arr)
+        gram_factor = helpers.gram_factor(ydata_shift)
 
-            param["mc"] = [lower, upper]
+        def residuals(params, index):
+            return self.function.residuals_batch(
+                params, xdata_shift[index], gram_factor[index]
+            )
+
+        # Refit from the optimised parameters
+        b_min = []
+        b_max = []
+        for key, value in sorted(self.params.items()):
+            b_min.append(value["bounds"]["min"])
+            b_max.append(value["bounds"]["max"])
+        b_min = [-np.inf if b is None else b for b in b_min]
+        b_max = [np.inf if b is None else b for b in b_max]
+
+        params_arr, _, _ = batch.least_squares(
+            residuals,
+            np.tile(self._params_raw, (n_iter, 1)),
+            bounds=(b_min, b_max),
+            max_iter=max_iter,
+        )
+
+        return params_arr
+
+    @staticmethod
+    def _monte_carlo_percentages(params_arr, params_opt):
+        # P x 2 array of lower and upper percentage errors of each parameter
+        # from the 2.5 and 97.5 percentiles of the Monte Carlo iterations
+        percentile_params = np.percentile(params_arr, [2.5, 97.5], axis=0).T
+        p = np.asarray(params_opt, dtype=np.float64)[:, np.newaxis]
+        return (100 * (percentile_params - p)) / p
+
+    def _monte_carlo_errors(self, params_arr, params_opt):
+        # Update params dict with Monte Carlo percentage errors, given
+        # an array of parameters from each iteration and the reference
+        # optimised parameters
+        errors = self._monte_carlo_percentages(params_arr, params_opt)
+
+        # Update input params dict with results
+        for i, (key, param) in enumerate(sorted(self.params.items())):
+            param["mc"] = list(errors[i])
 
         return self.params
 
+    @staticmethod
+    def _map_chunks(executor, chunks, args):
+        # Run Monte Carlo iteration chunks on an executor, results in
+        # iteration order
+        futures = [
+            executor.submit(_monte_carlo_chunk, chunk, *args)
+            for chunk in chunks
+        ]
+        return np.concatenate([f.result() for f in futures])
+
+    def _coeff_names(self):
+        # Coefficient names for the fitted model, general stoichiometry
+        # models carry their own
+        f = self.function.f
+        if f.__name__ in self.MODEL_COEFFS_MAP:
+            return self.MODEL_COEFFS_MAP[f.__name__]
+        else:
+            return f.coeffs
+
+    # Fit results, views of the last FitResult
+    time = _result_property("time")
+    _params_raw = _result_property("params_raw")
+    fit = _result_property("fit")
+    residuals = _result_property("residuals")
+    coeffs = _result_property("coeffs")
+    coeffs_raw = _result_property("coeffs_raw")
+    molefrac = _result_property("molefrac")
+    molefrac_raw = _result_property("molefrac_raw")
+    covariance = _result_property("covariance")
+    optimizer = _result_property("optimizer")
+
     @property
     def fit_curve(self):
         """Return fit curve data as pandas DataFrame"""
-        fit_curve = self.data.copy(deep=True)
-        fit_curve[:] = np.transpose(self.fit)
-        return fit_curve
+        with self._span("fit_curve"):
+            return self.result.fit_curve
 
     @property
     def fit_residuals(self):
         """Return fit residuals data as pandas DataFrame"""
-        fit_residuals = self.data.copy(deep=True)
-        fit_residuals[:] = np.transpose(self.fit - self.ydata)
-        return fit_residuals
+        with self._span("fit_residuals"):
+            return self.result.fit_residuals
 
     @property
     def fit_molefractions(self):
         """Return optimised molefractions table as pandas DataFrame"""
-        # Build DataFrame of molefractions with x vars and column names
-        return (
-            pd.DataFrame(np.transpose(self.molefrac))
-            .set_index(self.data.index)
-            .set_axis(self.MODEL_COEFFS_MAP[self.function.f.__name__], axis=1)
-        )
+        with self._span("fit_molefractions"):
+            return self.result.fit_molefractions
 
     @property
     def fit_coefficients(self):
         """Return optimised coefficients table as pandas DataFrame"""
-        return (
-            pd.DataFrame(np.transpose(self.coeffs))
-            # Set index to fit column names
-            .set_index(self.data.columns.rename("name"))
-            # Set coefficient column names
-            .set_axis(self.MODEL_COEFFS_MAP[self.function.f.__name__], axis=1)
-        )
+        with self._span("fit_coefficients"):
+            return self.result.fit_coefficients
+
+    @property
+    def fit_covariance(self):
+        """Return parameter covariance matrix as pandas DataFrame"""
+        with self._span("fit_covariance"):
+            return self.result.fit_covariance
 
     @property
     def fit_summary(self):
         """Return fit summary data as pandas DataFrame"""
+        with self._span("fit_summary"):
+            return self._fit_summary()
+
+    def _fit_summary(self):
+        import pandas as pd
+
         return pd.DataFrame(
             [
                 [
                     self.function.f.__name__,
                     self.time,
-                    helpers.ssr(self.residuals),
-                    np.array(self.fit).size,
+                    self.result.ssr,
+                    self.ydata.size,
                     len(self.params) + np.array(self.coeffs_raw).size,
                 ]
             ],
@@ -466,18 +1493,698 @@ class Fitter:
     @property
     def fit_quality(self):
         """Return fit quality statistics as pandas DataFrame"""
-        return (
-            pd.DataFrame(
-                np.transpose(
-                    [
-                        helpers.rms(self.residuals),
-                        helpers.cov(self.ydata, self.residuals),
-                    ]
-                ),
-                columns=["rms", "cov"],
+        with self._span("fit_quality"):
+            return self._fit_quality()
+
+    def _fit_quality(self):
+        if self.result.lean:
+            raise ValueError(
+                "Fit quality needs the fit residuals, which lean fit results "
+                "don't keep (see Fitter lean)"
             )
+
+        import pandas as pd
+
+        quality = pd.DataFrame(
+            np.transpose(
+                [
+                    helpers.rms(self.residuals),
+                    helpers.cov(self.ydata, self.residuals),
+                ]
+            ),
+            columns=["rms", "cov"],
+        )
+
+        if self.data is not None:
             # Set index to fit column names
             # Doing it this way instead of setting index in constructor as
             # this allows us to use a custom named index
-            .set_index(self.data.columns.rename("fit"))
+            quality = quality.set_index(self.data.columns.rename("fit"))
+
+        return quality
+
+    @property
+    def fit_profile(self):
+        """Return profiled fit stage timings as pandas DataFrame"""
+        return self.profiler.table()
+
+
+class StreamingFitter(Fitter):
+    """Fitter class for titrations acquired point by point.
+
+    Observations are added with `append`, which refits the data starting
+    from the previous optimised parameters. The speciation solvers of the
+    Fitter's copy of the function are warm started (see
+    `functions.BaseFunction`): existing observations start from their
+    previous free concentrations, and new observations from those of their
+    preceding neighbour.
+
+    Parameters
+    ----------
+    See `Fitter`.
+    run_method : `string`, optional
+        Name of the Fitter run method used for refits, e.g. `run_scipy`.
+        Defaults to `run_varpro`.
+    max_nfev : `int`, optional
+        Maximum number of function evaluations per refit, for the least
+        squares run methods (`run_least_squares`, `run_varpro`). Bounds the
+        time of refits of early observations that don't yet determine the
+        parameters, which otherwise wander until the run method's own
+        limit. Such refits stop unconverged (see `optimizer`), and later
+        refits may not recover the optimum of the full data from their
+        parameters.
+
+    Attributes
+    ----------
+    See `Fitter`.
+    """
+
+    def __init__(
+        self,
+        data,
+        function,
+        *args,
+        run_method="run_varpro",
+        max_nfev=None,
+        **kwargs,
+    ):
+        # Refits start speciation solves from the previous solution. Warm
+        # starting is turned on for a copy of the function with its own
+        # solver state, so the caller's function is unchanged.
+        function = copy.copy(function)
+        function.warm_start = True
+        function._solver_state = {}
+
+        super().__init__(data, function, *args, **kwargs)
+        self.run_method = run_method
+        self.max_nfev = max_nfev
+
+    def append(self, rows, save=True):
+        """Append observations to the data and refit.
+
+        Parameters
+        ----------
+        rows : pandas.DataFrame or tuple of `ndarray`
+            K new observations, with the same index and columns as `data`,
+            or for Fitters created with `Fitter.from_arrays` a tuple of 2 x K
+            x data and M x K y data arrays.
+        save : `boolean`
+            If True, process and save optimisation results.
+            If False, return the `FitResult`.
+        """
+        if isinstance(rows, tuple):
+            if self.data is not None:
+                raise ValueError(
+                    "Observations must be appended as a DataFrame to Fitters "
+                    "with DataFrame data"
+                )
+            xdata, ydata = rows
+        else:
+            xdata, ydata = _frame_arrays(rows)
+            if self.data is not None:
+                import pandas as pd
+
+                self.data = pd.concat((self.data, rows))
+
+        xdata = np.asarray(xdata, dtype=np.float64)
+        ydata = np.atleast_2d(np.asarray(ydata, dtype=np.float64))
+
+        # Only the new observations are munged, the dilution factor is
+        # relative to the first observation
+        if self.dilution_correction:
+            ydata = ydata * xdata[0] / self.xdata[0, 0]
+
+        n_obs = self.xdata.shape[1]
+        self.xdata = np.concatenate((self.xdata, xdata), axis=1)
+        self.ydata = np.concatenate((self.ydata, ydata), axis=1)
+        self.function.clear_memo()
+        self.function.extend_state(n_obs, xdata.shape[1])
+
+        return self.refit(save=save)
+
+    def refit(self, save=True):
+        """Refit the data, starting from the previous optimised parameters
+        if there are any.
+
+        Parameters
+        ----------
+        save : `boolean`
+            If True, process and save optimisation results.
+            If False, return the `FitResult`.
+        """
+        params_init = copy.deepcopy(self.params)
+        if self._params_raw is not None:
+            for (key, value), p in zip(
+                sorted(params_init.items()), self._params_raw
+            ):
+                value["init"] = p
+
+        kwargs = {}
+        if self.max_nfev is not None:
+            kwargs["max_nfev"] = self.max_nfev
+
+        return getattr(self, self.run_method)(params_init, save=save, **kwargs)
+
+
+# Candidate models for fit_all_models: model name (construct key without
+# the nmr/uv prefix) and the flavours each supports
+MODEL_FLAVOURS = {
+    "1to1": ["none"],
+    "1to2": ["none", "add", "stat", "noncoop"],
+    "2to1": ["none", "add", "stat", "noncoop"],
+    "1to3": ["none", "noncoop"],
+    "3to1": ["none", "noncoop"],
+    "dimer": ["none"],
+    "coek": ["none"],
+}
+
+# Default initial parameter values for fit_all_models
+PARAMS_INIT = {
+    "k": 1000.0,
+    "k11": 1000.0,
+    "k12": 100.0,
+    "k13": 10.0,
+    "ke": 1000.0,
+    "rho": 0.5,
+}
+
+
+def _frame_arrays(data):
+    # x and y data arrays of a DataFrame, one variable per row
+    # Index levels are read directly rather than through the index list of
+    # tuples
+    index = data.index
+    return (
+        [index.get_level_values(i) for i in range(index.nlevels)],
+        np.transpose(data.to_numpy()),
+    )
+
+
+def _check_params(function, params_init):
+    # Model functions are passed parameters sorted by name. General
+    # stoichiometry models name theirs after their species, check that the
+    # given names match.
+    names = getattr(function.f, "params", None)
+    if names is not None and sorted(params_init) != names:
+        raise ValueError(
+            f"Parameters of {function.f.__name__} are {', '.join(names)}, "
+            f"got {', '.join(sorted(params_init))}"
+        )
+
+
+def _optimizer_info(result):
+    # Function evaluation and iteration counts and convergence status from a
+    # scipy.optimize result, None where the optimiser doesn't report them
+    return {
+        "nfev": result.get("nfev"),
+        "nit": result.get("nit"),
+        "status": result.get("status"),
+        "success": result.get("success"),
+        "message": result.get("message"),
+    }
+
+
+def model_params(model, flavour="none", init=None):
+    """Return a default initial parameters dict for a model.
+
+    Parameters
+    ----------
+    model : `string`
+        Model name, e.g. `1to2` (see `MODEL_FLAVOURS`).
+    flavour : `string`
+        Fitting function flavour.
+    init : `dict`, optional
+        Initial values by parameter name, overriding `PARAMS_INIT`.
+
+    Returns
+    -------
+    params : `dict`
+        Parameters dict in `Fitter` format, with non-negative bounds.
+    """
+    if model == "1to1":
+        names = ["k"]
+    elif model == "dimer":
+        names = ["ke"]
+    elif model == "coek":
+        names = ["ke", "rho"]
+    elif flavour in ("stat", "noncoop"):
+        names = ["k11"]
+    elif model in ("1to2", "2to1"):
+        names = ["k11", "k12"]
+    else:
+        names = ["k11", "k12", "k13"]
+
+    values = dict(PARAMS_INIT, **(init or {}))
+
+    return {
+        name: {"init": values[name], "bounds": {"min": 0.0, "max": None}}
+        for name in names
+    }
+
+
+def fit_all_models(
+    data,
+    kind="nmr",
+    models=None,
+    params=None,
+    normalise=True,
+    dilution_correction=False,
+    method=None,
+    executor=None,
+    max_workers=None,
+):
+    """Fit every candidate model to a dataset and rank them.
+
+    Input data are munged, preprocessed and their Gram matrix factorised
+    once, and shared by all model fits (see `Fitter.run_scipy`).
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Input data, as for `Fitter`.
+    kind : `string`, optional
+        Model type, one of: `nmr`, `uv`.
+    models : list of (model, flavour) tuples, optional
+        Candidate models, e.g. `("1to2", "add")`. Defaults to every model and
+        flavour in `MODEL_FLAVOURS`.
+    params : `dict`, optional
+        Initial values by parameter name, overriding `PARAMS_INIT`.
+    normalise : boolean, optional
+        Whether to subtract initial x values before fitting, defaults to True
+    dilution_correction: boolean, optional
+        Whether to apply dilution correction to the y data before fitting
+    method : `string`, optional
+        The fitting method to use, see `Fitter.run_scipy`.
+    executor : `concurrent.futures.Executor`, optional
+        Executor to run the model fits on. Not shut down on return.
+    max_workers : `int`, optional
+        If given and no executor is provided, run the model fits on a process
+        pool with this many workers. Otherwise models are fitted serially.
+
+    Returns
+    -------
+    table : pandas.DataFrame
+        One row per model, ranked by AIC (best first), with the model name,
+        flavour, SSR, AIC, BIC, fit time, number of fitted parameters
+        (including linear coefficients), optimised parameter values, the
+        fitted `Fitter` and the error that stopped the fit, if any (`error`).
+        Models that failed to fit have NaN statistics.
+    """
+    if models is None:
+        models = [
+            (model, flavour)
+            for model, flavours in MODEL_FLAVOURS.items()
+            for flavour in flavours
+        ]
+
+    # Shared input data, copied shallowly for each model
+    base = Fitter(
+        data,
+        None,
+        normalise=normalise,
+        dilution_correction=dilution_correction,
+    )
+    base._prepared()
+
+    fitters = []
+    for model, flavour in models:
+        fitter = copy.copy(base)
+        fitter.function = functions.construct(
+            kind + model, normalise=normalise, flavour=flavour
+        )
+        fitter.params = model_params(model, flavour, init=params)
+        fitters.append(fitter)
+
+    if executor is None and max_workers is None:
+        fits = [_fit_model(f, method) for f in fitters]
+    elif executor is None:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            fits = list(pool.map(_fit_model, fitters, [method] * len(fitters)))
+    else:
+        fits = list(executor.map(_fit_model, fitters, [method] * len(fitters)))
+
+    rows = []
+    for (model, flavour), (fitter, error) in zip(models, fits):
+        if fitter.result is None:
+            # Failed fit
+            ssr = aic = bic = n_params = np.nan
+            values = None
+        else:
+            n_params = len(fitter.params) + np.size(fitter.coeffs_raw)
+            ssr = helpers.ssr(fitter.residuals)
+            aic = helpers.aic(fitter.residuals, n_params)
+            bic = helpers.bic(fitter.residuals, n_params)
+            values = {
+                name: param["value"] for name, param in fitter.params.items()
+            }
+
+        rows.append(
+            [
+                kind + model,
+                flavour,
+                ssr,
+                aic,
+                bic,
+                fitter.time,
+                n_params,
+                values,
+                fitter,
+                error,
+            ]
+        )
+
+    import pandas as pd
+
+    return (
+        pd.DataFrame(
+            rows,
+            columns=[
+                "model",
+                "flavour",
+                "ssr",
+                "aic",
+                "bic",
+                "time",
+                "n_params",
+                "params",
+                "fitter",
+                "error",
+            ],
+        )
+        .sort_values("aic", na_position="last", kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def _fit_model(fitter, method):
+    # Fit one candidate model for fit_all_models, returns the fitted Fitter
+    # and a description of the error that stopped the fit, or None
+    # Module level so it can be pickled for process pools
+    try:
+        fitter.run_scipy(copy.deepcopy(fitter.params), method=method)
+    except (np.linalg.LinAlgError, ValueError, FloatingPointError) as e:
+        return fitter, f"{type(e).__name__}: {e}"
+
+    return fitter, None
+
+
+def _monte_carlo_chunk(
+    seeds, fitter, params_init, xdata_error, ydata_error, method
+):
+    # Run Monte Carlo iterations for a list of per iteration seeds
+    # Module level so it can be pickled for process pools
+    xdata = fitter.xdata
+    ydata = fitter.ydata
+
+    params_arr = np.zeros((len(seeds), len(params_init)))
+
+    for n, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+
+        # Calculate error multiplier arrays matching ydata, xdata shapes
+        xdata_error_arr = (
+            rng.standard_normal(xdata.shape)
+            * np.asarray(xdata_error)[:, np.newaxis]
+            + 1
+        )
+        ydata_error_arr = rng.standard_normal(ydata.shape) * ydata_error + 1
+
+        # Calculated shifted input data
+        xdata_shift = xdata * xdata_error_arr
+        ydata_shift = ydata * ydata_error_arr
+
+        # Copy params, results formatting updates them in place
+        results = fitter.run_scipy(
+            params_init=copy.deepcopy(params_init),
+            save=False,
+            xdata=xdata_shift,
+            ydata=ydata_shift,
+            method=method,
         )
+
+        # Log resulting params
+        params_arr[n] = results.params_raw
+
+    return params_arr
+
+
+def _profile_walk(
+    fitter,
+    index,
+    direction,
+    params_opt,
+    bounds,
+    step,
+    ssr_opt,
+    threshold,
+    max_steps,
+    method,
+):
+    # Walk one parameter away from its optimum in one direction, refitting
+    # the other parameters at each grid point, and return the confidence
+    # limit where the SSR increase crosses the threshold
+    # Module level so it can be pickled for process pools
+    import scipy.optimize
+
+    y, gram_factor = fitter._prepared()
+    objective, args = fitter._objective(
+        fitter.xdata, y, params_opt, False, gram_factor
+    )
+    objective = getattr(fitter.function, objective)
+
+    free = np.arange(len(params_opt)) != index
+    bounds_free = [b for b, f in zip(bounds, free) if f]
+    low, high = bounds[index]
+    value_opt = params_opt[index]
+
+    # Positive parameters are stepped in log space
+    log = value_opt > 0
+    transform = np.log if log else (lambda value: value)
+
+    def profile_objective(q, value, *args):
+        p = np.copy(params_opt)
+        p[index] = value
+        p[free] = q
+        return objective(p, *args)
+
+    # SSR differences well within the threshold are resolved, so there is
+    # no need to converge the refits further
+    if method in (None, "Nelder-Mead"):
+        options = {"xatol": np.inf, "fatol": 1e-4 * threshold}
+        tol = None
+    else:
+        options = None
+        tol = 1e-18
+
+    q = params_opt[free]
+    x_prev, delta_prev = transform(value_opt), 0.0
+
+    for k in range(1, max_steps + 1):
+        if log:
+            value = value_opt * np.exp(direction * k * step)
+        else:
+            value = value_opt + direction * k * step
+        value = min(max(value, low), high)
+
+        if np.any(free):
+            # Refit the other parameters, warm started from the previous
+            # grid point
+            result = scipy.optimize.minimize(
+                profile_objective,
+                q,
+                bounds=bounds_free,
+                args=(value,) + args,
+                method=method if method else "Nelder-Mead",
+                tol=tol,
+                options=options,
+            )
+            q, ssr = result.x, result.fun
+        else:
+            ssr = objective(np.array([value]), *args)
+
+        delta = ssr - ssr_opt
+        if not np.isfinite(delta):
+            # Model undefined beyond this point
+            return value
+
+        if delta >= threshold:
+            # Interpolate the crossing on the square root of the SSR
+            # increase, which is close to linear in the parameter near the
+            # optimum
+            x = transform(value)
+            r_prev = np.sqrt(max(delta_prev, 0.0))
+            r = (np.sqrt(threshold) - r_prev) / (np.sqrt(delta) - r_prev)
+            x_cross = x_prev + r * (x - x_prev)
+            return np.exp(x_cross) if log else x_cross
+
+        if value == low or value == high:
+            # Bound reached within the confidence region
+            return value
+
+        x_prev, delta_prev = transform(value), delta
+
+    # Threshold not reached within max_steps, the interval extends to the
+    # bound (infinite if unbounded)
+    return low if direction < 0 else high
+
+
+class BatchFitter:
+    """Fitter class for optimising one binding constant function against many
+    datasets at once.
+
+    The speciation and linear fits of all datasets are evaluated together in
+    one vectorised pass over stacked data arrays (see
+    `BaseFunction.residuals_batch`), driven by a batched Levenberg-Marquardt
+    optimiser (see `batch.least_squares`). Datasets with fewer observations
+    are padded to the size of the largest and masked out of the fit.
+
+    Parameters
+    ----------
+    data : list of pandas.DataFrame
+        Input datasets, each as for `Fitter`. Datasets may have different
+        numbers of observations and observed variables.
+    function : function
+        The fitter function to use for optimisation, shared by all datasets.
+        Must be separable (see `BaseFunction.separable`).
+    params : dict
+        Dict of initial values for parameters, shared by all datasets.
+        See `Fitter`.
+    normalise : boolean, optional
+        Whether to subtract initial x values before fitting, defaults to True
+    dilution_correction: boolean, optional
+        Whether to apply dilution correction to the y data before fitting
+
+    Attributes
+    ----------
+    fitters : list of Fitter
+        Fitter for each dataset, populated with fit results as by
+        `Fitter.run_scipy` after `BatchFitter.run`.
+    xdata : array_like, Bx2xN matrix
+        Stacked Host/Guest data matrices. Padding observations repeat the
+        last observation of their dataset.
+    mask : array_like, BxN matrix
+        False for padding observations.
+    gram_factor : array_like, BxNxK matrix
+        Gram matrix factors of the preprocessed y data of each dataset (see
+        `helpers.gram_factor`).
+    """
+
+    def __init__(
+        self,
+        data,
+        function,
+        params=None,
+        normalise=True,
+        dilution_correction=False,
+    ):
+        self.function = function
+        self.params = params
+
+        # Per dataset Fitters handle data munging and results
+        self.fitters = [
+            Fitter(
+                d,
+                function,
+                params=copy.deepcopy(params),
+                normalise=normalise,
+                dilution_correction=dilution_correction,
+            )
+            for d in data
+        ]
+
+        n_obs = max(f.xdata.shape[1] for f in self.fitters)
+        n_y = max(f.ydata.shape[0] for f in self.fitters)
+
+        self.xdata = np.empty((len(self.fitters), 2, n_obs))
+        self.mask = np.zeros((len(self.fitters), n_obs), dtype=bool)
+        ydata = np.zeros((len(self.fitters), n_y, n_obs))
+
+        for i, f in enumerate(self.fitters):
+            n = f.xdata.shape[1]
+            self.xdata[i] = f.xdata[:, -1:]
+            self.xdata[i, :, :n] = f.xdata
+            self.mask[i, :n] = True
+            ydata[i, : f.ydata.shape[0], :n] = f._prepared()[0]
+
+        self.gram_factor = helpers.gram_factor(ydata)
+
+    def _residuals(self, params, index):
+        # Batched residual function for batch.least_squares
+        return self.function.residuals_batch(
+            params,
+            self.xdata[index],
+            self.gram_factor[index],
+            mask=self.mask[index],
+        )
+
+    def run(self, params_init=None, save=True, max_iter=200):
+        """Fit all datasets given initial parameter guesses.
+
+        Parameters
+        ----------
+        params_init : `dict`, optional
+            Initial parameter guesses shared by all datasets.
+            Defaults to `params`.
+        save : `boolean`
+            If True, process and save optimisation results to each Fitter in
+            `fitters`. If False, return the results.
+        max_iter : `int`, optional
+            Maximum number of optimiser iterations per dataset.
+
+        Returns
+        -------
+        results : `list`, only if `save` is False
+            `FitResult` for each dataset, as returned by
+            `Fitter.run_scipy(save=False)`.
+        """
+        if not self.function.separable:
+            raise ValueError("Batch fitting requires a separable function")
+
+        params_init = self.params if params_init is None else params_init
+        _check_params(self.function, params_init)
+
+        # Sort parameter dict into ordered array of parameters and bounds
+        # (None bounds are unbounded)
+        p = []
+        b_min = []
+        b_max = []
+        for key, value in sorted(params_init.items()):
+            p.append(value["init"])
+            b_min.append(value["bounds"]["min"])
+            b_max.append(value["bounds"]["max"])
+        b_min = [-np.inf if b is None else b for b in b_min]
+        b_max = [np.inf if b is None else b for b in b_max]
+
+        # Run optimizer
+        tic = time.perf_counter()
+        params_opt, _, nit = batch.least_squares(
+            self._residuals,
+            np.tile(p, (len(self.fitters), 1)),
+            bounds=(b_min, b_max),
+            max_iter=max_iter,
+        )
+        toc = time.perf_counter()
+
+        results = []
+        for fitter, p_opt, n in zip(self.fitters, params_opt, nit):
+            # Time is the batch fit time amortised over the datasets
+            r = fitter._results(
+                copy.deepcopy(params_init),
+                p_opt,
+                fitter.xdata,
+                fitter._prepared()[0],
+                time=(toc - tic) / len(self.fitters),
+                optimizer=_optimizer_info({"nit": int(n)}),
+            )
+
+            if save:
+                # Save fit results to Fitter instance
+                fitter.result = r
+                fitter.params = r.params
+            else:
+                results.append(r)
+
+        if not save:
+            return results
@@ -1,8 +1,13 @@
 """Binding constant minimisation function classes."""
 
 
+import weakref
+from collections import OrderedDict
+
 import numpy as np
 
+from . import solvers, speciation
+
 
 class BaseFunction:
     """Base Function abstract class.
@@ -28,13 +33,197 @@ class BaseFunction:
     flavour : `string`
         Fitting function flavour.
         One of: `none`, `add`, `stat`, `noncoop`.
+    warm_start : `boolean`
+        If true, polynomial models refine the free concentrations found by
+        the previous evaluation with a few Newton steps instead of solving
+        for them from scratch.
+    memo_size : `int`
+        Number of recent speciation results and fit coefficients remembered,
+        keyed by the exact parameter values and the identity of the input
+        data arrays (input arrays must not be modified in place between
+        calls). Entries hold weak references to their input arrays, and are
+        dropped once those are freed. 0 disables memoisation.
     """
 
-    def __init__(self, fitter, f=None, normalise=True, flavour="none"):
+    def __init__(
+        self,
+        fitter,
+        f=None,
+        normalise=True,
+        flavour="none",
+        warm_start=False,
+        memo_size=16,
+    ):
         self.f = f
         self.fitter = fitter
         self.normalise = normalise
         self.flavour = flavour
+        self.warm_start = warm_start
+        self.memo_size = memo_size
+
+        # Speciation solver state, holds the last solution per titration
+        # point when warm starting
+        self._solver_state = {}
+
+        # Memoised results, oldest first
+        self._memo = OrderedDict()
+
+    def extend_state(self, n_obs, n_new):
+        """Extend warm start solver state for observations appended to the
+        input data.
+
+        Each new observation is seeded with the solution at the preceding
+        observation.
+
+        Parameters
+        ----------
+        n_obs : `int`
+            Number of observations the solver state was found for.
+        n_new : `int`
+            Number of observations appended.
+        """
+        for key, value in self._solver_state.items():
+            if value.shape[-1] == n_obs:
+                seed = np.repeat(value[..., -1:], n_new, axis=-1)
+                self._solver_state[key] = np.concatenate(
+                    (value, seed), axis=-1
+                )
+
+    def __getstate__(self):
+        # Memoised results are only valid for these input arrays, don't
+        # pickle them
+        state = self.__dict__.copy()
+        state["_memo"] = OrderedDict()
+        return state
+
+    def clear_memo(self):
+        """Discard all memoised results, e.g. when the input data change."""
+        self._memo.clear()
+
+    def _memo_get(self, kind, params, *arrays):
+        # Return a copy of the memoised result of kind for these exact
+        # parameters and input arrays, or None
+        if self.memo_size <= 0 or np.ndim(params) != 1:
+            return None
+
+        entry = self._memo.get(_memo_key(kind, params, arrays))
+
+        # Matching ids are the same arrays only while the referenced arrays
+        # are alive, ids of freed arrays may be reused
+        if entry is None or any(
+            ref() is not a for ref, a in zip(entry[0], arrays)
+        ):
+            return None
+
+        return _memo_copy(entry[1])
+
+    def _memo_put(self, kind, params, arrays, value):
+        # Memoise a result of kind for these parameters and input arrays
+        if self.memo_size <= 0 or np.ndim(params) != 1:
+            return
+
+        try:
+            refs = tuple(weakref.ref(a) for a in arrays)
+        except TypeError:
+            # Not an array
+            return
+
+        # Drop entries of freed input arrays, so their results aren't kept
+        for key in [
+            k
+            for k, (entry_refs, _) in self._memo.items()
+            if any(ref() is None for ref in entry_refs)
+        ]:
+            del self._memo[key]
+
+        self._memo[_memo_key(kind, params, arrays)] = (
+            refs,
+            _memo_copy(value),
+        )
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+    @property
+    def separable(self):
+        """True if the linear fit coefficients are unconstrained, so the fit
+        is a separable least squares problem."""
+        return True
+
+    def speciate(self, params, xdata, derivatives=False):
+        """Calculate model molefractions for a set of parameters.
+
+        Parameters
+        ----------
+        params : `ndarray`
+            Array of model parameters.
+        xdata : `ndarray`
+            X x M array of X independent variables, M observations.
+        derivatives : `boolean`
+            If true, also request derivatives of molefrac_raw with respect
+            to the parameters from the model function.
+
+        Returns
+        -------
+        molefrac_raw : `ndarray`
+            Molefractions (or free concentrations) used for fitting.
+        molefrac : `ndarray`
+            Molefractions for display.
+        d_molefrac_raw : `ndarray`, only if `derivatives` and provided
+            P x R x M array, derivatives of molefrac_raw with respect to each
+            of the P parameters. Models that do not calculate derivatives
+            return only the first two values.
+        """
+        if not derivatives:
+            result = self._memo_get("speciate", params, xdata)
+            if result is not None:
+                return result
+
+        kwargs = {"flavour": self.flavour}
+        if self.warm_start:
+            kwargs["state"] = self._solver_state
+        if derivatives:
+            kwargs["derivatives"] = True
+
+        result = self.f(params, xdata, **kwargs)
+
+        if not derivatives:
+            self._memo_put("speciate", params, (xdata,), result)
+
+        return result
+
+    def solve_coeffs(self, params, xdata, ydata, molefrac_raw):
+        """Calculate the linear fit coefficients for a set of parameters.
+
+        Solve by matrix division - linear regression by least squares
+        This is equivalent to
+        << coeffs = molefrac\\ydata (EA = HG\\DA) >>
+        in Matlab
+
+        Parameters
+        ----------
+        params : `ndarray`
+            Array of model parameters.
+        datax : `ndarray`
+            X x M array of X independent variables, M observations.
+        datay : `ndarray`
+            Y x M array of Y dependent variables, M observations.
+        molefrac_raw : `ndarray`
+            Design matrix for params and xdata, see `design`.
+
+        Returns
+        -------
+        coeffs_raw : `ndarray`
+            Raw fit coefficients.
+        """
+        coeffs_raw = self._memo_get("coeffs", params, xdata, ydata)
+
+        if coeffs_raw is None:
+            coeffs_raw, _, _, _ = np.linalg.lstsq(
+                molefrac_raw.T, ydata.T, rcond=None
+            )
+            self._memo_put("coeffs", params, (xdata, ydata), coeffs_raw)
+
+        return coeffs_raw
 
     def objective(
         self,
@@ -87,6 +276,256 @@ class BaseFunction:
         """
         pass
 
+    def design(self, params, xdata):
+        """Calculate the design matrix of the linear fit for a set of
+        parameters.
+
+        Returns
+        -------
+        molefrac_raw : `ndarray`
+            Molefractions (or free concentrations) the Y data are fitted to,
+            one row per fit coefficient.
+        molefrac : `ndarray`
+            Molefractions for display.
+        """
+        pass
+
+    def evaluate(self, params, xdata, ydata, fit_coeffs=None):
+        """Calculate the fit for a set of parameters.
+
+        Returns
+        -------
+        fit : `ndarray`
+            Y fit data, same dimensions as datay.
+        residuals : `ndarray`
+            Y residuals, same dimensions as datay.
+        coeffs_raw : `ndarray`
+            Raw fit coefficients.
+        molefrac_raw : `ndarray`
+            Design matrix, see `design`.
+        molefrac : `ndarray`
+            Molefractions for display.
+        """
+        pass
+
+    def objective_gram(self, params, xdata, gram_factor, *args, **kwargs):
+        """Scalar SSR objective function using a precomputed data Gram matrix
+        factor.
+
+        Equivalent to `objective(..., scalar=True)` for separable models, but
+        the fit and residual matrices are never formed: the SSR is the norm
+        of the component of the data orthogonal to the column space of the
+        design matrix, calculated from the N x K factor Z of the data Gram
+        matrix (see `helpers.gram_factor`). The cost per call is independent
+        of the number of Y variables.
+
+        Parameters
+        ----------
+        params : `ndarray`
+            Array of model parameters.
+        datax : `ndarray`
+            X x M array of X independent variables, M observations.
+        gram_factor : `ndarray`
+            M x K factor of the Gram matrix of the (preprocessed) Y data.
+
+        Returns
+        -------
+        ssr : float
+            Sum of least squares
+        """
+        molefrac_raw, _ = self.design(params, xdata)
+
+        # Parameters outside the model's domain (e.g. zero binding constants)
+        if not np.all(np.isfinite(molefrac_raw)):
+            return np.inf
+
+        # Orthonormal basis of the design matrix column space, truncated to
+        # its numerical rank (matching np.linalg.lstsq)
+        u, s, _ = np.linalg.svd(molefrac_raw.T, full_matrices=False)
+        u = u[:, _numerical_rank(s, molefrac_raw.shape)]
+
+        residuals = gram_factor - u.dot(u.T.dot(gram_factor))
+        return np.square(residuals).sum()
+
+    def residuals_batch(self, params, xdata, gram_factor, mask=None):
+        """Projected residuals of a batch of datasets for separable models.
+
+        The speciation of every dataset is calculated in a single call to the
+        model function (see `design_batch`). The linear fit coefficients of
+        each dataset are then eliminated by projection, as in
+        `objective_gram`.
+
+        Parameters
+        ----------
+        params : `ndarray`
+            B x P array of model parameters, one row per dataset.
+        xdata : `ndarray`
+            B x X x M array of X independent variables, M observations.
+        gram_factor : `ndarray`
+            B x M x K array of Gram matrix factors of the (preprocessed) Y
+            data of each dataset.
+        mask : `ndarray`, optional
+            B x M boolean array, false for padding observations of datasets
+            with fewer than M observations.
+
+        Returns
+        -------
+        residuals : `ndarray`
+            B x M x K array of projected residuals. The sum of squares of each
+            dataset's residuals is its SSR.
+        """
+        a = np.swapaxes(self.design_batch(params, xdata), 1, 2)
+
+        if mask is not None:
+            # Padding observations don't contribute to the fit
+            a = a * mask[:, :, np.newaxis]
+
+        # Datasets with failed speciation are left unfitted
+        a[~np.isfinite(a).all(axis=(1, 2))] = 0
+
+        u, s, _ = np.linalg.svd(a, full_matrices=False)
+        u = u * _numerical_rank(s, a.shape)[:, np.newaxis, :]
+
+        return gram_factor - u @ (np.swapaxes(u, 1, 2) @ gram_factor)
+
+    def residuals(self, params, xdata, ydata, *args, **kwargs):
+        """Residual vector objective function.
+
+        Used with least squares optimisers, which make use of the structure of
+        the residuals rather than only their sum of squares.
+
+        Parameters
+        ----------
+        params : `ndarray`
+            Array of model parameters.
+        datax : `ndarray`
+            X x M array of X independent variables, M observations.
+        datay : `ndarray`
+            Y x M array of Y dependent variables, M observations.
+
+        Returns
+        -------
+        residuals : `ndarray`
+            Flattened Y x M array of residuals.
+        """
+        _, residuals, _, _, _ = self.evaluate(params, xdata, ydata)
+        return residuals.ravel()
+
+    def design_batch(self, params, xdata):
+        """Calculate the design matrices of a batch of parameter sets.
+
+        All parameter sets are evaluated in a single call to the model
+        function, with each set's parameters broadcast to its observations.
+
+        Parameters
+        ----------
+        params : `ndarray`
+            B x P array of model parameters, one row per parameter set.
+        xdata : `ndarray`
+            X x M array of X independent variables, M observations, shared by
+            all parameter sets, or a B x X x M array of one dataset per set.
+
+        Returns
+        -------
+        molefrac_raw : `ndarray`
+            B x C x M array of design matrices, see `design`.
+        """
+        params = np.asarray(params, dtype=np.float64)
+        xdata = np.broadcast_to(xdata, params.shape[:1] + np.shape(xdata)[-2:])
+        n_batch, n_x, n_obs = xdata.shape
+
+        # Flatten the batch into one long dataset with per observation
+        # parameters
+        params_obs = np.repeat(params.T, n_obs, axis=1)
+        xdata_obs = np.transpose(xdata, (1, 0, 2)).reshape(n_x, -1)
+
+        molefrac_raw, _ = self.design(params_obs, xdata_obs)
+        return np.transpose(
+            molefrac_raw.reshape(-1, n_batch, n_obs), (1, 0, 2)
+        )
+
+    def design_jacobian(self, params, xdata):
+        """Calculate derivatives of the design matrix with respect to the
+        model parameters.
+
+        Calculated by forward finite differences of `design`, with all
+        shifted parameter sets evaluated in one batch (see `design_batch`).
+        Overridden by the objective mixins to use analytic derivatives where
+        the model function provides them.
+
+        Returns
+        -------
+        d_molefrac_raw : `ndarray`
+            P x C x M array, derivative of the C x M design matrix (see
+            `design`) with respect to each of the P parameters.
+        """
+        params = np.asarray(params, dtype=np.float64)
+        molefrac_raw, _ = self.design(params, xdata)
+
+        # One parameter set per parameter, each with one parameter shifted
+        step = np.sqrt(np.finfo(np.float64).eps) * np.maximum(
+            np.abs(params), 1.0
+        )
+        molefrac_raw_shift = self.design_batch(params + np.diag(step), xdata)
+
+        return (molefrac_raw_shift - molefrac_raw) / step[
+            :, np.newaxis, np.newaxis
+        ]
+
+    def jacobian(self, params, xdata, ydata, *args, **kwargs):
+        """Jacobian of the residual vector objective function.
+
+        Golub-Pereyra variable projection: the linear fit coefficients are
+        eliminated by projection onto the column space of the design matrix
+        A, so the residuals (A A+ - I) Y depend only on the nonlinear
+        parameters. Their derivatives are calculated from the derivatives of
+        the design matrix (see `design_jacobian`).
+
+        Parameters
+        ----------
+        params : `ndarray`
+            Array of model parameters.
+        datax : `ndarray`
+            X x M array of X independent variables, M observations.
+        datay : `ndarray`
+            Y x M array of Y dependent variables, M observations.
+
+        Returns
+        -------
+        jac : `ndarray`
+            (Y * M) x P matrix, derivatives of the flattened residuals (see
+            `residuals`) with respect to each of the P parameters.
+        """
+        molefrac_raw, _ = self.design(params, xdata)
+        d_a = np.transpose(self.design_jacobian(params, xdata), (0, 2, 1))
+
+        # Thin SVD of the M x C design matrix A, truncated to its numerical
+        # rank (matching np.linalg.lstsq)
+        u, s, vt = np.linalg.svd(molefrac_raw.T, full_matrices=False)
+        rank = _numerical_rank(s, molefrac_raw.shape)
+        u, s, vt = u[:, rank], s[rank], vt[rank]
+
+        # Linear coefficients and residuals of the projected problem
+        uty = u.T.dot(ydata.T)
+        coeffs_raw = vt.T.dot(uty / s[:, np.newaxis])
+        r = ydata.T - u.dot(uty)
+
+        # d(A A+)/dp Y = P dA A+ Y + (A+)' dA' P Y, P = I - A A+
+        d_a_c = np.einsum("pmc,ck->pmk", d_a, coeffs_raw)
+        term1 = d_a_c - np.einsum(
+            "mr,prk->pmk", u, np.einsum("mr,pmk->prk", u, d_a_c)
+        )
+        d_a_r = np.einsum("pmc,mk->pck", d_a, r)
+        term2 = np.einsum(
+            "mr,prk->pmk",
+            u,
+            np.einsum("rc,pck->prk", vt, d_a_r) / s[:, np.newaxis],
+        )
+
+        # Flatten in the same order as the residual vector
+        d_fit = term1 + term2
+        return np.transpose(d_fit, (0, 2, 1)).reshape(d_fit.shape[0], -1).T
+
     def format_x(self, xdata):
         pass
 
@@ -122,6 +561,33 @@ class BaseFunction:
         pass
 
 
+def _numerical_rank(s, shape):
+    # Mask of the singular values s of a matrix (or stack of matrices) of
+    # shape that are above its rounding error, the cutoff np.linalg.lstsq
+    # uses with rcond=None. Design matrices that are rank deficient in exact
+    # arithmetic have singular values of this size, which would otherwise
+    # fit noise with huge coefficients.
+    tol = np.finfo(np.float64).eps * max(shape[-2:])
+    return s > tol * s.max(axis=-1, keepdims=True)
+
+
+def _memo_key(kind, params, arrays):
+    # Memo key from exact parameter values and input array identities
+    return (
+        kind,
+        np.asarray(params, dtype=np.float64).tobytes(),
+        tuple(id(a) for a in arrays),
+    )
+
+
+def _memo_copy(value):
+    # Copy memoised arrays, so callers can't modify memoised results
+    if isinstance(value, tuple):
+        return tuple(np.copy(v) for v in value)
+    else:
+        return np.copy(value)
+
+
 # =============================================================================
 # Objective function mixins
 
@@ -145,28 +611,64 @@ class BindingMixin:
         sum of least squares for optimisation OR full parameters, residuals and
         fitted results.
         """
+        fit, residuals, coeffs_raw, molefrac_raw, molefrac = self.evaluate(
+            params, xdata, ydata, fit_coeffs=fit_coeffs
+        )
+
+        if scalar:
+            return np.square(residuals).sum()
+        else:
+            # Return full fit with formatted molefrac and coeffs
+            coeffs = self.format_coeffs(
+                coeffs_raw, ydata_init=ydata_init, h0_init=xdata[0][0]
+            )
+
+            return fit, residuals, coeffs_raw, molefrac_raw, coeffs, molefrac
+
+    @property
+    def separable(self):
+        # UV coefficients are restricted to positive values when not
+        # normalised
+        return self.normalise or "uv" not in self.fitter
+
+    def design(self, params, xdata):
         # Calculate predicted HG complex concentrations for this set of
         # parameters and concentrations
-        molefrac_raw, molefrac = self.f(params, xdata, flavour=self.flavour)
+        molefrac_raw, molefrac = self.speciate(params, xdata)
 
         if self.normalise:
             # Don't fit first H column if initial values subtracted
             molefrac_raw = molefrac_raw[1:]
 
+        return molefrac_raw, molefrac
+
+    def design_jacobian(self, params, xdata):
+        result = self.speciate(params, xdata, derivatives=True)
+
+        if len(result) < 3:
+            # No analytic derivatives, use finite differences
+            return super().design_jacobian(params, xdata)
+
+        d_molefrac_raw = result[2]
+
+        if self.normalise:
+            # Don't fit first H column if initial values subtracted
+            d_molefrac_raw = d_molefrac_raw[:, 1:]
+
+        return d_molefrac_raw
+
+    def evaluate(self, params, xdata, ydata, fit_coeffs=None):
+        molefrac_raw, molefrac = self.design(params, xdata)
+
         if fit_coeffs is not None:
             coeffs_raw = fit_coeffs
         else:
             # Solve by matrix division - linear regression by least squares
-            # This is equivalent to
-            # << coeffs = molefrac\ydata (EA = HG\DA) >>
-            # in Matlab
-            coeffs_raw, _, _, _ = np.linalg.lstsq(
-                molefrac_raw.T, ydata.T, rcond=-1
-            )
+            coeffs_raw = self.solve_coeffs(params, xdata, ydata, molefrac_raw)
 
         # Restrict UV coefficients to positive values when normalised
         if not self.normalise and "uv" in self.fitter:
-            coeffs_raw[coeffs_raw < 0] = 0
+            coeffs_raw = np.maximum(coeffs_raw, 0)
 
         # Calculate data from fitted parameters
         # (will be normalised if input data was normalised)
@@ -177,15 +679,7 @@ class BindingMixin:
         # Calculate residuals (fitted data - input data)
         residuals = fit - ydata
 
-        if scalar:
-            return np.square(residuals).sum()
-        else:
-            # Return full fit with formatted molefrac and coeffs
-            coeffs = self.format_coeffs(
-                coeffs_raw, ydata_init=ydata_init, h0_init=xdata[0][0]
-            )
-
-            return fit, residuals, coeffs_raw, molefrac_raw, coeffs, molefrac
+        return fit, residuals, coeffs_raw, molefrac_raw, molefrac
 
     def format_x(self, xdata):
         h0 = xdata[0]
@@ -212,18 +706,8 @@ class BindingMixin:
                 h /= h0_init
 
             # Calc and add first row of coeffs using excluded initial values
-            rows = coeffs.shape[0]
-            if rows == 1:
-                # 1:1 system
-                hg = h + coeffs[0]
-                return np.vstack((h, hg))
-            elif rows == 2:
-                # 1:2 or 2:1 system
-                hg = h + coeffs[0]
-                hg2 = h + coeffs[1]
-                return np.vstack((h, hg, hg2))
-            else:
-                pass  # Throw error here
+            # (coefficients for each complex are relative to H)
+            return np.vstack((h, h + coeffs))
         else:
             return coeffs
 
@@ -256,20 +740,52 @@ class AggMixin:
         **kwargs,
     ):
         """Dimer aggregation objective function."""
+        fit, residuals, coeffs_raw, hmat, molefrac = self.evaluate(
+            params, xdata, ydata, fit_coeffs=fit_coeffs
+        )
+
+        # Transpose any column-matrices to rows
+        if scalar:
+            return np.square(residuals).sum()
+        else:
+            # Return full fit with formatted molefrac and coeffs
+            coeffs = self.format_coeffs(
+                coeffs_raw, ydata_init=ydata_init, h0_init=xdata[0][0]
+            )
+            return fit, residuals, coeffs_raw, hmat, coeffs, molefrac
+
+    def design(self, params, xdata):
         # Calculate predicted complex concentrations for this set of
         # parameters and concentrations
-        molefrac_raw, molefrac = self.f(params, xdata, flavour=self.flavour)
+        molefrac_raw, molefrac = self.speciate(params, xdata)
         h = molefrac_raw[0]
         hs = molefrac_raw[1]
         he = molefrac_raw[2]
         hmat = np.array([h + he / 2, hs + he / 2])
 
+        return hmat, molefrac
+
+    def design_jacobian(self, params, xdata):
+        result = self.speciate(params, xdata, derivatives=True)
+
+        if len(result) < 3:
+            # No analytic derivatives, use finite differences
+            return super().design_jacobian(params, xdata)
+
+        dh = result[2][:, 0]
+        dhs = result[2][:, 1]
+        dhe = result[2][:, 2]
+        return np.stack((dh + dhe / 2, dhs + dhe / 2), axis=1)
+
+    def evaluate(self, params, xdata, ydata, fit_coeffs=None):
+        hmat, molefrac = self.design(params, xdata)
+
         # Solve by matrix division - linear regression by least squares
         # Equivalent to << coeffs = molefrac\ydata (EA = HG\DA) >> in Matlab
         if fit_coeffs is not None:
             coeffs_raw = fit_coeffs
         else:
-            coeffs_raw, _, _, _ = np.linalg.lstsq(hmat.T, ydata.T)
+            coeffs_raw = self.solve_coeffs(params, xdata, ydata, hmat)
 
         # Calculate data from fitted parameters
         # (will be normalised since input data was norm'd)
@@ -280,15 +796,7 @@ class AggMixin:
         # Calculate residuals (fitted data - input data)
         residuals = fit - ydata
 
-        # Transpose any column-matrices to rows
-        if scalar:
-            return np.square(residuals).sum()
-        else:
-            # Return full fit with formatted molefrac and coeffs
-            coeffs = self.format_coeffs(
-                coeffs_raw, ydata_init=ydata_init, h0_init=xdata[0][0]
-            )
-            return fit, residuals, coeffs_raw, hmat, coeffs, molefrac
+        return fit, residuals, coeffs_raw, hmat, molefrac
 
     def format_x(self, xdata):
         return xdata[0]
@@ -344,6 +852,11 @@ class FunctionAgg(AggMixin, BaseFunction):
 class FunctionInhibitorResponse(FunctionBinding):
     """log(inhibitor) vs. normalised response test definition."""
 
+    @property
+    def separable(self):
+        # No linear fit coefficients
+        return False
+
     def objective(self, params, xdata, ydata, scalar=False, *args, **kwargs):
         yfit = self.f(params, xdata)
         yfit = yfit[np.newaxis]
@@ -375,11 +888,196 @@ def inhibitor_response(params, xdata, *args, **kwargs):
     return response
 
 
+# =============================================================================
+# Speciation derivative helpers
+
+
+def _stepwise_derivatives(ks, dk):
+    """Calculate overall formation constants from stepwise binding constants,
+    and their derivatives with respect to the model parameters.
+
+    Parameters
+    ----------
+    ks : `list`
+        K stepwise binding constants [k11, k12, ...].
+    dk : `ndarray`
+        K x P array, derivatives of the stepwise binding constants with
+        respect to the P model parameters.
+
+    Returns
+    -------
+    betas : `ndarray`
+        Length K + 1 array of overall formation constants
+        [1, k11, k11 * k12, ...].
+    dbetas : `ndarray`
+        P x (K + 1) array, derivatives of betas with respect to the model
+        parameters.
+    """
+    ks = np.asarray(ks, dtype=np.float64)
+    betas = np.cumprod(np.concatenate(([1.0], ks)))
+
+    # d(beta_j)/d(k_i) is the product of the first j constants except k_i
+    dbetas_dk = np.zeros((ks.shape[0], ks.shape[0] + 1))
+    for i in range(ks.shape[0]):
+        for j in range(i + 1, ks.shape[0] + 1):
+            dbetas_dk[i, j] = np.prod(np.delete(ks[:j], i))
+
+    return betas, dk.T.dot(dbetas_dk)
+
+
+def _root_fraction_derivatives(x, poly, betas, dbetas, x0, y0):
+    """Calculate derivatives of species fractions for the polynomial models.
+
+    The polynomial models solve the mass balance
+
+        sum(beta_j * (x^(j + 1) + (j * y0 - x0) * x^j)) = 0
+
+    for the free concentration x of one component (total x0). The fractions
+    of the other component (total y0) in each species are then
+    f_j = beta_j * x^j / sum(beta_i * x^i). Derivatives of x are calculated by
+    implicit differentiation of the polynomial at its root.
+
+    Parameters
+    ----------
+    x : `ndarray`
+        Length N array of polynomial roots (free concentrations).
+    poly : `ndarray`
+        N x (K + 2) array of polynomial coefficients.
+    betas : `ndarray`
+        Length K + 1 array of overall formation constants, see
+        `_stepwise_derivatives`.
+    dbetas : `ndarray`
+        P x (K + 1) array, derivatives of betas.
+    x0 : `ndarray`
+        Length N array of total concentrations of the solved component.
+    y0 : `ndarray`
+        Length N array of total concentrations of the other component.
+
+    Returns
+    -------
+    df : `ndarray`
+        P x (K + 1) x N array, derivatives of the species fractions with
+        respect to the P model parameters.
+    """
+    j = np.arange(betas.shape[0])[:, np.newaxis]
+    xj = x**j
+    dxj = j * x ** np.maximum(j - 1, 0)
+
+    # Implicit differentiation: dx = -(dpoly/dbeta . dbeta) / (dpoly/dx)
+    dpoly_dbetas = x * xj + (j * y0 - x0) * xj
+    dpoly_dx = solvers.polyval(solvers.polyder(poly), x[:, np.newaxis])[:, 0]
+    dx = -dbetas.dot(dpoly_dbetas) / dpoly_dx
+
+    # Species fractions f_j = n_j / sum(n), n_j = beta_j * x^j
+    n = betas[:, np.newaxis] * xj
+    dn = (
+        dbetas[:, :, np.newaxis] * xj
+        + (betas[:, np.newaxis] * dxj) * dx[:, np.newaxis, :]
+    )
+    n_sum = n.sum(axis=0)
+    dn_sum = dn.sum(axis=1)
+
+    return (dn - (n / n_sum) * dn_sum[:, np.newaxis, :]) / n_sum
+
+
+def _stack_derivatives(h, dh, u, du, rho, drho):
+    """Calculate derivatives of the in stack and at end fractions of the
+    aggregation models.
+
+    hs = rho * h * w^2 / (1 - w)^2 and he = 2 * rho * h * w / (1 - w), with
+    w = h * u, u = ke * h0 (Thordarson book chapter eqs 149, 150).
+
+    Parameters
+    ----------
+    h : `ndarray`
+        Length N array of free monomer fractions.
+    dh, du : `ndarray`
+        P x N arrays, derivatives of h and u.
+    rho : `float`
+        Cooperativity factor.
+    drho : `ndarray`
+        P x 1 array, derivatives of rho.
+
+    Returns
+    -------
+    dhs, dhe : `ndarray`
+        P x N arrays, derivatives of hs and he.
+    """
+    w = h * u
+    dw = dh * u + h * du
+
+    dhs = drho * h * w * w / (1 - w) ** 2 + rho * (
+        dh * w * w / (1 - w) ** 2 + h * 2 * w / (1 - w) ** 3 * dw
+    )
+    dhe = 2 * (
+        drho * h * w / (1 - w)
+        + rho * (dh * w / (1 - w) + h * dw / (1 - w) ** 2)
+    )
+
+    return dhs, dhe
+
+
+def _dimer_derivatives(h, ke, h0):
+    """Calculate derivatives of the dimer model fractions with respect to ke.
+
+    Returns
+    -------
+    dh, dhs, dhe : `ndarray`
+        1 x N arrays, derivatives of the free, in stack and at end fractions.
+    """
+    h = np.real(h)
+    u = ke * h0
+
+    # Closed form derivative of eq 143 with respect to u = ke * h0
+    dh_du = ((2 - 2 / np.sqrt(4 * u + 1)) - h * 4 * u) / (2 * u * u)
+
+    dh = (h0 * dh_du)[np.newaxis]
+    du = h0[np.newaxis]
+    dhs, dhe = _stack_derivatives(h, dh, u, du, 1.0, np.zeros((1, 1)))
+
+    return dh, dhs, dhe
+
+
+def _coek_derivatives(h, poly, ke, rho, h0):
+    """Calculate derivatives of the cooperative aggregation model fractions
+    with respect to [ke, rho].
+
+    Returns
+    -------
+    dh, dhs, dhe : `ndarray`
+        2 x N arrays, derivatives of the free, in stack and at end fractions.
+    """
+    u = ke * h0
+    zero = np.zeros(h0.shape[0])
+
+    # Derivatives of the eq 146 polynomial coefficients
+    dpoly = np.array(
+        [
+            np.column_stack(
+                (
+                    h0 * 2 * u * (1 - rho),
+                    h0 * (2 * rho - 2 - 2 * u),
+                    h0 * 2,
+                    zero,
+                )
+            ),
+            np.column_stack((-u * u, 2 * u, zero, zero)),
+        ]
+    )
+    dh = solvers.root_derivative(poly, dpoly, h)
+
+    du = np.array([h0, zero])
+    drho = np.array([[0.0], [1.0]])
+    dhs, dhe = _stack_derivatives(h, dh, u, du, rho, drho)
+
+    return dh, dhs, dhe
+
+
 # =============================================================================
 # Fitting function definitions
 
 
-def nmr_1to1(params, xdata, *args, **kwargs):
+def nmr_1to1(params, xdata, derivatives=False, *args, **kwargs):
     """Calculates predicted [HG] given data object parameters
     as input for NMR data."""
     k = params[0]
@@ -408,10 +1106,18 @@ def nmr_1to1(params, xdata, *args, **kwargs):
     hg_mat_fit = np.vstack((h, hg))
     hg_mat = np.vstack((h, hg))
 
+    if derivatives:
+        # d[HG]/dk in closed form, zero where solution was replaced
+        s = g0 + h0 + (1 / k)
+        dhg = 0.5 * (-1 / (k * k)) * (1 - s / np.sqrt(s * s - 4 * g0 * h0))
+        dhg[inds] = 0
+        dhg /= h0
+        return hg_mat_fit, hg_mat, np.array([[-dhg, dhg]])
+
     return hg_mat_fit, hg_mat
 
 
-def uv_1to1(params, xdata, *args, **kwargs):
+def uv_1to1(params, xdata, derivatives=False, *args, **kwargs):
     """Calculates predicted [HG] given data object parameters as input."""
     k = params[0]
 
@@ -434,10 +1140,25 @@ def uv_1to1(params, xdata, *args, **kwargs):
     hg_mat_fit = np.vstack((h, hg))  # Free concentration for correct fitting
     hg_mat = np.vstack((h / h0, hg / h0))  # Molefrac for display
 
+    if derivatives:
+        # d[HG]/dk in closed form, zero where solution was replaced
+        s = g0 + h0 + (1 / k)
+        dhg = 0.5 * (-1 / (k * k)) * (1 - s / np.sqrt(s * s - 4 * g0 * h0))
+        dhg[inds] = 0
+        return hg_mat_fit, hg_mat, np.array([[-dhg, dhg]])
+
     return hg_mat_fit, hg_mat
 
 
-def uv_1to2(params, xdata, flavour="none", *args, **kwargs):
+def uv_1to2(
+    params,
+    xdata,
+    flavour="none",
+    state=None,
+    derivatives=False,
+    *args,
+    **kwargs,
+):
     """Calculates predicted [HG] and [HG2] given data object and binding
     constants as input for UV data.
     """
@@ -460,21 +1181,9 @@ def uv_1to2(params, xdata, flavour="none", *args, **kwargs):
     # Rows: data points, cols: poly coefficients
     poly = np.column_stack((a, b, c, d))
 
-    # Solve cubic in [G] for each observation
-    g = np.zeros(h0.shape[0])
-    for i, p in enumerate(poly):
-        roots = np.roots(p)
-
-        # Smallest real +ve root is [G]
-        select = np.all([np.imag(roots) == 0, np.real(roots) >= 0], axis=0)
-        if select.any():
-            soln = roots[select].min()
-            soln = float(np.real(soln))
-        else:
-            # No positive real roots, set solution to 0
-            soln = 0.0
-
-        g[i] = soln
+    # Solve cubic in [G] for all observations: smallest real +ve
+    # root is [G]
+    g = solvers.positive_root(poly, state=state)
 
     # Calculate [HG] and [HG2] complex concentrations
     hg = h0 * ((g * k11) / (1 + (g * k11) + (g * g * k11 * k12)))
@@ -488,10 +1197,35 @@ def uv_1to2(params, xdata, flavour="none", *args, **kwargs):
         hg_mat_fit = np.vstack((h, hg, hg2))
 
     hg_mat = np.vstack((h / h0, hg / h0, hg2 / h0))  # Display-only molefracs
+
+    if derivatives:
+        # Derivatives of [k11, k12] with respect to the parameters
+        if flavour == "noncoop" or flavour == "stat":
+            dk = np.array([[1.0], [0.25]])
+        else:
+            dk = np.eye(2)
+        betas, dbetas = _stepwise_derivatives([k11, k12], dk)
+        df = h0 * _root_fraction_derivatives(g, poly, betas, dbetas, g0, h0)
+
+        if flavour == "add" or flavour == "stat":
+            d_hg_mat_fit = np.stack((df[:, 0], df[:, 1] + 2 * df[:, 2]), 1)
+        else:
+            d_hg_mat_fit = df
+
+        return hg_mat_fit, hg_mat, d_hg_mat_fit
+
     return hg_mat_fit, hg_mat
 
 
-def nmr_1to2(params, xdata, flavour="none", *args, **kwargs):
+def nmr_1to2(
+    params,
+    xdata,
+    flavour="none",
+    state=None,
+    derivatives=False,
+    *args,
+    **kwargs,
+):
     """Calculates predicted [HG] and [HG2] given data object and binding
     constants as input for NMR data.
     """
@@ -514,21 +1248,9 @@ def nmr_1to2(params, xdata, flavour="none", *args, **kwargs):
     # Rows: data points, cols: poly coefficients
     poly = np.column_stack((a, b, c, d))
 
-    # Solve cubic in [G] for each observation
-    g = np.zeros(h0.shape[0])
-    for i, p in enumerate(poly):
-        roots = np.roots(p)
-
-        # Smallest real +ve root is [G]
-        select = np.all([np.imag(roots) == 0, np.real(roots) >= 0], axis=0)
-        if select.any():
-            soln = roots[select].min()
-            soln = float(np.real(soln))
-        else:
-            # No positive real roots, set solution to 0
-            soln = 0.0
-
-        g[i] = soln
+    # Solve cubic in [G] for all observations: smallest real +ve
+    # root is [G]
+    g = solvers.positive_root(poly, state=state)
 
     # Calculate [HG] and [HG2] complex concentrations
     hg = (g * k11) / (1 + (g * k11) + (g * g * k11 * k12))
@@ -542,10 +1264,35 @@ def nmr_1to2(params, xdata, flavour="none", *args, **kwargs):
         hg_mat_fit = np.vstack((h, hg, hg2))
 
     hg_mat = np.vstack((h, hg, hg2))
+
+    if derivatives:
+        # Derivatives of [k11, k12] with respect to the parameters
+        if flavour == "noncoop" or flavour == "stat":
+            dk = np.array([[1.0], [0.25]])
+        else:
+            dk = np.eye(2)
+        betas, dbetas = _stepwise_derivatives([k11, k12], dk)
+        df = _root_fraction_derivatives(g, poly, betas, dbetas, g0, h0)
+
+        if flavour == "add" or flavour == "stat":
+            d_hg_mat_fit = np.stack((df[:, 0], df[:, 1] + 2 * df[:, 2]), 1)
+        else:
+            d_hg_mat_fit = df
+
+        return hg_mat_fit, hg_mat, d_hg_mat_fit
+
     return hg_mat_fit, hg_mat
 
 
-def uv_1to3(params, xdata, flavour="none", *args, **kwargs):
+def uv_1to3(
+    params,
+    xdata,
+    flavour="none",
+    state=None,
+    derivatives=False,
+    *args,
+    **kwargs,
+):
     """Calculates predicted [HG], [HG2], and [HG3] given data object and
     binding constants as input for NMR data.
     """
@@ -570,20 +1317,8 @@ def uv_1to3(params, xdata, flavour="none", *args, **kwargs):
 
     poly = np.column_stack((a, b, c, d, e))
 
-    g = np.zeros(h0.shape[0])
-    for i, p in enumerate(poly):
-        roots = np.roots(p)
-
-        # Smallest real +ve root is [G]
-        select = np.all([np.imag(roots) == 0, np.real(roots) >= 0], axis=0)
-        if select.any():
-            soln = roots[select].min()
-            soln = float(np.real(soln))
-        else:
-            # No positive real roots, set solution to 0
-            soln = 0.0
-
-        g[i] = soln
+    # Smallest real +ve root is [G]
+    g = solvers.positive_root(poly, state=state)
 
     hg = (g * k11) / (
         1 + (g * k11) + (g * g * k11 * k12) + (g * g * g * k11 * k12 * k13)
@@ -592,7 +1327,7 @@ def uv_1to3(params, xdata, flavour="none", *args, **kwargs):
         1 + (g * k11) + (g * g * k11 * k12) + (g * g * g * k11 * k12 * k13)
     )
     hg3 = (g * g * g * k11 * k12 * k13) / (
-        1 + (g * k11) + (g * g * k11 * k12) + (b * g * g * k11 * k12 * k13)
+        1 + (g * k11) + (g * g * k11 * k12) + (g * g * g * k11 * k12 * k13)
     )
 
     h = h0 - hg - hg2 - hg3
@@ -600,9 +1335,32 @@ def uv_1to3(params, xdata, flavour="none", *args, **kwargs):
     hg_mat_fit = np.vstack((h, hg, hg2, hg3))
     hg_mat = np.vstack((h, hg, hg2, hg3))
 
+    if derivatives:
+        # Derivatives of [k11, k12, k13] with respect to the parameters
+        if flavour == "noncoop":
+            dk = np.array([[1.0], [1 / 3], [1 / 9]])
+        else:
+            dk = np.eye(3)
+        betas, dbetas = _stepwise_derivatives([k11, k12, k13], dk)
+        df = _root_fraction_derivatives(g, poly, betas, dbetas, g0, h0)
+
+        # Free host row is the remainder
+        df[:, 0] = -df[:, 1:].sum(axis=1)
+
+        return hg_mat_fit, hg_mat, df
+
     return hg_mat_fit, hg_mat
 
-def nmr_1to3(params, xdata, flavour="none", *args, **kwargs):
+
+def nmr_1to3(
+    params,
+    xdata,
+    flavour="none",
+    state=None,
+    derivatives=False,
+    *args,
+    **kwargs,
+):
     """Calculates predicted [HG], [HG2], and [HG3] given data object and
     binding constants as input.
     """
@@ -628,20 +1386,8 @@ def nmr_1to3(params, xdata, flavour="none", *args, **kwargs):
 
     poly = np.column_stack((a, b, c, d, e))
 
-    g = np.zeros(h0.shape[0])
-    for i, p in enumerate(poly):
-        roots = np.roots(p)
-
-        # Smallest real +ve root is [G]
-        select = np.all([np.imag(roots) == 0, np.real(roots) >= 0], axis=0)
-        if select.any():
-            soln = roots[select].min()
-            soln = float(np.real(soln))
-        else:
-            # No positive real roots, set solution to 0
-            soln = 0.0
-
-        g[i] = soln
+    # Smallest real +ve root is [G]
+    g = solvers.positive_root(poly, state=state)
 
     hg = (g * k11) / (
         1 + (g * k11) + (g * g * k11 * k12) + (g * g * g * k11 * k12 * k13)
@@ -650,7 +1396,7 @@ def nmr_1to3(params, xdata, flavour="none", *args, **kwargs):
         1 + (g * k11) + (g * g * k11 * k12) + (g * g * g * k11 * k12 * k13)
     )
     hg3 = (g * g * g * k11 * k12 * k13) / (
-        1 + (g * k11) + (g * g * k11 * k12) + (b * g * g * k11 * k12 * k13)
+        1 + (g * k11) + (g * g * k11 * k12) + (g * g * g * k11 * k12 * k13)
     )
 
     # h0 in UV
@@ -659,10 +1405,32 @@ def nmr_1to3(params, xdata, flavour="none", *args, **kwargs):
     hg_mat_fit = np.vstack((h, hg, hg2, hg3))
     hg_mat = np.vstack((h, hg, hg2, hg3))
 
+    if derivatives:
+        # Derivatives of [k11, k12, k13] with respect to the parameters
+        if flavour == "noncoop":
+            dk = np.array([[1.0], [1 / 3], [1 / 9]])
+        else:
+            dk = np.eye(3)
+        betas, dbetas = _stepwise_derivatives([k11, k12, k13], dk)
+        df = _root_fraction_derivatives(g, poly, betas, dbetas, g0, h0)
+
+        # Free host row is the remainder
+        df[:, 0] = -df[:, 1:].sum(axis=1)
+
+        return hg_mat_fit, hg_mat, df
+
     return hg_mat_fit, hg_mat
 
 
-def nmr_2to1(params, xdata, flavour="none", *args, **kwargs):
+def nmr_2to1(
+    params,
+    xdata,
+    flavour="none",
+    state=None,
+    derivatives=False,
+    *args,
+    **kwargs,
+):
     """Calculates predicted [HG] and [H2G] given data object and binding
     constants as input for NMR data.
     """
@@ -684,22 +1452,10 @@ def nmr_2to1(params, xdata, flavour="none", *args, **kwargs):
     # Rows: data points, cols: poly coefficients
     poly = np.column_stack((a, b, c, d))
 
-    # Solve cubic in [H] for each observation
-    h = np.zeros(h0.shape[0])
-
-    for i, p in enumerate(poly):
-        roots = np.roots(p)
-
-        # Smallest real +ve root is [H]
-        select = np.all([np.imag(roots) == 0, np.real(roots) >= 0], axis=0)
-        if select.any():
-            soln = roots[select].min()
-            soln = float(np.real(soln))
-        else:
-            # No positive real roots, set solution to 0
-            soln = 0.0
-
-        h[i] = soln
+    # Solve cubic in [H] for all observations: smallest real +ve
+    # root is [H]
+    h = solvers.positive_root(poly, state=state)
+    h_free = h  # [H] is overwritten below
 
     # Calculate [HG] and [H2G] complex concentrations
     hg = (g0 * h * k11) / (h0 * (1 + (h * k11) + (h * h * k11 * k12)))
@@ -715,10 +1471,38 @@ def nmr_2to1(params, xdata, flavour="none", *args, **kwargs):
         hg_mat_fit = np.vstack((h, hg, h2g))
 
     hg_mat = np.vstack((h, hg, h2g))
+
+    if derivatives:
+        # Derivatives of [k11, k12] with respect to the parameters
+        if flavour == "noncoop" or flavour == "stat":
+            dk = np.array([[1.0], [0.25]])
+        else:
+            dk = np.eye(2)
+        betas, dbetas = _stepwise_derivatives([k11, k12], dk)
+        df = _root_fraction_derivatives(h_free, poly, betas, dbetas, h0, g0)
+
+        d_hg = g0 / h0 * df[:, 1]
+        d_h2g = 2 * g0 / h0 * df[:, 2]
+
+        if flavour == "add" or flavour == "stat":
+            d_hg_mat_fit = np.stack((-d_hg - d_h2g, d_hg + 2 * d_h2g), 1)
+        else:
+            d_hg_mat_fit = np.stack((-d_hg - d_h2g, d_hg, d_h2g), 1)
+
+        return hg_mat_fit, hg_mat, d_hg_mat_fit
+
     return hg_mat_fit, hg_mat
 
 
-def nmr_3to1(params, xdata, flavour="none", *args, **kwargs):
+def nmr_3to1(
+    params,
+    xdata,
+    flavour="none",
+    state=None,
+    derivatives=False,
+    *args,
+    **kwargs,
+):
     """Calculates predicted [HG], [H2G], and [H3G] given data object and
     binding constants as input.
     """
@@ -744,20 +1528,8 @@ def nmr_3to1(params, xdata, flavour="none", *args, **kwargs):
 
     poly = np.column_stack((a, b, c, d, e))
 
-    g = np.zeros(h0.shape[0])
-    for i, p in enumerate(poly):
-        roots = np.roots(p)
-
-        # Smallest real +ve root is [G]
-        select = np.all([np.imag(roots) == 0, np.real(roots) >= 0], axis=0)
-        if select.any():
-            soln = roots[select].min()
-            soln = float(np.real(soln))
-        else:
-            # No positive real roots, set solution to 0
-            soln = 0.0
-
-        g[i] = soln
+    # Smallest real +ve root is [G]
+    g = solvers.positive_root(poly, state=state)
 
     hg = (
         (1 / h0)
@@ -772,7 +1544,7 @@ def nmr_3to1(params, xdata, flavour="none", *args, **kwargs):
     h3g = (
         (1 / h0)
         * (g * g * g * k11 * k12 * k13)
-        / (1 + (g * k11) + (g * g * k11 * k12) + (b * g * g * k11 * k12 * k13))
+        / (1 + (g * k11) + (g * g * k11 * k12) + (g * g * g * k11 * k12 * k13))
     )
 
     # We don't use h0 because NMR is chemical shift, UV is absorbance
@@ -781,10 +1553,32 @@ def nmr_3to1(params, xdata, flavour="none", *args, **kwargs):
     hg_mat_fit = np.vstack((h, hg, h2g, h3g))
     hg_mat = np.vstack((h, hg, h2g, h3g))
 
+    if derivatives:
+        # Derivatives of [k11, k12, k13] with respect to the parameters
+        if flavour == "noncoop":
+            dk = np.array([[1.0], [1 / 3], [1 / 9]])
+        else:
+            dk = np.eye(3)
+        betas, dbetas = _stepwise_derivatives([k11, k12, k13], dk)
+        df = _root_fraction_derivatives(g, poly, betas, dbetas, g0, h0) / h0
+
+        # Free host row is the remainder
+        df[:, 0] = -df[:, 1:].sum(axis=1)
+
+        return hg_mat_fit, hg_mat, df
+
     return hg_mat_fit, hg_mat
 
 
-def uv_2to1(params, xdata, flavour="none"):
+def uv_2to1(
+    params,
+    xdata,
+    flavour="none",
+    state=None,
+    derivatives=False,
+    *args,
+    **kwargs,
+):
     """Calculates predicted [HG] and [H2G] given data object and binding
     constants as input for UV data.
     """
@@ -807,21 +1601,10 @@ def uv_2to1(params, xdata, flavour="none"):
     # Rows: data points, cols: poly coefficients
     poly = np.column_stack((a, b, c, d))
 
-    # Solve cubic in [H] for each observation
-    h = np.zeros(h0.shape[0])
-
-    for i, p in enumerate(poly):
-        roots = np.roots(p)
-        # Smallest real +ve root is [H]
-        select = np.all([np.imag(roots) == 0, np.real(roots) >= 0], axis=0)
-        if select.any():
-            soln = roots[select].min()
-            soln = float(np.real(soln))
-        else:
-            # No positive real roots, set solution to 0
-            soln = 0.0
-
-        h[i] = soln
+    # Solve cubic in [H] for all observations: smallest real +ve
+    # root is [H]
+    h = solvers.positive_root(poly, state=state)
+    h_free = h  # [H] is overwritten below
 
     # Calculate [HG] and [H2G] complex concentrations
     hg = g0 * ((h * k11) / (1 + (h * k11) + (h * h * k11 * k12)))
@@ -837,10 +1620,38 @@ def uv_2to1(params, xdata, flavour="none"):
         hg_mat_fit = np.vstack((h, hg, h2g))
 
     hg_mat = np.vstack((h / h0, hg / h0, h2g / h0))  # Molefrac for display
+
+    if derivatives:
+        # Derivatives of [k11, k12] with respect to the parameters
+        if flavour == "noncoop" or flavour == "stat":
+            dk = np.array([[1.0], [0.25]])
+        else:
+            dk = np.eye(2)
+        betas, dbetas = _stepwise_derivatives([k11, k12], dk)
+        df = _root_fraction_derivatives(h_free, poly, betas, dbetas, h0, g0)
+
+        d_hg = g0 * df[:, 1]
+        d_h2g = 2 * g0 * df[:, 2]
+
+        if flavour == "add" or flavour == "stat":
+            d_hg_mat_fit = np.stack((-d_hg - d_h2g, d_hg + 2 * d_h2g), 1)
+        else:
+            d_hg_mat_fit = np.stack((-d_hg - d_h2g, d_hg, d_h2g), 1)
+
+        return hg_mat_fit, hg_mat, d_hg_mat_fit
+
     return hg_mat_fit, hg_mat
 
 
-def uv_3to1(params, xdata, flavour="none", *args, **kwargs):
+def uv_3to1(
+    params,
+    xdata,
+    flavour="none",
+    state=None,
+    derivatives=False,
+    *args,
+    **kwargs,
+):
     """Calculates predicted [HG], [H2G], and [H3G] given data object and
     binding constants as input for UV data.
     """
@@ -866,20 +1677,8 @@ def uv_3to1(params, xdata, flavour="none", *args, **kwargs):
 
     poly = np.column_stack((a, b, c, d, e))
 
-    g = np.zeros(h0.shape[0])
-    for i, p in enumerate(poly):
-        roots = np.roots(p)
-
-        # Smallest real +ve root is [G]
-        select = np.all([np.imag(roots) == 0, np.real(roots) >= 0], axis=0)
-        if select.any():
-            soln = roots[select].min()
-            soln = float(np.real(soln))
-        else:
-            # No positive real roots, set solution to 0
-            soln = 0.0
-
-        g[i] = soln
+    # Smallest real +ve root is [G]
+    g = solvers.positive_root(poly, state=state)
 
     hg = (
         (1 / h0)
@@ -894,7 +1693,7 @@ def uv_3to1(params, xdata, flavour="none", *args, **kwargs):
     h3g = (
         (1 / h0)
         * (g * g * g * k11 * k12 * k13)
-        / (1 + (g * k11) + (g * g * k11 * k12) + (b * g * g * k11 * k12 * k13))
+        / (1 + (g * k11) + (g * g * k11 * k12) + (g * g * g * k11 * k12 * k13))
     )
 
     # We don't use h0 because NMR is chemical shift, UV is absorbance
@@ -903,19 +1702,35 @@ def uv_3to1(params, xdata, flavour="none", *args, **kwargs):
     hg_mat_fit = np.vstack((h, hg, h2g, h3g))
     hg_mat = np.vstack((h, hg, h2g, h3g))
 
+    if derivatives:
+        # Derivatives of [k11, k12, k13] with respect to the parameters
+        if flavour == "noncoop":
+            dk = np.array([[1.0], [1 / 3], [1 / 9]])
+        else:
+            dk = np.eye(3)
+        betas, dbetas = _stepwise_derivatives([k11, k12, k13], dk)
+        df = _root_fraction_derivatives(g, poly, betas, dbetas, g0, h0) / h0
+
+        # Free host row is the remainder
+        df[:, 0] = -df[:, 1:].sum(axis=1)
+
+        return hg_mat_fit, hg_mat, df
+
     return hg_mat_fit, hg_mat
 
 
-def nmr_dimer(params, xdata, *args, **kwargs):
+def nmr_dimer(params, xdata, derivatives=False, *args, **kwargs):
     """Calculates predicted [H] [Hs] and [He] given data object and binding
     constant as input for NMR data.
     """
     ke = params[0]
     h0 = xdata[0]
 
-    if ke == 0:
+    if np.all(ke == 0):
         # Avoid dividing by zero ...
         mf = np.array([h0 * 0, h0 * 0, h0 * 0])
+        if derivatives:
+            return mf, mf, mf[np.newaxis]
         return mf, mf
 
     # Calculate free monomer concentration [H] or alpha:
@@ -934,19 +1749,26 @@ def nmr_dimer(params, xdata, *args, **kwargs):
 
     mf_fit = np.vstack((h, hs, he))
     mf = np.vstack((h, hs, he))
+
+    if derivatives:
+        dh, dhs, dhe = _dimer_derivatives(h, ke, h0)
+        return mf_fit, mf, np.stack((dh, dhs, dhe), 1)
+
     return mf_fit, mf
 
 
-def uv_dimer(params, xdata, *args, **kwargs):
+def uv_dimer(params, xdata, derivatives=False, *args, **kwargs):
     """Calculates predicted [H] [Hs] and [He] given data object and binding
     constant as input for UV data.
     """
     ke = params[0]
     h0 = xdata[0]
 
-    if ke == 0:
+    if np.all(ke == 0):
         # Avoid dividing by zero ...
         mf = np.array([h0 * 0, h0 * 0, h0 * 0])
+        if derivatives:
+            return mf, mf, mf[np.newaxis]
         return mf, mf
 
     # Calculate free monomer concentration [H] or alpha:
@@ -968,10 +1790,15 @@ def uv_dimer(params, xdata, *args, **kwargs):
 
     mf_fit = np.vstack((hc, hs, he))  # Free concentration for fitting
     mf = np.vstack((hc / h0, hs / h0, he / h0))  # Real molefraction
+
+    if derivatives:
+        dh, dhs, dhe = _dimer_derivatives(h, ke, h0)
+        return mf_fit, mf, h0 * np.stack((dh, dhs, dhe), 1)
+
     return mf_fit, mf
 
 
-def nmr_coek(params, xdata, *args, **kwargs):
+def nmr_coek(params, xdata, state=None, derivatives=False, *args, **kwargs):
     """Calculates predicted [H] [Hs] and [He] given data object and binding
     constants as input for NMR data.
     """
@@ -991,21 +1818,9 @@ def nmr_coek(params, xdata, *args, **kwargs):
     # Rows: data points, cols: poly coefficients
     poly = np.column_stack((a, b, c, d))
 
-    # Solve cubic in [H] for each observation
-    h = np.zeros(h0.shape[0])
-    for i, p in enumerate(poly):
-        roots = np.roots(p)
-
-        # Smallest real +ve root is [H]
-        select = np.all([np.imag(roots) == 0, np.real(roots) >= 0], axis=0)
-        if select.any():
-            soln = roots[select].min()
-            soln = float(np.real(soln))
-        else:
-            # No positive real roots, set solution to 0
-            soln = 0.0
-
-        h[i] = soln
+    # Solve cubic in [H] for all observations: smallest real +ve
+    # root is [H]
+    h = solvers.positive_root(poly, state=state)
 
     # Calculate "in stack" concentration [Hs] or epislon:
     # eq 149 from Thordarson book chapter
@@ -1017,10 +1832,15 @@ def nmr_coek(params, xdata, *args, **kwargs):
 
     mf_fit = np.vstack((h, hs, he))
     mf = np.vstack((h, hs, he))
+
+    if derivatives:
+        dh, dhs, dhe = _coek_derivatives(h, poly, ke, rho, h0)
+        return mf_fit, mf, np.stack((dh, dhs, dhe), 1)
+
     return mf_fit, mf
 
 
-def uv_coek(params, xdata, *args, **kwargs):
+def uv_coek(params, xdata, state=None, derivatives=False, *args, **kwargs):
     """Calculates predicted [H] [Hs] and [He] given data object and binding
     constants as input for UV data.
     """
@@ -1040,21 +1860,9 @@ def uv_coek(params, xdata, *args, **kwargs):
     # Rows: data points, cols: poly coefficients
     poly = np.column_stack((a, b, c, d))
 
-    # Solve cubic in [H] for each observation
-    h = np.zeros(h0.shape[0])
-    for i, p in enumerate(poly):
-        roots = np.roots(p)
-
-        # Smallest real +ve root is [H]
-        select = np.all([np.imag(roots) == 0, np.real(roots) >= 0], axis=0)
-        if select.any():
-            soln = roots[select].min()
-            soln = float(np.real(soln))
-        else:
-            # No positive real roots, set solution to 0
-            soln = 0.0
-
-        h[i] = soln
+    # Solve cubic in [H] for all observations: smallest real +ve
+    # root is [H]
+    h = solvers.positive_root(poly, state=state)
 
     # n.b. these fractions are multiplied by h0
 
@@ -1071,14 +1879,102 @@ def uv_coek(params, xdata, *args, **kwargs):
 
     mf_fit = np.vstack((hc, hs, he))  # Free concentration for fitting
     mf = np.vstack((hc / h0, hs / h0, he / h0))  # Real molefraction
+
+    if derivatives:
+        dh, dhs, dhe = _coek_derivatives(h, poly, ke, rho, h0)
+        return mf_fit, mf, h0 * np.stack((dh, dhs, dhe), 1)
+
     return mf_fit, mf
 
 
+def stoichiometry(species, kind="nmr"):
+    """Construct a model function for an arbitrary set of HmGn species.
+
+    Speciation is calculated with the general mass balance engine in
+    `speciation.speciate`. NMR and UV outputs are projections of the species
+    concentrations: host molefractions for NMR, free concentrations for UV.
+
+    Parameters
+    ----------
+    species : list of (m, n) tuples
+        Stoichiometry of each complex species HmGn. The model parameters are
+        the overall formation constants (beta) of each species, named by
+        `speciation.beta_name` (e.g. `b12` for HG2). As for every model
+        function, parameters are passed sorted by name.
+    kind : `string`
+        One of: `nmr`, `uv`.
+
+    Returns
+    -------
+    f : `function`
+        Fitting function with the same signature as e.g. nmr_1to2(...). Its
+        `params` attribute lists the names of its parameters, and `coeffs`
+        the names of its fit coefficients.
+    """
+    species = [(int(m), int(n)) for m, n in species]
+    m = np.array([s[0] for s in species])[:, np.newaxis]
+
+    names = [speciation.beta_name(*s) for s in species]
+    if len(set(names)) < len(names):
+        raise ValueError(f"Duplicate species in {species}")
+
+    # Species of each parameter in sorted name order, and the parameter of
+    # each species
+    order = np.argsort(names)
+    index = np.argsort(order)
+
+    def f(
+        params,
+        xdata,
+        flavour="none",
+        state=None,
+        derivatives=False,
+        *args,
+        **kwargs,
+    ):
+        h0 = xdata[0]
+        g0 = xdata[1]
+
+        betas = [(mi, ni, params[i]) for (mi, ni), i in zip(species, index)]
+        h, g, c = speciation.speciate(betas, h0, g0, state=state)
+
+        # Host molefractions, each complex weighted by its number of hosts
+        mf = np.vstack((h, m * c)) / h0
+
+        if kind == "uv":
+            mf_fit = np.vstack((h, c))  # Free concentration for fitting
+        else:
+            mf_fit = mf
+
+        if derivatives:
+            dh, _, dc = speciation.derivatives(betas, h, g)
+            if kind == "uv":
+                d_mf_fit = np.concatenate((dh[:, np.newaxis], dc), axis=1)
+            else:
+                d_mf_fit = (
+                    np.concatenate((dh[:, np.newaxis], m * dc), axis=1) / h0
+                )
+            # Derivatives by species, in parameter order
+            return mf_fit, mf, d_mf_fit[order]
+
+        return mf_fit, mf
+
+    f.__name__ = "_".join(
+        [kind] + [speciation.species_name(*s) for s in species]
+    )
+    f.coeffs = ["h"] + [speciation.species_name(*s) for s in species]
+    f.params = sorted(names)
+
+    return f
+
+
 # =============================================================================
 # Function class constructor helper
 
 
-def construct(key, normalise=True, flavour="none"):
+def construct(
+    key, normalise=True, flavour="none", warm_start=False, species=None
+):
     """Constructs and returns the requested function object.
 
     Parameters
@@ -1089,7 +1985,19 @@ def construct(key, normalise=True, flavour="none"):
     flavour : `string`
         Fitting function flavour, if selected.
         One of: `none`, `add`, `stat`, `noncoop`.
+    warm_start : `boolean`
+        If true, warm start polynomial model root solves from the previous
+        evaluation's free concentrations.
+    species : list of (m, n) tuples, required for `nmrgeneric`, `uvgeneric`
+        Stoichiometry of each complex species HmGn for the general
+        speciation models. See `stoichiometry`.
     """
+    # General stoichiometry models are built from their species list
+    if key in ("nmrgeneric", "uvgeneric"):
+        f = stoichiometry(species, kind=key[: -len("generic")])
+        return FunctionBinding(
+            key, f, normalise, flavour, warm_start=warm_start
+        )
 
     args_select = {
         "nmrdata": ["FunctionBinding", (key)],
@@ -1118,4 +2026,4 @@ def construct(key, normalise=True, flavour="none"):
     args = args_select[key][1]
 
     # Construct and return
-    return cls(*args)
+    return cls(*args, warm_start=warm_start)
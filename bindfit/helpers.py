@@ -5,7 +5,6 @@ Mainly statistics calculations and data munging.
 
 
 import numpy as np
-import numpy.matlib as ml
 
 
 def ssr(residuals):
@@ -13,6 +12,44 @@ def ssr(residuals):
     return np.sum(np.square(residuals))
 
 
+def aic(residuals, n_params):
+    """Calculate the Akaike information criterion of a least squares fit.
+
+    Parameters
+    ----------
+    residuals : array_like
+        Fit residuals
+    n_params : int
+        Number of fitted parameters, including linear coefficients
+
+    Returns
+    -------
+    aic : float
+        AIC, lower is better
+    """
+    n = np.size(residuals)
+    return n * np.log(ssr(residuals) / n) + 2 * n_params
+
+
+def bic(residuals, n_params):
+    """Calculate the Bayesian information criterion of a least squares fit.
+
+    Parameters
+    ----------
+    residuals : array_like
+        Fit residuals
+    n_params : int
+        Number of fitted parameters, including linear coefficients
+
+    Returns
+    -------
+    bic : float
+        BIC, lower is better
+    """
+    n = np.size(residuals)
+    return n * np.log(ssr(residuals) / n) + n_params * np.log(n)
+
+
 def cov(data, residuals, total=False):
     """Calculate the covariance of a fit."""
     # TODO: TEMP
@@ -63,17 +100,17 @@ def normalise(data):
     Parameters
     ----------
     data : ndarray
-        N x M array of N dependent variables, M observations
+        N x M array of N dependent variables, M observations, or a B x N x M
+        stack of such arrays
 
     Returns
     -------
     data_norm : ndarray
-        N x M array of normalised input data
+        N x M array of normalised input data (B x N x M for stacks)
     """
 
-    # Create matrix of initial values to subtract from original matrix
-    initialmat = ml.repmat(data.T[0, :], len(data.T), 1).T
-    data_norm = data - initialmat
+    # Subtract initial value of each variable from its observations
+    data_norm = data - data[..., :1]
     return data_norm
 
 
@@ -94,13 +131,113 @@ def denormalise(data, data_norm):
     data_denorm : ndarray
         N x M array of denormalised input data_norm
     """
-    # Create matrix of initial data values to add to fit
-    initialmat = ml.repmat(data[:, 0][np.newaxis].T, 1, data.shape[1])
-    # De-normalize normalised data (add initial values back)
-    data_denorm = data_norm + initialmat
+    # De-normalize normalised data (add initial values of each variable
+    # back to its observations)
+    data_denorm = data_norm + data[:, :1]
     return data_denorm
 
 
+def gram_factor(data):
+    """Factorise the Gram matrix of a 2D array of observations.
+
+    Returns Z such that Z Z^T = data^T data, with at most as many columns as
+    the smaller dimension of data. Sums of squares of projections of the data
+    along the observation axis can be calculated from Z without reference to
+    the number of dependent variables.
+
+    Calculated from the SVD of data rather than the Gram matrix itself, to
+    avoid squaring its condition number.
+
+    Parameters
+    ----------
+    data : ndarray
+        N x M array of N dependent variables, M observations, or a B x N x M
+        stack of such arrays
+
+    Returns
+    -------
+    z : ndarray
+        M x K Gram matrix factor, K <= min(N, M) (B x M x K for stacks)
+    """
+    _, s, vt = np.linalg.svd(data, full_matrices=False)
+    return np.swapaxes(vt, -1, -2) * s[..., np.newaxis, :]
+
+
+# Minimum number of singular values to estimate a matrix's noise level from
+SVD_AUTO_MIN_SIZE = 10
+
+
+def svd_rank(s, shape, min_rank=1):
+    """Estimate the number of significant singular values of a noisy matrix.
+
+    Uses the optimal hard threshold for a matrix with white noise of unknown
+    level (Gavish & Donoho, 2014), which scales with the median singular
+    value and the aspect ratio of the matrix. Matrices with fewer than
+    SVD_AUTO_MIN_SIZE singular values have too few to estimate the noise
+    level from, and all are kept.
+
+    Parameters
+    ----------
+    s : ndarray
+        1D array of singular values
+    shape : tuple
+        Shape of the decomposed matrix
+    min_rank : int, optional
+        Minimum rank returned, e.g. the number of linear components of the
+        fitted model
+
+    Returns
+    -------
+    rank : int
+        Number of singular values above the threshold, at least min_rank
+        (and at most the number of singular values)
+    """
+    if len(s) < SVD_AUTO_MIN_SIZE:
+        return len(s)
+
+    beta = min(shape) / max(shape)
+    omega = 0.56 * beta**3 - 0.95 * beta**2 + 1.82 * beta + 1.43
+    rank = int(np.sum(s > omega * np.median(s)))
+    return min(max(rank, min_rank, 1), len(s))
+
+
+def compress(data, rank="auto", min_rank=1):
+    """Compress a 2D array of observations to its leading singular components.
+
+    Returns the projection of data onto its leading left singular vectors.
+    Sums of squares of residuals of least squares fits along the observation
+    axis are preserved up to the discarded singular components, so fitting
+    the compressed data is equivalent to fitting a denoised copy of the
+    original.
+
+    Parameters
+    ----------
+    data : ndarray
+        N x M array of N dependent variables, M observations
+    rank : int or "auto"
+        Number of singular components to keep, or "auto" to estimate the
+        number of significant components from the singular values (see
+        `svd_rank`)
+    min_rank : int, optional
+        Minimum number of components kept. Data truncated below the number
+        of linear components of the fitted model can't constrain all of
+        them, which biases the fitted parameters.
+
+    Returns
+    -------
+    data_compressed : ndarray
+        K x M array of K singular components, M observations
+    """
+    _, s, vt = np.linalg.svd(data, full_matrices=False)
+
+    if rank == "auto":
+        k = svd_rank(s, data.shape, min_rank)
+    else:
+        k = min(max(int(rank), min_rank), len(s))
+
+    return s[:k, np.newaxis] * vt[:k]
+
+
 def dilute(h0, data):
     """Apply dilution factor to a dataset.
 
@@ -119,6 +256,6 @@ def dilute(h0, data):
     """
     y = data
     dilfac = h0 / h0[0]
-    dilmat = ml.repmat(dilfac, y.shape[0], 1)
-    y_dil = y * dilmat
+    # Scale each observation of every variable by its dilution factor
+    y_dil = y * dilfac
     return y_dil
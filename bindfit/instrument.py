@@ -0,0 +1,248 @@
+"""Fit instrumentation.
+
+A Profiler records the number of calls and time spent in each stage of a
+fit, and in each evaluation of the fitting function and its model. Fitters
+without a profiler skip all instrumentation, and function evaluations are
+only wrapped for timing while a profiled fit is running, on a copy of the
+fitting function that is only visible to that fit (see `active`).
+"""
+
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+
+
+# Fitting function methods timed on every call during profiled fits
+FUNCTION_METHODS = (
+    "objective",
+    "objective_gram",
+    "residuals",
+    "jacobian",
+    "design_jacobian",
+    "speciate",
+    "solve_coeffs",
+)
+
+
+# Instrumented copies of fitting functions in the current context, by id of
+# the original function. Each thread has its own context, so functions shared
+# between threads are only instrumented for the profiled fit.
+_ACTIVE = contextvars.ContextVar("bindfit_instrumented", default={})
+
+
+def active(function):
+    """Return the fitting function to evaluate in the current context.
+
+    Parameters
+    ----------
+    function : `functions.BaseFunction`
+        Fitting function.
+
+    Returns
+    -------
+    function : `functions.BaseFunction`
+        The instrumented copy of the function within a `Profiler.instrument`
+        block in this context, otherwise the function itself.
+    """
+    return _ACTIVE.get().get(id(function), function)
+
+
+class Profiler:
+    """Profiler of fit stages and function evaluations.
+
+    Parameters
+    ----------
+    trace : `boolean`, optional
+        If True, keep every timed call as a timeline event for
+        `chrome_trace`. Otherwise only the per stage totals are kept, so
+        memory use doesn't grow with the number of fits.
+
+    Attributes
+    ----------
+    stats : `dict`
+        Dict of stage name to [calls, total, min, max] times in seconds.
+    events : `list`
+        List of (name, start, duration, thread id) timeline events, start and
+        duration in nanoseconds since the profiler was created. Empty unless
+        `trace` is True.
+    """
+
+    def __init__(self, trace=False):
+        self.trace = trace
+        self._origin = time.perf_counter_ns()
+        self.clear()
+
+    def clear(self):
+        """Discard all recorded stats and events."""
+        self.stats = {}
+        self.events = []
+
+    def record(self, name, start, duration):
+        """Record a timed call of a stage.
+
+        Parameters
+        ----------
+        name : `string`
+            Stage name.
+        start : `int`
+            `time.perf_counter_ns` at the start of the call.
+        duration : `int`
+            Duration of the call in nanoseconds.
+        """
+        seconds = duration * 1e-9
+        stats = self.stats.get(name)
+        if stats is None:
+            self.stats[name] = [1, seconds, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = min(stats[2], seconds)
+            stats[3] = max(stats[3], seconds)
+
+        if self.trace:
+            self.events.append(
+                (name, start - self._origin, duration, threading.get_ident())
+            )
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """Context manager timing a stage."""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter_ns() - start)
+
+    def wrap(self, func, name=None):
+        """Wrap a function to time every call.
+
+        Parameters
+        ----------
+        func : `function`
+            Function to time.
+        name : `string`, optional
+            Stage name, defaults to the function name.
+
+        Returns
+        -------
+        wrapper : `function`
+        """
+        name = func.__name__ if name is None else name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, start, time.perf_counter_ns() - start)
+
+        return wrapper
+
+    @contextlib.contextmanager
+    def instrument(self, function, name=None):
+        """Context manager timing every evaluation of a fitting function.
+
+        While active, `active` returns a copy of the function in this
+        context (thread or task), with its evaluation methods (see
+        `FUNCTION_METHODS`) and model function `f` replaced by timed
+        wrappers. The function itself is never modified, so it can be used
+        from other threads at the same time. The copy shares the function's
+        solver state and memoised results. Nested use only wraps once.
+
+        Parameters
+        ----------
+        function : `functions.BaseFunction`
+            Fitting function to instrument.
+        name : `string`, optional
+            If given, also time the whole block as this stage.
+
+        Yields
+        ------
+        function : `functions.BaseFunction`
+            Instrumented copy of the function.
+        """
+        function = active(function)
+        if getattr(function, "_profiler", None) is not None:
+            # Already instrumented by an enclosing block
+            with self.span(name) if name else contextlib.nullcontext():
+                yield function
+            return
+
+        # Shallow copy without pickling, sharing solver state and memo
+        instrumented = object.__new__(type(function))
+        instrumented.__dict__.update(function.__dict__)
+        instrumented._profiler = self
+        instrumented.f = self.wrap(function.f)
+        for method in FUNCTION_METHODS:
+            setattr(
+                instrumented, method, self.wrap(getattr(instrumented, method))
+            )
+
+        token = _ACTIVE.set({**_ACTIVE.get(), id(function): instrumented})
+        try:
+            with self.span(name) if name else contextlib.nullcontext():
+                yield instrumented
+        finally:
+            _ACTIVE.reset(token)
+
+    def table(self):
+        """Return the recorded stats as pandas DataFrame.
+
+        One row per stage, sorted by total time: number of calls and the
+        total, mean, minimum and maximum time per call in seconds.
+        """
+        import pandas as pd
+
+        table = pd.DataFrame.from_dict(
+            self.stats,
+            orient="index",
+            columns=["calls", "total", "min", "max"],
+        )
+        table.insert(2, "mean", table["total"] / table["calls"])
+        table.index.name = "stage"
+        return table.sort_values("total", ascending=False)
+
+    def chrome_trace(self, path=None):
+        """Export the recorded events as a Chrome trace.
+
+        The trace can be viewed in chrome://tracing or Perfetto. Requires
+        the profiler to be created with `trace=True`.
+
+        Parameters
+        ----------
+        path : `string`, optional
+            If given, write the trace to this file as JSON.
+
+        Returns
+        -------
+        trace : `dict`
+            Trace in the Chrome trace event format.
+        """
+        pid = os.getpid()
+        trace = {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "cat": "bindfit",
+                    "ph": "X",
+                    "ts": start / 1000,
+                    "dur": duration / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                }
+                for name, start, duration, tid in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(trace, f)
+
+        return trace
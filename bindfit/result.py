@@ -0,0 +1,290 @@
+"""Compact fit result container.
+
+A fit result holds the optimised parameters and all fitted arrays in one
+contiguous array block, with the pandas tables built from them on first
+access and cached. Results of many fits can be held in memory at a small
+fraction of the cost of a dict of separate arrays and DataFrames.
+"""
+
+
+import numpy as np
+
+
+# Array fields of a fit result, in block order
+FIELDS = (
+    "params_raw",
+    "covariance",
+    "coeffs",
+    "coeffs_raw",
+    "molefrac",
+    "molefrac_raw",
+    "fit",
+    "residuals",
+)
+
+# Keys of the results dict returned by fit runs before FitResult, and the
+# attribute each is read from
+KEYS = {
+    "time": "time",
+    "_params_raw": "params_raw",
+    "fit": "fit",
+    "residuals": "residuals",
+    "coeffs": "coeffs",
+    "coeffs_raw": "coeffs_raw",
+    "molefrac": "molefrac",
+    "molefrac_raw": "molefrac_raw",
+    "params": "params",
+}
+
+# Shared block layouts, keyed by the shapes of the array fields
+_LAYOUTS = {}
+
+
+def _layout(shapes):
+    # Dict of field name to (start, stop, shape) in the block, shared between
+    # results with the same array shapes
+    layout = _LAYOUTS.get(shapes)
+    if layout is None:
+        layout = {}
+        start = 0
+        for name, shape in zip(FIELDS, shapes):
+            if shape is not None:
+                stop = start + int(np.prod(shape, dtype=int))
+                layout[name] = (start, stop, shape)
+                start = stop
+        layout = _LAYOUTS.setdefault(shapes, layout)
+    return layout
+
+
+class FitResult:
+    """Results of a single fit.
+
+    Parameters
+    ----------
+    params : `dict`
+        Parameters dict with optimised values and errors.
+    time : `float`
+        Time taken to fit.
+    ssr : `float`
+        Sum of squares of the fit residuals.
+    labels : `tuple`
+        (index, columns, coeff_names) labels of the pandas tables: the
+        input data index and columns (None for integer positions) and the
+        fit coefficient names.
+    lean : `boolean`, optional
+        If True, the fit curve and residuals are not stored.
+    optimizer : `dict`, optional
+        Optimiser function evaluation and iteration counts and convergence
+        status.
+    **arrays
+        Array fields, see `FIELDS`.
+
+    Attributes
+    ----------
+    params_raw : `ndarray`
+        P array of optimised parameters, sorted by name.
+    covariance : `ndarray`
+        P x P parameter covariance matrix.
+    coeffs, coeffs_raw : `ndarray`
+        Formatted and raw fit coefficients.
+    molefrac, molefrac_raw : `ndarray`
+        Formatted and raw fit molefractions.
+    fit : `ndarray`
+        M x N fit curve, None for lean results.
+    residuals : `ndarray`
+        M x N fit residuals, None for lean results.
+
+    Results can also be read by the keys of the results dict fit runs
+    returned before (see `KEYS`), e.g. `result["fit"]` or `dict(result)`.
+    """
+
+    __slots__ = (
+        "params",
+        "time",
+        "ssr",
+        "optimizer",
+        "_block",
+        "_layout",
+        "_labels",
+        "_views",
+    )
+
+    def __init__(
+        self,
+        params,
+        time,
+        ssr,
+        labels,
+        lean=False,
+        optimizer=None,
+        **arrays,
+    ):
+        self.params = params
+        self.time = time
+        self.ssr = ssr
+        self.optimizer = optimizer
+        self._labels = labels
+        self._views = None
+
+        if lean:
+            arrays["fit"] = arrays["residuals"] = None
+
+        arrays = [
+            None if arrays[name] is None else np.asarray(arrays[name])
+            for name in FIELDS
+        ]
+        self._layout = _layout(
+            tuple(None if a is None else a.shape for a in arrays)
+        )
+        self._block = np.concatenate(
+            [a.ravel() for a in arrays if a is not None], dtype=np.float64
+        )
+
+    def __getstate__(self):
+        # Cached tables are rebuilt on demand
+        return (
+            self.params,
+            self.time,
+            self.ssr,
+            self.optimizer,
+            self._block,
+            self._layout,
+            self._labels,
+        )
+
+    def __setstate__(self, state):
+        (
+            self.params,
+            self.time,
+            self.ssr,
+            self.optimizer,
+            self._block,
+            layout,
+            self._labels,
+        ) = state
+        self._layout = _LAYOUTS.setdefault(
+            tuple(layout[n][2] if n in layout else None for n in FIELDS),
+            layout,
+        )
+        self._views = None
+
+    def __getitem__(self, key):
+        # Read only access by results dict key
+        if key not in KEYS:
+            raise KeyError(key)
+        return getattr(self, KEYS[key])
+
+    def keys(self):
+        """Return the results dict keys, see `KEYS`"""
+        return KEYS.keys()
+
+    def _array(self, name):
+        # View of an array field into the block
+        if name not in self._layout:
+            return None
+        start, stop, shape = self._layout[name]
+        return self._block[start:stop].reshape(shape)
+
+    def _view(self, name, build):
+        # Cached pandas table, built by build(pd). Pandas is only imported
+        # once a table is needed.
+        if self._views is None:
+            self._views = {}
+        if name not in self._views:
+            import pandas as pd
+
+            self._views[name] = build(pd)
+        return self._views[name]
+
+    @property
+    def lean(self):
+        """Whether the fit curve and residuals were dropped"""
+        return "fit" not in self._layout
+
+    @property
+    def params_raw(self):
+        return self._array("params_raw")
+
+    @property
+    def covariance(self):
+        return self._array("covariance")
+
+    @property
+    def coeffs(self):
+        return self._array("coeffs")
+
+    @property
+    def coeffs_raw(self):
+        return self._array("coeffs_raw")
+
+    @property
+    def molefrac(self):
+        return self._array("molefrac")
+
+    @property
+    def molefrac_raw(self):
+        return self._array("molefrac_raw")
+
+    @property
+    def fit(self):
+        return self._array("fit")
+
+    @property
+    def residuals(self):
+        return self._array("residuals")
+
+    @property
+    def fit_curve(self):
+        """Return fit curve data as pandas DataFrame"""
+        return self._view("fit_curve", lambda pd: self._table(pd, "fit"))
+
+    @property
+    def fit_residuals(self):
+        """Return fit residuals data as pandas DataFrame"""
+        return self._view(
+            "fit_residuals", lambda pd: self._table(pd, "residuals")
+        )
+
+    @property
+    def fit_molefractions(self):
+        """Return optimised molefractions table as pandas DataFrame"""
+        index, _, coeff_names = self._labels
+        return self._view(
+            "fit_molefractions",
+            lambda pd: pd.DataFrame(
+                np.transpose(self.molefrac), index=index, columns=coeff_names
+            ),
+        )
+
+    @property
+    def fit_coefficients(self):
+        """Return optimised coefficients table as pandas DataFrame"""
+        _, columns, coeff_names = self._labels
+        return self._view(
+            "fit_coefficients",
+            lambda pd: pd.DataFrame(
+                np.transpose(self.coeffs),
+                # Index of fit column names
+                index=None if columns is None else columns.rename("name"),
+                columns=coeff_names,
+            ),
+        )
+
+    @property
+    def fit_covariance(self):
+        """Return parameter covariance matrix as pandas DataFrame"""
+        names = sorted(self.params)
+        return self._view(
+            "fit_covariance",
+            lambda pd: pd.DataFrame(
+                self.covariance, index=names, columns=names
+            ),
+        )
+
+    def _table(self, pd, name):
+        # Table of an M x N array field with the input data labels
+        data = self._array(name)
+        if data is None:
+            raise ValueError(f"Lean fit results have no {name} table")
+        index, columns, _ = self._labels
+        return pd.DataFrame(np.transpose(data), index=index, columns=columns)
@@ -0,0 +1,494 @@
+"""Vectorised polynomial root solvers for speciation calculations.
+
+The polynomial binding models solve a mass balance polynomial in the free
+host or guest concentration at every titration point. The solvers here work
+on the whole (N, D + 1) coefficient matrix at once (one row per observation,
+highest power first, as for `np.roots`) instead of solving each row in a
+Python loop.
+"""
+
+
+import numpy as np
+
+
+# Relative polynomial residual above which a root is considered inaccurate
+RESIDUAL_TOL = 1e-8
+
+
+def polyval(poly, x):
+    """Evaluate a batch of polynomials at one or more points per row.
+
+    Parameters
+    ----------
+    poly : `ndarray`
+        N x (D + 1) array of polynomial coefficients, highest power first.
+    x : `ndarray`
+        N x K array of K evaluation points per polynomial.
+
+    Returns
+    -------
+    y : `ndarray`
+        N x K array of polynomial values.
+    """
+    y = poly[:, :1]
+    for j in range(1, poly.shape[1]):
+        y = y * x + poly[:, j, np.newaxis]
+    return np.broadcast_to(y, np.shape(x)).copy()
+
+
+def polyder(poly):
+    """Return the coefficients of the derivative of a batch of polynomials."""
+    deg = poly.shape[1] - 1
+    return poly[:, :-1] * np.arange(deg, 0, -1)
+
+
+def root_derivative(poly, dpoly, x):
+    """Calculate derivatives of polynomial roots with respect to parameters.
+
+    By implicit differentiation of the polynomial at its root:
+    dx/dp = -(dpoly/dp)(x) / (dpoly/dx)(x).
+
+    Parameters
+    ----------
+    poly : `ndarray`
+        N x (D + 1) array of polynomial coefficients, highest power first.
+    dpoly : `ndarray`
+        P x N x (D + 1) array, derivatives of the polynomial coefficients
+        with respect to each of P parameters.
+    x : `ndarray`
+        Length N array of roots.
+
+    Returns
+    -------
+    dx : `ndarray`
+        P x N array, derivatives of the roots.
+    """
+    x = x[:, np.newaxis]
+    dpoly_dx = polyval(polyder(poly), x)[:, 0]
+    dpoly_dp = np.array([polyval(dp, x)[:, 0] for dp in dpoly])
+    return -dpoly_dp / dpoly_dx
+
+
+def polish(poly, roots, n_iter=4):
+    """Refine approximate real roots with a few Newton steps.
+
+    Steps that do not reduce the polynomial residual are rejected, so
+    polishing can never make a root worse. NaN entries (non-real roots) are
+    left untouched.
+    """
+    dpoly = polyder(poly)
+    f = polyval(poly, roots)
+
+    for _ in range(n_iter):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = f / polyval(dpoly, roots)
+        step[~np.isfinite(step)] = 0.0
+
+        roots_new = roots - step
+        f_new = polyval(poly, roots_new)
+
+        better = np.abs(f_new) < np.abs(f)
+        if not better.any():
+            break
+        roots = np.where(better, roots_new, roots)
+        f = np.where(better, f_new, f)
+
+    return roots
+
+
+def residual_ok(poly, roots):
+    """Check which roots satisfy their polynomial to within RESIDUAL_TOL.
+
+    The residual is scaled by the sum of the absolute values of the terms of
+    the polynomial, so the check is independent of coefficient magnitudes.
+    NaN roots are reported as accurate.
+    """
+    f = polyval(poly, roots)
+    scale = polyval(np.abs(poly), np.abs(roots))
+    with np.errstate(invalid="ignore"):
+        return np.abs(f) <= RESIDUAL_TOL * scale
+
+
+def quadratic_real_roots(poly):
+    """Calculate the real roots of a batch of quadratics.
+
+    Uses the numerically stable form of the quadratic formula. Rows with a
+    zero leading coefficient are solved as linear equations.
+
+    Parameters
+    ----------
+    poly : `ndarray`
+        N x 3 array of quadratic coefficients, highest power first.
+
+    Returns
+    -------
+    roots : `ndarray`
+        N x 2 array of real roots, NaN where a root is not real.
+    """
+    a, b, c = poly.T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        disc = b * b - 4 * a * c
+        q = -0.5 * (b + np.copysign(np.sqrt(disc), b))
+        x1 = q / a
+        x2 = c / q
+
+        # b = c = 0: double root at zero
+        x2 = np.where(q == 0, 0.0, x2)
+        x1 = np.where((q == 0) & (a != 0), 0.0, x1)
+
+        # Linear rows
+        linear = a == 0
+        x1 = np.where(linear, np.nan, x1)
+        x2 = np.where(linear, -c / b, x2)
+
+    roots = np.column_stack((x1, x2))
+    roots[~np.isfinite(roots)] = np.nan
+    return roots
+
+
+def cubic_real_roots(poly):
+    """Calculate the real roots of a batch of cubics.
+
+    Closed form solution via the depressed cubic: Cardano's formula where
+    there is one real root, the trigonometric form where there are three.
+    Rows with a zero leading coefficient are solved as quadratics.
+
+    Parameters
+    ----------
+    poly : `ndarray`
+        N x 4 array of cubic coefficients, highest power first.
+
+    Returns
+    -------
+    roots : `ndarray`
+        N x 3 array of real roots, NaN where a root is not real.
+    """
+    a, b, c, d = poly.T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        B = b / a
+        C = c / a
+        D = d / a
+
+        # Depressed cubic t^3 + pt + q = 0, x = t - B/3
+        p = C - B * B / 3
+        q = (2 * B * B * B) / 27 - (B * C) / 3 + D
+        disc = (q / 2) ** 2 + (p / 3) ** 3
+
+        # One real root: Cardano, choosing the sign that avoids cancellation
+        u = np.cbrt(-q / 2 - np.copysign(np.sqrt(disc), q))
+        t1 = np.where(u == 0, 0.0, u - p / (3 * u))
+
+        # Three real roots: trigonometric form
+        r = 2 * np.sqrt(-p / 3)
+        arg = np.clip((3 * q) / (p * r), -1.0, 1.0)
+        theta = np.arccos(arg) / 3
+        t3 = r[:, np.newaxis] * np.cos(
+            theta[:, np.newaxis] - (2 * np.pi / 3) * np.arange(3)
+        )
+        # Triple root
+        t3[p == 0] = 0.0
+
+    t1 = np.column_stack((t1, np.full((t1.shape[0], 2), np.nan)))
+    roots = np.where((disc > 0)[:, np.newaxis], t1, t3)
+    roots = roots - (B / 3)[:, np.newaxis]
+
+    # Degenerate rows
+    quad = a == 0
+    if quad.any():
+        roots[quad, :2] = quadratic_real_roots(poly[quad, 1:])
+        roots[quad, 2] = np.nan
+
+    roots[~np.isfinite(roots)] = np.nan
+    return roots
+
+
+def quartic_real_roots(poly):
+    """Calculate the real roots of a batch of quartics.
+
+    Ferrari's method: the depressed quartic is factorised into two quadratics
+    using the largest root of its resolvent cubic, which is found with
+    `cubic_real_roots`. Biquadratic rows are solved as quadratics in the
+    square of the root. Rows with a zero leading coefficient are solved as
+    cubics.
+
+    Parameters
+    ----------
+    poly : `ndarray`
+        N x 5 array of quartic coefficients, highest power first.
+
+    Returns
+    -------
+    roots : `ndarray`
+        N x 4 array of real roots, NaN where a root is not real.
+    """
+    a, b, c, d, e = poly.T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        B = b / a
+        C = c / a
+        D = d / a
+        E = e / a
+
+        # Depressed quartic y^4 + py^2 + qy + r = 0, x = y - B/4
+        p = C - (3 * B * B) / 8
+        q = D - (B * C) / 2 + (B * B * B) / 8
+        r = E - (B * D) / 4 + (B * B * C) / 16 - (3 * B * B * B * B) / 256
+
+        # Largest root of the resolvent cubic is real and non-negative
+        resolvent = np.column_stack(
+            (np.full_like(p, 8.0), 8 * p, 2 * p * p - 8 * r, -q * q)
+        )
+        m = np.fmax(np.fmax.reduce(cubic_real_roots(resolvent), axis=1), 0.0)
+
+        # Factorise into y^2 -/+ sy + (p/2 + m +/- q/2s) = 0
+        s = np.sqrt(2 * m)
+        ones = np.ones_like(p)
+        y12 = quadratic_real_roots(
+            np.column_stack((ones, -s, p / 2 + m + q / (2 * s)))
+        )
+        y34 = quadratic_real_roots(
+            np.column_stack((ones, s, p / 2 + m - q / (2 * s)))
+        )
+        roots = np.column_stack((y12, y34))
+
+        # Biquadratic rows: z^2 + pz + r = 0, y = +/- sqrt(z)
+        biquad = m == 0
+        if biquad.any():
+            z = quadratic_real_roots(np.column_stack((ones, p, r))[biquad])
+            z[z < 0] = np.nan
+            roots[biquad] = np.column_stack((np.sqrt(z), -np.sqrt(z)))
+
+    roots = roots - (B / 4)[:, np.newaxis]
+
+    # Degenerate rows
+    cubic = a == 0
+    if cubic.any():
+        roots[cubic, :3] = cubic_real_roots(poly[cubic, 1:])
+        roots[cubic, 3] = np.nan
+
+    roots[~np.isfinite(roots)] = np.nan
+    return roots
+
+
+def roots_fallback(poly):
+    """Calculate real roots row by row with np.roots.
+
+    Slow reference path, used for rows the vectorised solvers cannot resolve
+    accurately.
+
+    Parameters
+    ----------
+    poly : `ndarray`
+        N x (D + 1) array of polynomial coefficients, highest power first.
+
+    Returns
+    -------
+    roots : `ndarray`
+        N x D array of real roots, NaN where a root is not real.
+    """
+    roots = np.full((poly.shape[0], poly.shape[1] - 1), np.nan)
+    for i, p in enumerate(poly):
+        r = np.roots(p)
+        r = np.real(r[np.imag(r) == 0])
+        roots[i, : r.shape[0]] = r
+    return roots
+
+
+# Closed form real root solvers by number of polynomial coefficients
+REAL_ROOTS = {
+    3: quadratic_real_roots,
+    4: cubic_real_roots,
+    5: quartic_real_roots,
+}
+
+
+def smallest_positive_root(poly):
+    """Find the smallest real non-negative root of each polynomial in a batch.
+
+    This is the physically meaningful free concentration for the polynomial
+    binding models. Rows without a real non-negative root return 0.
+
+    Roots are calculated in closed form and Newton polished. Candidate roots
+    that do not satisfy the polynomial to within RESIDUAL_TOL are discarded,
+    and only those rows are solved again from the reversed polynomial (whose
+    roots are the reciprocals), which resolves roots much smaller than the
+    others accurately. Ill-conditioned rows, where no accurate non-negative
+    root is left although the polynomial changes sign on [0, inf), fall back
+    to np.roots.
+
+    Parameters
+    ----------
+    poly : `ndarray`
+        N x 3, N x 4 or N x 5 array of quadratic, cubic or quartic
+        coefficients, highest power first.
+
+    Returns
+    -------
+    x : `ndarray`
+        Length N array of smallest real non-negative roots.
+    """
+    poly = np.asarray(poly, dtype=np.float64)
+    solve = REAL_ROOTS[poly.shape[1]]
+
+    roots = polish(poly, solve(poly))
+    ok = residual_ok(poly, roots)
+
+    # Leading coefficient, and rows whose polynomial changes sign on
+    # [0, inf) so must have a non-negative root
+    leading = poly[np.arange(poly.shape[0]), (poly != 0).argmax(axis=1)]
+    sign_change = leading * poly[:, -1] < 0
+
+    # Re-solve rows with inaccurate roots, or without a non-negative root
+    # where there must be one, from the reversed polynomial
+    with np.errstate(invalid="ignore"):
+        found = (ok & (roots >= 0)).any(axis=1)
+    redo = ~ok.all(axis=1) | (sign_change & ~found)
+    if redo.any():
+        with np.errstate(divide="ignore"):
+            reverse = 1 / solve(poly[redo, ::-1])
+        reverse[~np.isfinite(reverse)] = np.nan
+        reverse = polish(poly[redo], reverse)
+        roots = np.concatenate((roots, np.full_like(roots, np.nan)), axis=1)
+        ok = np.concatenate((ok, np.ones_like(ok)), axis=1)
+        roots[redo, poly.shape[1] - 1 :] = reverse
+        ok[redo, poly.shape[1] - 1 :] = residual_ok(poly[redo], reverse)
+
+    roots[~ok] = np.nan
+    with np.errstate(invalid="ignore"):
+        roots = np.where(roots >= 0, roots, np.inf)
+    x = roots.min(axis=1)
+
+    # Re-solve ill-conditioned rows with the reference solver
+    bad = np.isinf(x) & sign_change
+    if bad.any():
+        roots = roots_fallback(poly[bad])
+        with np.errstate(invalid="ignore"):
+            x[bad] = np.where(roots >= 0, roots, np.inf).min(axis=1)
+
+    # A zero constant term means zero is a root, which is always the smallest
+    # non-negative root
+    x[poly[:, -1] == 0] = 0.0
+
+    x[np.isinf(x)] = 0.0
+    return x
+
+
+def newton_root(poly, guess, n_iter=3, rtol=1e-10):
+    """Refine a batch of polynomial roots from initial guesses.
+
+    Parameters
+    ----------
+    poly : `ndarray`
+        N x (D + 1) array of polynomial coefficients, highest power first.
+    guess : `ndarray`
+        Length N array of initial root estimates.
+    n_iter : `int`, optional
+        Number of Newton steps.
+    rtol : `float`, optional
+        Relative size of the final Newton step below which a root is
+        considered converged.
+
+    Returns
+    -------
+    x : `ndarray`
+        Length N array of refined roots.
+    converged : `ndarray`
+        Length N boolean array, True where the root converged to a
+        non-negative value satisfying the polynomial.
+    """
+    dpoly = polyder(poly)
+    x = np.array(guess, dtype=np.float64)[:, np.newaxis]
+    step = np.zeros_like(x)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(n_iter):
+            step = polyval(poly, x) / polyval(dpoly, x)
+            x = x - step
+
+        converged = (
+            np.isfinite(x)
+            & (x >= 0)
+            & (np.abs(step) <= rtol * np.abs(x))
+            & residual_ok(poly, x)
+        )
+
+    return x[:, 0], converged[:, 0]
+
+
+def deflate(poly, x):
+    """Divide a batch of polynomials by (t - x) for one root x per row.
+
+    Parameters
+    ----------
+    poly : `ndarray`
+        N x (D + 1) array of polynomial coefficients, highest power first.
+    x : `ndarray`
+        Length N array of roots.
+
+    Returns
+    -------
+    quotient : `ndarray`
+        N x D array of coefficients of the quotient polynomials (the
+        remainder is dropped).
+    """
+    quotient = np.empty_like(poly[:, :-1])
+    quotient[:, 0] = poly[:, 0]
+    for j in range(1, poly.shape[1] - 1):
+        quotient[:, j] = poly[:, j] + x * quotient[:, j - 1]
+    return quotient
+
+
+def positive_root(poly, state=None):
+    """Find the smallest real non-negative root of each polynomial in a batch,
+    optionally warm-started from a previous solution.
+
+    Without `state` this is equivalent to `smallest_positive_root`. With
+    `state`, the roots found by the previous call are refined with a few
+    Newton steps. A refined root x is only accepted if the polynomial has no
+    other root on [0, x), checked from the real roots of the polynomial
+    deflated by x, so that roots converged to after large parameter changes
+    are never larger than the smallest (however many roots lie below them).
+    Rows that fail to converge to a valid root, or with a smaller root, are
+    solved from scratch.
+
+    Parameters
+    ----------
+    poly : `ndarray`
+        N x (D + 1) array of polynomial coefficients, highest power first.
+    state : `dict`, optional
+        Solver state, updated in place with the roots found by this call.
+
+    Returns
+    -------
+    x : `ndarray`
+        Length N array of smallest real non-negative roots.
+    """
+    if state is None:
+        return smallest_positive_root(poly)
+
+    guess = state.get("x")
+
+    if guess is None or guess.shape != (poly.shape[0],):
+        x = smallest_positive_root(poly)
+    else:
+        x, ok = newton_root(poly, guess)
+
+        # Other real roots of the polynomial, within rounding of x for
+        # repeated roots
+        quotient = deflate(poly, np.where(ok, x, 0.0))
+        if quotient.shape[1] == 2:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                others = (-quotient[:, 1] / quotient[:, 0])[:, np.newaxis]
+        else:
+            others = REAL_ROOTS[quotient.shape[1]](quotient)
+        with np.errstate(invalid="ignore"):
+            below = (others >= 0) & (others < x[:, np.newaxis] * (1 - 1e-8))
+        ok &= ~below.any(axis=1)
+
+        if not ok.all():
+            x[~ok] = smallest_positive_root(poly[~ok])
+
+    state["x"] = x
+    return x
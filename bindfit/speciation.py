@@ -0,0 +1,215 @@
+"""General host-guest speciation engine.
+
+Solves the coupled host and guest mass balances for an arbitrary set of
+HmGn complex species at every titration point at once:
+
+    [H]0 = [H] + sum(m * beta * [H]^m * [G]^n)
+    [G]0 = [G] + sum(n * beta * [H]^m * [G]^n)
+
+using a vectorised damped Newton method in the logarithms of the free
+concentrations. The mass balances are the gradient of a convex function of
+the log concentrations, so the Jacobian is symmetric positive definite and
+the iteration converges from any starting point.
+"""
+
+
+import warnings
+
+import numpy as np
+
+
+def speciate(
+    species,
+    h0,
+    g0,
+    state=None,
+    tol=1e-12,
+    max_iter=200,
+    max_step=4.0,
+):
+    """Calculate free and complex concentrations for HmGn species.
+
+    Parameters
+    ----------
+    species : sequence of (m, n, beta) tuples
+        Stoichiometry of each complex species HmGn and its overall formation
+        constant beta (a scalar, or a length N array of per point values).
+    h0 : `ndarray`
+        Length N array of total host concentrations.
+    g0 : `ndarray`
+        Length N array of total guest concentrations.
+    state : `dict`, optional
+        Solver state. If given, the free concentrations found by the previous
+        call are used as the starting point, and the state is updated in
+        place with the solution found by this call.
+    tol : `float`, optional
+        Relative mass balance error at which the solution is converged.
+    max_iter : `int`, optional
+        Maximum number of Newton iterations. A RuntimeWarning is issued if
+        the solution has not converged after them.
+    max_step : `float`, optional
+        Maximum change in log concentration per iteration (damping).
+
+    Returns
+    -------
+    h : `ndarray`
+        Length N array of free host concentrations.
+    g : `ndarray`
+        Length N array of free guest concentrations.
+    c : `ndarray`
+        S x N array of complex concentrations, one row per species.
+    """
+    h0 = np.asarray(h0, dtype=np.float64)
+    g0 = np.asarray(g0, dtype=np.float64)
+
+    m, n, beta = _unpack(species, h0.shape)
+
+    # Components with zero total concentration are fixed at zero
+    hz = h0 <= 0
+    gz = g0 <= 0
+    h0_scale = np.where(hz, 1.0, h0)
+    g0_scale = np.where(gz, 1.0, g0)
+
+    free = None if state is None else state.get("free")
+    if free is not None and free.shape == (2, h0.shape[0]):
+        h, g = np.copy(free)
+        h[h <= 0] = h0[h <= 0]
+        g[g <= 0] = g0[g <= 0]
+    else:
+        h, g = np.copy(h0), np.copy(g0)
+    h[hz] = 0.0
+    g[gz] = 0.0
+
+    for _ in range(max_iter):
+        c = beta * h**m * g**n
+
+        # Mass balance residuals
+        f1 = h + np.sum(m * c, axis=0) - h0
+        f2 = g + np.sum(n * c, axis=0) - g0
+        f1[hz] = 0.0
+        f2[gz] = 0.0
+
+        err = np.maximum(np.abs(f1) / h0_scale, np.abs(f2) / g0_scale)
+        if not np.any(err > tol):
+            break
+
+        # Jacobian with respect to the log free concentrations
+        j11 = h + np.sum(m * m * c, axis=0)
+        j12 = np.sum(m * n * c, axis=0)
+        j22 = g + np.sum(n * n * c, axis=0)
+        j11[hz] = 1.0
+        j22[gz] = 1.0
+        j12[hz | gz] = 0.0
+
+        det = j11 * j22 - j12 * j12
+        du = np.clip((j22 * f1 - j12 * f2) / det, -max_step, max_step)
+        dv = np.clip((j11 * f2 - j12 * f1) / det, -max_step, max_step)
+
+        h = h * np.exp(-du)
+        g = g * np.exp(-dv)
+    else:
+        c = beta * h**m * g**n
+        warnings.warn(
+            f"Speciation did not converge in {max_iter} iterations",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+
+    if state is not None:
+        state["free"] = np.vstack((h, g))
+
+    return h, g, c
+
+
+def _unpack(species, shape):
+    # Split species tuples into S x 1 stoichiometry arrays and an S x N array
+    # of formation constants (scalar constants are broadcast to every point)
+    m, n = (
+        np.array([s[i] for s in species], dtype=np.float64)[:, np.newaxis]
+        for i in range(2)
+    )
+    beta = np.array(
+        [np.broadcast_to(s[2], shape) for s in species], dtype=np.float64
+    )
+    return m, n, beta
+
+
+def species_name(m, n):
+    """Return the coefficient name of a HmGn species, e.g. `h2g`."""
+    name = ""
+    if m > 0:
+        name += "h" + (str(m) if m > 1 else "")
+    if n > 0:
+        name += "g" + (str(n) if n > 1 else "")
+    return name
+
+
+def beta_name(m, n):
+    """Return the parameter name of the formation constant of a HmGn
+    species, e.g. `b21` for H2G."""
+    if not (0 <= m <= 9 and 0 <= n <= 9):
+        raise ValueError(f"Unsupported stoichiometry H{m}G{n}")
+    return f"b{m}{n}"
+
+
+def derivatives(species, h, g):
+    """Calculate derivatives of the speciation with respect to the species
+    formation constants.
+
+    By implicit differentiation of the mass balances at the solution found
+    by `speciate`.
+
+    Parameters
+    ----------
+    species : sequence of (m, n, beta) tuples
+        Stoichiometry of each complex species HmGn and its overall formation
+        constant beta.
+    h : `ndarray`
+        Length N array of free host concentrations.
+    g : `ndarray`
+        Length N array of free guest concentrations.
+
+    Returns
+    -------
+    dh : `ndarray`
+        S x N array, derivatives of the free host concentrations with respect
+        to each of the S formation constants.
+    dg : `ndarray`
+        S x N array, derivatives of the free guest concentrations.
+    dc : `ndarray`
+        S x S x N array, derivatives of the complex concentrations (rows of
+        `c` returned by `speciate`).
+    """
+    m, n, beta = _unpack(species, h.shape)
+
+    hz = h <= 0
+    gz = g <= 0
+
+    hg = h**m * g**n
+    c = beta * hg
+
+    # Jacobian of the mass balances with respect to the log free
+    # concentrations, as in speciate
+    j11 = h + np.sum(m * m * c, axis=0)
+    j12 = np.sum(m * n * c, axis=0)
+    j22 = g + np.sum(n * n * c, axis=0)
+    j11[hz] = 1.0
+    j22[gz] = 1.0
+    j12[hz | gz] = 0.0
+
+    # Derivatives of the mass balances with respect to each beta
+    f1 = m * hg
+    f2 = n * hg
+    f1[:, hz] = 0.0
+    f2[:, gz] = 0.0
+
+    det = j11 * j22 - j12 * j12
+    du = -(j22 * f1 - j12 * f2) / det
+    dv = -(j11 * f2 - j12 * f1) / det
+
+    dc = c[np.newaxis] * (
+        m[np.newaxis] * du[:, np.newaxis] + n[np.newaxis] * dv[:, np.newaxis]
+    )
+    dc += np.eye(len(species))[:, :, np.newaxis] * hg[np.newaxis]
+
+    return h * du, g * dv, dc
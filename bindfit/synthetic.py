@@ -0,0 +1,237 @@
+"""Synthetic titration data.
+
+Generates NMR and UV titration datasets from the model functions with known
+parameters, for benchmarks and for checking that fits recover the true
+parameters. Observations are the signal of the free host plus random
+complexation induced chemical shifts or absorptivity changes, weighted by
+the model's complex molefractions (NMR) or concentrations (UV), plus
+Gaussian noise.
+"""
+
+
+import numpy as np
+
+from . import functions
+
+
+def concentrations(key, n_points=20, h0=1e-3, equivalents=10.0):
+    """Host and guest concentrations of a titration.
+
+    Binding model titrations add guest to a fixed host concentration.
+    Aggregation model (dimer, coek) titrations dilute the host alone, over
+    two orders of magnitude.
+
+    Parameters
+    ----------
+    key : `string`
+        Fitting function key, see `functions.construct`.
+    n_points : `int`
+        Number of titration points.
+    h0 : `float`
+        Host concentration (initial concentration for dilutions).
+    equivalents : `float`
+        Final number of equivalents of guest added.
+
+    Returns
+    -------
+    xdata : `ndarray`
+        2 x N array of Host and Guest concentrations.
+    """
+    if key.endswith(("dimer", "coek")):
+        return np.array(
+            [np.geomspace(h0, h0 / 100, n_points), np.zeros(n_points)]
+        )
+    else:
+        return np.array(
+            [
+                np.full(n_points, h0),
+                np.linspace(0, equivalents * h0, n_points),
+            ]
+        )
+
+
+def dataset(
+    key,
+    params,
+    n_points=20,
+    n_columns=4,
+    noise=0.01,
+    flavour="none",
+    species=None,
+    seed=None,
+    **kwargs,
+):
+    """Generate a titration dataset with known parameters.
+
+    Parameters
+    ----------
+    key : `string`
+        Fitting function key, see `functions.construct`.
+    params : `dict`
+        True parameter values by name, e.g. {"k11": 1000.0, "k12": 100.0}.
+    n_points : `int`
+        Number of titration points.
+    n_columns : `int`
+        Number of observed variables (NMR protons or UV wavelengths).
+    noise : `float`
+        Standard deviation of the noise added to each observed variable,
+        relative to the range of its noiseless signal.
+    flavour : `string`
+        Fitting function flavour.
+    species : list of (m, n) tuples, required for `nmrgeneric`, `uvgeneric`
+        Stoichiometry of each complex species, see `functions.construct`.
+    seed : `int` or `numpy.random.Generator`, optional
+        Seed for the coefficients and noise.
+    **kwargs
+        Titration options, see `concentrations`.
+
+    Returns
+    -------
+    xdata : `ndarray`
+        2 x N array of Host and Guest concentrations.
+    ydata : `ndarray`
+        M x N array of observations, one variable per row.
+    """
+    p = np.array([value for _, value in sorted(params.items())])
+    batch = next(
+        batches(
+            key,
+            p[np.newaxis],
+            n_points=n_points,
+            n_columns=n_columns,
+            noise=noise,
+            flavour=flavour,
+            species=species,
+            seed=seed,
+            **kwargs,
+        )
+    )
+    return batch[1][0], batch[2][0]
+
+
+def batches(
+    key,
+    params,
+    n_datasets=None,
+    batch_size=1000,
+    n_points=20,
+    n_columns=4,
+    noise=0.01,
+    flavour="none",
+    species=None,
+    seed=None,
+    **kwargs,
+):
+    """Generate batches of titration datasets with known parameters.
+
+    Datasets are generated one batch at a time, with the speciation of the
+    whole batch calculated in one model function call (see
+    `functions.BaseFunction.design_batch`), so any number of datasets can be
+    streamed without holding them all in memory.
+
+    Parameters
+    ----------
+    key : `string`
+        Fitting function key, see `functions.construct`.
+    params : `ndarray` or `dict`
+        True parameters: a D x P array of parameters (sorted by name) of D
+        datasets, or a dict by parameter name of (low, high) ranges, from
+        which the parameters of each dataset are drawn log-uniformly (or
+        fixed values).
+    n_datasets : `int`, required if params is a dict
+        Number of datasets to draw.
+    batch_size : `int`
+        Number of datasets per batch.
+    seed : `int` or `numpy.random.Generator`, optional
+        Seed for the parameters, coefficients and noise.
+    n_points, n_columns, noise, flavour, species, **kwargs
+        See `dataset`.
+
+    Yields
+    ------
+    params : `ndarray`
+        B x P array of the true parameters of each dataset in the batch.
+    xdata : `ndarray`
+        B x 2 x N array of Host and Guest concentrations.
+    ydata : `ndarray`
+        B x M x N array of observations.
+    """
+    rng = np.random.default_rng(seed)
+
+    if isinstance(params, dict):
+        # P x 2 log parameter ranges, fixed values have equal bounds
+        ranges = np.log(
+            [np.broadcast_to(value, 2) for _, value in sorted(params.items())]
+        )
+    else:
+        params = np.asarray(params, dtype=np.float64)
+        n_datasets = params.shape[0]
+
+    # Full design matrix: every species, including free host, contributes
+    # to the signal
+    function = functions.construct(
+        key, normalise=False, flavour=flavour, species=species
+    )
+    xdata = concentrations(key, n_points, **kwargs)
+    uv = "uv" in key
+
+    for start in range(0, n_datasets, batch_size):
+        n = min(batch_size, n_datasets - start)
+
+        if isinstance(params, dict):
+            p = np.exp(
+                rng.uniform(ranges[:, 0], ranges[:, 1], (n, len(ranges)))
+            )
+        else:
+            p = params[start : start + n]
+
+        # B x C x N species molefractions or concentrations
+        design = function.design_batch(p, xdata)
+        n_species = design.shape[1]
+
+        # Signal of the free host, plus complexation induced changes
+        # weighted by the complex molefractions (NMR) or concentrations (UV),
+        # additive for the add and stat flavours
+        if uv:
+            # Host absorptivities and changes on complexation, scaled to
+            # absorbances up to about 1
+            host = rng.uniform(0.5, 1, (n, n_columns, 1)) * xdata[0]
+            delta = rng.uniform(-0.5, 0.5, (n, n_species - 1, n_columns))
+            host /= np.max(xdata[0])
+            delta /= np.max(xdata[0])
+        else:
+            # Host chemical shifts, and complexation induced shifts of up to
+            # 1 ppm
+            host = rng.uniform(0, 10, (n, n_columns, 1))
+            delta = rng.uniform(-1, 1, (n, n_species - 1, n_columns))
+
+        signal = host + np.einsum("bcm,bcn->bmn", delta, design[:, 1:])
+
+        scale = np.ptp(signal, axis=2, keepdims=True)
+        ydata = signal + rng.normal(0, 1, signal.shape) * noise * scale
+
+        yield p, np.broadcast_to(xdata, (n,) + xdata.shape), ydata
+
+
+def to_dataframe(xdata, ydata):
+    """Convert a dataset to the DataFrame format taken by `Fitter`.
+
+    Parameters
+    ----------
+    xdata : `ndarray`
+        2 x N array of Host and Guest concentrations.
+    ydata : `ndarray`
+        M x N array of observations.
+
+    Returns
+    -------
+    data : pandas.DataFrame
+        N x M observations, indexed by Host and Guest.
+    """
+    import pandas as pd
+
+    return pd.DataFrame(
+        np.transpose(ydata),
+        index=pd.MultiIndex.from_arrays(xdata, names=["Host", "Guest"]),
+        columns=[f"y{i + 1}" for i in range(len(ydata))],
+    )
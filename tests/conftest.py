@@ -0,0 +1,16 @@
+import pytest
+
+from bindfit import synthetic
+
+
+@pytest.fixture
+def titration():
+    """Small 1:2 NMR titration with k11 = 1000, k12 = 100."""
+    return synthetic.dataset(
+        "nmr1to2",
+        {"k11": 1e3, "k12": 1e2},
+        n_points=15,
+        n_columns=3,
+        noise=0.005,
+        seed=0,
+    )
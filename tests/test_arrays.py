@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from bindfit import fitter, functions, synthetic
+
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _run(code):
+    # Run code in a fresh interpreter, returns its output
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+
+
+def test_from_arrays_matches_dataframe(titration):
+    xdata, ydata = titration
+    data = synthetic.to_dataframe(xdata, ydata)
+
+    frame = fitter.Fitter(data, functions.construct("nmr1to2"))
+    frame.run_scipy(fitter.model_params("1to2"))
+    arrays = fitter.Fitter.from_arrays(
+        xdata, ydata, functions.construct("nmr1to2")
+    )
+    arrays.run_scipy(fitter.model_params("1to2"))
+
+    np.testing.assert_array_equal(arrays.xdata, frame.xdata)
+    np.testing.assert_array_equal(arrays.ydata, frame.ydata)
+    np.testing.assert_array_equal(arrays._params_raw, frame._params_raw)
+    np.testing.assert_array_equal(arrays.fit, frame.fit)
+
+    # Tables are labelled by position
+    np.testing.assert_array_equal(
+        arrays.fit_curve.to_numpy(), frame.fit_curve.to_numpy()
+    )
+    pd.testing.assert_index_equal(
+        arrays.fit_curve.index, pd.RangeIndex(xdata.shape[1])
+    )
+
+
+def test_import_is_lazy():
+    loaded = _run(
+        "import sys, bindfit; "
+        "print('pandas' in sys.modules, 'scipy' in sys.modules)"
+    )
+    assert loaded == ["False", "False"]
+
+
+def test_array_fit_without_pandas():
+    loaded = _run(
+        "import sys\n"
+        "from bindfit import fitter, functions, synthetic\n"
+        "xdata, ydata = synthetic.dataset(\n"
+        "    'nmr1to2', {'k11': 1e3, 'k12': 1e2}, n_points=15, seed=0\n"
+        ")\n"
+        "f = fitter.Fitter.from_arrays(\n"
+        "    xdata, ydata, functions.construct('nmr1to2')\n"
+        ")\n"
+        "f.run_scipy(fitter.model_params('1to2'))\n"
+        "print('pandas' in sys.modules)"
+    )
+    assert loaded == ["False"]
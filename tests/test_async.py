@@ -0,0 +1,82 @@
+import asyncio
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from bindfit import fitter, functions
+
+
+def _fitter(titration):
+    xdata, ydata = titration
+    return fitter.Fitter.from_arrays(
+        xdata, ydata, functions.construct("nmr1to2")
+    )
+
+
+def test_run_scipy_async(titration):
+    reference = _fitter(titration)
+    reference.run_scipy(fitter.model_params("1to2"))
+
+    f = _fitter(titration)
+    progress = []
+    asyncio.run(
+        f.run_scipy_async(
+            fitter.model_params("1to2"),
+            progress=lambda nit, xk: progress.append(nit),
+        )
+    )
+
+    np.testing.assert_array_equal(f._params_raw, reference._params_raw)
+    assert progress == list(range(1, len(progress) + 1))
+    assert len(progress) > 0
+
+
+def test_run_scipy_async_cancelled(titration):
+    f = _fitter(titration)
+
+    async def main(executor):
+        task = asyncio.ensure_future(
+            f.run_scipy_async(
+                fitter.model_params("1to2"),
+                executor=executor,
+                progress=lambda nit, xk: task.cancel(),
+            )
+        )
+        await task
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(main(executor))
+
+    assert f.result is None
+
+
+def test_monte_carlo_async(titration):
+    f = _fitter(titration)
+    f.run_scipy(fitter.model_params("1to2"))
+    params = copy.deepcopy(f.params)
+
+    serial = copy.deepcopy(f.calc_monte_carlo(6, [0.01, 0.01], 0.005, seed=0))
+    f.params = params
+
+    progress = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = asyncio.run(
+            f.calc_monte_carlo_async(
+                6,
+                [0.01, 0.01],
+                0.005,
+                seed=0,
+                executor=executor,
+                chunk_size=4,
+                progress=lambda done, n_iter: progress.append((done, n_iter)),
+            )
+        )
+
+    for name in serial:
+        np.testing.assert_allclose(result[name]["mc"], serial[name]["mc"])
+    # Chunks of 4 and 2 iterations, in completion order
+    assert len(progress) == 2
+    assert progress[-1] == (6, 6)
@@ -0,0 +1,68 @@
+import copy
+
+import numpy as np
+import pytest
+
+from bindfit import fitter, functions, synthetic
+
+
+def _datasets():
+    # Datasets of different sizes, with different binding constants
+    return [
+        synthetic.to_dataframe(
+            *synthetic.dataset(
+                "nmr1to2",
+                {"k11": k11, "k12": k12},
+                n_points=n_points,
+                n_columns=n_columns,
+                noise=0.005,
+                seed=seed,
+            )
+        )
+        for seed, (k11, k12, n_points, n_columns) in enumerate(
+            [(1e3, 1e2, 15, 3), (5e3, 5e2, 12, 2), (2e2, 50.0, 18, 4)]
+        )
+    ]
+
+
+def test_batch_matches_serial():
+    data = _datasets()
+    params = fitter.model_params("1to2")
+    batch = fitter.BatchFitter(data, functions.construct("nmr1to2"), params)
+    batch.run()
+
+    for d, f in zip(data, batch.fitters):
+        reference = fitter.Fitter(d, functions.construct("nmr1to2"))
+        reference.run_scipy(copy.deepcopy(params))
+
+        np.testing.assert_allclose(
+            f._params_raw, reference._params_raw, rtol=1e-4
+        )
+        np.testing.assert_allclose(f.fit, reference.fit, rtol=1e-5, atol=1e-9)
+        assert f.fit.shape == reference.ydata.shape
+
+
+def test_batch_results():
+    data = _datasets()
+    batch = fitter.BatchFitter(
+        data, functions.construct("nmr1to2"), fitter.model_params("1to2")
+    )
+    results = batch.run(save=False)
+
+    assert len(results) == len(data)
+    assert all(f.result is None for f in batch.fitters)
+
+    batch.run()
+    for r, f in zip(results, batch.fitters):
+        np.testing.assert_array_equal(r.params_raw, f._params_raw)
+
+
+def test_batch_not_separable():
+    batch = fitter.BatchFitter(
+        _datasets(),
+        functions.construct("uv1to2", normalise=False),
+        fitter.model_params("1to2"),
+        normalise=False,
+    )
+    with pytest.raises(ValueError):
+        batch.run()
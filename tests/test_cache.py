@@ -0,0 +1,114 @@
+import copy
+import pickle
+
+import numpy as np
+
+from bindfit import cache, fitter, functions
+
+
+GENERIC_PARAMS = {
+    "b11": {"init": 1e3, "bounds": {"min": 0.0, "max": None}},
+    "b12": {"init": 1e5, "bounds": {"min": 0.0, "max": None}},
+}
+
+
+def test_key_generic_models_distinct():
+    # Closures from functions.stoichiometry share a qualified name
+    f12 = functions.stoichiometry([(1, 1), (1, 2)])
+    f21 = functions.stoichiometry([(1, 1), (2, 1)])
+    assert f12.__qualname__ == f21.__qualname__
+
+    assert cache.key(f12) != cache.key(f21)
+    assert cache.key(f12) == cache.key(
+        functions.stoichiometry([(1, 1), (1, 2)])
+    )
+
+
+def test_cached_generic_models_distinct(titration):
+    xdata, ydata = titration
+    results_cache = cache.ResultCache()
+
+    fits = []
+    for species in ([(1, 1), (1, 2)], [(1, 1), (2, 1)]):
+        function = functions.construct("nmrgeneric", species=species)
+        f = fitter.Fitter.from_arrays(
+            xdata, ydata, function, cache=results_cache
+        )
+        f.run_scipy(
+            {
+                name: copy.deepcopy(param)
+                for name, param in zip(
+                    function.f.params, GENERIC_PARAMS.values()
+                )
+            }
+        )
+        fits.append(f)
+
+    assert results_cache.hits == 0
+    assert not np.allclose(fits[0]._params_raw, fits[1]._params_raw)
+
+
+def test_cache_hit(titration):
+    xdata, ydata = titration
+    results_cache = cache.ResultCache()
+    function = functions.construct("nmrgeneric", species=[(1, 1), (1, 2)])
+
+    f = fitter.Fitter.from_arrays(xdata, ydata, function, cache=results_cache)
+    f.run_scipy(copy.deepcopy(GENERIC_PARAMS))
+    f.run_scipy(copy.deepcopy(GENERIC_PARAMS))
+
+    assert results_cache.hits == 1
+
+
+def test_cache_hit_same_params(titration):
+    xdata, ydata = titration
+    results_cache = cache.ResultCache()
+    f = fitter.Fitter.from_arrays(
+        xdata, ydata, functions.construct("nmr1to2"), cache=results_cache
+    )
+
+    # Fits add their results to the params dict they are given
+    params = fitter.model_params("1to2")
+    f.run_scipy(params)
+    miss = copy.deepcopy(params)
+    f.run_scipy(params)
+    assert results_cache.hits == 1
+    assert params == miss
+
+    # Hits update the caller's params dict as misses do
+    params = fitter.model_params("1to2")
+    results = f.run_scipy(params, save=False)
+    assert results_cache.hits == 2
+    assert results.params is params
+    assert params == miss
+
+
+def test_pickle_cache():
+    results_cache = cache.ResultCache()
+    results_cache.put("a", {"x": 1})
+
+    copied = pickle.loads(pickle.dumps(results_cache))
+    assert len(copied) == 0
+    copied.put("b", {"x": 2})
+    assert copied.get("b") == {"x": 2}
+
+
+def test_process_pool_with_cache(titration):
+    xdata, ydata = titration
+    f = fitter.Fitter.from_arrays(
+        xdata,
+        ydata,
+        functions.construct("nmr1to2"),
+        cache=cache.ResultCache(),
+    )
+    f.run_scipy(fitter.model_params("1to2"))
+    params = copy.deepcopy(f.params)
+
+    serial = f.calc_monte_carlo(4, [0.01, 0.01], 0.005, seed=0)
+    serial = [p["mc"] for _, p in sorted(serial.items())]
+
+    f.params = copy.deepcopy(params)
+    pool = f.calc_monte_carlo(4, [0.01, 0.01], 0.005, seed=0, max_workers=2)
+    pool = [p["mc"] for _, p in sorted(pool.items())]
+
+    np.testing.assert_allclose(pool, serial)
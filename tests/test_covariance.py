@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from bindfit import fitter, functions, synthetic
+
+
+@pytest.mark.parametrize(
+    "key, model, params",
+    [
+        ("nmr1to2", "1to2", {"k11": 1e3, "k12": 1e2}),
+        ("uv1to3", "1to3", {"k11": 1e4, "k12": 1e3, "k13": 1e2}),
+        ("nmrdimer", "dimer", {"ke": 1e4}),
+    ],
+)
+def test_covariance_finite_differences(key, model, params):
+    xdata, ydata = synthetic.dataset(key, params, n_points=15, seed=0)
+    function = functions.construct(key)
+    f = fitter.Fitter.from_arrays(xdata, ydata, function)
+    f.run_scipy(fitter.model_params(model))
+    y, _ = f._prepared()
+    p = f._params_raw
+
+    # deLevie covariance from central differences of the fit at fixed
+    # coefficients, one parameter at a time
+    diffs = []
+    for i in range(len(p)):
+        step = np.zeros(len(p))
+        step[i] = 1e-6 * p[i]
+        up, *_ = function.evaluate(p + step, xdata, y, f.coeffs_raw)
+        down, *_ = function.evaluate(p - step, xdata, y, f.coeffs_raw)
+        diffs.append(((up - down) / (2 * step[i])).ravel())
+    diffs = np.array(diffs)
+
+    d_free = f.ydata.size - len(p) - f.coeffs_raw.size
+    expected = (
+        np.linalg.inv(diffs.dot(diffs.T))
+        * np.square(f.residuals).sum()
+        / (d_free - 1)
+    )
+
+    covariance = f.calc_covariance(p, f.coeffs_raw, f.residuals)
+    np.testing.assert_allclose(covariance, expected, rtol=1e-5)
+    np.testing.assert_array_equal(f.covariance, covariance)
@@ -0,0 +1,178 @@
+import weakref
+
+import numpy as np
+import pytest
+
+from bindfit import fitter, functions, speciation, synthetic
+
+
+PARAMS = {"k": 1e3, "k11": 1e4, "k12": 1e3, "k13": 1e2, "ke": 1e4, "rho": 0.5}
+
+CASES = [
+    (kind + model, model, flavour)
+    for kind in ("nmr", "uv")
+    for model, flavours in fitter.MODEL_FLAVOURS.items()
+    for flavour in flavours
+]
+
+
+def central_differences(function, params, xdata):
+    # P x C x N derivatives of the design matrix by central differences,
+    # with steps relative to each parameter
+    d = []
+    for i in range(len(params)):
+        step = np.zeros(len(params))
+        step[i] = 1e-5 * params[i]
+        up, _ = function.design(params + step, xdata)
+        down, _ = function.design(params - step, xdata)
+        d.append((up - down) / (2 * step[i]))
+    return np.array(d)
+
+
+@pytest.mark.parametrize("normalise", [True, False])
+@pytest.mark.parametrize("key, model, flavour", CASES)
+def test_design_jacobian(key, model, flavour, normalise):
+    function = functions.construct(key, normalise=normalise, flavour=flavour)
+    params = np.array(
+        [
+            p["init"]
+            for _, p in sorted(
+                fitter.model_params(model, flavour, init=PARAMS).items()
+            )
+        ]
+    )
+    xdata = synthetic.concentrations(key, n_points=15)
+
+    # Analytic derivatives are provided by every built in model
+    assert len(function.speciate(params, xdata, derivatives=True)) == 3
+
+    analytic = function.design_jacobian(params, xdata)
+    numeric = central_differences(function, params, xdata)
+
+    # Absolute tolerance relative to each parameter's derivatives
+    scale = np.abs(numeric).max(axis=(1, 2), keepdims=True)
+    np.testing.assert_allclose(analytic / scale, numeric / scale, atol=1e-6)
+
+
+@pytest.mark.parametrize("kind", ["nmr", "uv"])
+def test_design_jacobian_generic(kind):
+    function = functions.construct(
+        kind + "generic", species=[(1, 1), (1, 2), (2, 1)]
+    )
+    params = np.array([1e4, 1e7, 1e6])
+    xdata = synthetic.concentrations(kind + "generic", n_points=15)
+
+    analytic = function.design_jacobian(params, xdata)
+    numeric = central_differences(function, params, xdata)
+
+    scale = np.abs(numeric).max(axis=(1, 2), keepdims=True)
+    np.testing.assert_allclose(analytic / scale, numeric / scale, atol=1e-6)
+
+
+@pytest.mark.parametrize("key, model, flavour", CASES)
+def test_objective_gram(key, model, flavour):
+    function = functions.construct(key, flavour=flavour)
+    params = {
+        name: p["init"]
+        for name, p in fitter.model_params(model, flavour, init=PARAMS).items()
+    }
+    xdata, ydata = synthetic.dataset(
+        key, params, n_points=15, flavour=flavour, seed=0
+    )
+    f = fitter.Fitter.from_arrays(xdata, ydata, function)
+    y, gram_factor = f._prepared()
+
+    # Away from the optimum
+    params = 1.3 * np.array([p for _, p in sorted(params.items())])
+    np.testing.assert_allclose(
+        function.objective_gram(params, xdata, gram_factor),
+        function.objective(params, xdata, y, scalar=True),
+        rtol=1e-9,
+    )
+
+
+def test_objective_gram_rank_deficient(titration):
+    # Dimer titrations at fixed host concentration have a rank 1 design
+    # matrix, with a second singular value at rounding error
+    xdata, ydata = titration
+    function = functions.construct("uvdimer")
+    f = fitter.Fitter.from_arrays(xdata, ydata, function)
+    y, gram_factor = f._prepared()
+
+    ssr = function.objective(np.array([1e3]), xdata, y, scalar=True)
+    for ke in (1e3, 1050.0, 1e4):
+        params = np.array([ke])
+        assert np.linalg.matrix_rank(function.design(params, xdata)[0]) == 1
+        np.testing.assert_allclose(
+            function.objective_gram(params, xdata, gram_factor),
+            function.objective(params, xdata, y, scalar=True),
+            rtol=1e-9,
+        )
+        np.testing.assert_allclose(
+            function.objective(params, xdata, y, scalar=True), ssr, rtol=1e-9
+        )
+
+
+def test_memo_doesnt_keep_inputs_alive():
+    function = functions.construct("nmr1to2")
+    params = np.array([1e3, 1e2])
+
+    xdata = synthetic.concentrations("nmr1to2")
+    ref = weakref.ref(xdata)
+    function.speciate(params, xdata)
+    assert len(function._memo) == 1
+
+    del xdata
+    assert ref() is None
+
+    # Entries of freed inputs are never returned, and dropped on the next
+    # memoised call
+    for _ in range(5):
+        xdata = synthetic.concentrations("nmr1to2", n_points=20)
+        fresh = functions.construct("nmr1to2").speciate(params, xdata)
+        np.testing.assert_array_equal(
+            function.speciate(params, xdata)[0], fresh[0]
+        )
+        del xdata
+    assert len(function._memo) == 1
+
+
+def test_memo_cleared_on_new_data(titration):
+    xdata, ydata = titration
+    function = functions.construct("nmr1to2")
+    f = fitter.Fitter.from_arrays(xdata, ydata, function)
+    f.run_scipy(fitter.model_params("1to2"))
+    assert len(function._memo) > 0
+
+    f._set_arrays(xdata, ydata)
+    assert len(function._memo) == 0
+
+
+def test_generic_parameter_names():
+    # Parameters are matched to species by name, whatever the species order
+    xdata = synthetic.concentrations("nmrgeneric", n_points=15)
+    a = functions.construct("nmrgeneric", species=[(1, 1), (2, 1), (1, 2)])
+    b = functions.construct("nmrgeneric", species=[(1, 2), (1, 1), (2, 1)])
+    assert a.f.params == b.f.params == ["b11", "b12", "b21"]
+
+    params = np.array([1e4, 1e7, 1e6])
+    mf_a, _, d_a = a.speciate(params, xdata, derivatives=True)
+    mf_b, _, d_b = b.speciate(params, xdata, derivatives=True)
+    np.testing.assert_allclose(mf_a[[0, 3, 1, 2]], mf_b, rtol=1e-10)
+    np.testing.assert_allclose(d_a[:, [0, 3, 1, 2]], d_b, rtol=1e-8)
+
+    # Fits check the names
+    f = fitter.Fitter.from_arrays(xdata, np.ones((2, 15)), a)
+    params = {
+        name: {"init": 1e3, "bounds": {"min": 0.0, "max": None}}
+        for name in ["b11", "b12", "b22"]
+    }
+    with pytest.raises(ValueError, match="b21"):
+        f.run_scipy(params)
+
+
+def test_speciation_not_converged():
+    with pytest.warns(RuntimeWarning, match="converge"):
+        speciation.speciate(
+            [(1, 1, 1e4), (1, 2, 1e7)], np.ones(3), np.ones(3), max_iter=1
+        )
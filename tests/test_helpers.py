@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from bindfit import fitter, functions, helpers, synthetic
+
+
+INPUT = os.path.join(os.path.dirname(__file__), "..", "input.csv")
+
+
+def test_svd_rank_small_matrix():
+    # Too few singular values to estimate the noise level from
+    s = np.array([10.0, 0.1, 0.01, 0.001])
+    assert helpers.svd_rank(s, (4, 20)) == 4
+
+
+def test_svd_rank_min_rank():
+    rng = np.random.default_rng(0)
+    data = np.outer(rng.uniform(size=50), rng.uniform(size=20))
+    data += 1e-6 * rng.standard_normal(data.shape)
+    s = np.linalg.svd(data, compute_uv=False)
+
+    assert helpers.svd_rank(s, data.shape) == 1
+    assert helpers.svd_rank(s, data.shape, min_rank=3) == 3
+    assert helpers.compress(data, min_rank=3).shape == (3, 20)
+    assert helpers.compress(data, 1, min_rank=3).shape == (3, 20)
+
+
+def test_svd_rank_auto_input():
+    data = pd.read_csv(INPUT).set_index(["Host", "Guest"])
+
+    fits = []
+    for rank in (None, "auto"):
+        f = fitter.Fitter(data, functions.construct("nmr1to2"), svd_rank=rank)
+        f.run_scipy(fitter.model_params("1to2"))
+        fits.append(f)
+
+    np.testing.assert_allclose(fits[1]._params_raw, fits[0]._params_raw)
+
+
+def test_svd_rank_auto_many_columns():
+    # Low noise data of rank 2 in many columns, compressed to no fewer than
+    # the model's 2 linear components
+    xdata, ydata = synthetic.dataset(
+        "nmr1to2",
+        {"k11": 1e3, "k12": 1e2},
+        n_points=30,
+        n_columns=200,
+        noise=1e-4,
+        seed=0,
+    )
+
+    fits = []
+    for rank in (None, "auto"):
+        f = fitter.Fitter.from_arrays(
+            xdata, ydata, functions.construct("nmr1to2"), svd_rank=rank
+        )
+        f.run_scipy(fitter.model_params("1to2"))
+        fits.append(f)
+
+    np.testing.assert_allclose(
+        fits[1]._params_raw, fits[0]._params_raw, rtol=1e-3
+    )
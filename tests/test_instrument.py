@@ -0,0 +1,52 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bindfit import fitter, functions, instrument
+
+
+def test_profiled_fit_doesnt_modify_function(titration):
+    xdata, ydata = titration
+    function = functions.construct("nmr1to2")
+    attributes = dict(function.__dict__)
+    profiler = instrument.Profiler()
+
+    f = fitter.Fitter.from_arrays(xdata, ydata, function, profiler=profiler)
+
+    def callback(xk, *args):
+        # The shared function is untouched during the fit
+        assert function.__dict__ == attributes
+        assert f.function is not function
+
+    f.run_scipy(fitter.model_params("1to2"), callback=callback)
+
+    assert function.__dict__ == attributes
+    assert f.function is function
+    assert profiler.stats["objective_gram"][0] > 0
+    assert profiler.stats["nmr_1to2"][0] > 0
+
+
+def test_profiled_fits_share_function_between_threads(titration):
+    xdata, ydata = titration
+    function = functions.construct("nmr1to2")
+    profilers = [instrument.Profiler() if i % 2 else None for i in range(8)]
+
+    def fit(profiler):
+        f = fitter.Fitter.from_arrays(
+            xdata, ydata, function, profiler=profiler
+        )
+        f.run_scipy(copy.deepcopy(fitter.model_params("1to2")))
+        return f._params_raw
+
+    reference = fit(None)
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(fit, profilers))
+
+    for params in results:
+        np.testing.assert_allclose(params, reference)
+
+    # Each profiler only timed its own fit
+    calls = [p.stats["minimize"][0] for p in profilers if p is not None]
+    assert calls == [1] * 4
+    assert not hasattr(function, "_profiler")
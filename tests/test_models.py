@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from bindfit import fitter, functions
+
+
+INPUT = os.path.join(os.path.dirname(__file__), "..", "input.csv")
+
+MODELS = [("1to1", "none"), ("1to2", "add"), ("2to1", "none")]
+
+
+def _data():
+    return pd.read_csv(INPUT).set_index(["Host", "Guest"])
+
+
+def test_fit_all_models():
+    data = _data()
+    table = fitter.fit_all_models(data, models=MODELS)
+
+    assert len(table) == len(MODELS)
+    assert table["error"].isna().all()
+    assert table["aic"].is_monotonic_increasing
+
+    for _, row in table.iterrows():
+        model = row["model"][len("nmr") :]
+        f = fitter.Fitter(
+            data, functions.construct(row["model"], flavour=row["flavour"])
+        )
+        f.run_scipy(fitter.model_params(model, row["flavour"]))
+
+        assert row["params"] == {
+            name: param["value"] for name, param in f.params.items()
+        }
+        np.testing.assert_allclose(row["fitter"].fit, f.fit)
+
+
+def test_fit_all_models_executor():
+    data = _data()
+    serial = fitter.fit_all_models(data, models=MODELS)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        threaded = fitter.fit_all_models(
+            data, models=MODELS, executor=executor
+        )
+
+    pd.testing.assert_frame_equal(
+        threaded[["model", "flavour", "ssr", "aic", "bic", "n_params"]],
+        serial[["model", "flavour", "ssr", "aic", "bic", "n_params"]],
+    )
+
+
+def test_fit_all_models_failed(monkeypatch):
+    run_scipy = fitter.Fitter.run_scipy
+
+    def failing(self, params_init, *args, **kwargs):
+        if "k" in params_init:
+            raise np.linalg.LinAlgError("Singular matrix")
+        return run_scipy(self, params_init, *args, **kwargs)
+
+    monkeypatch.setattr(fitter.Fitter, "run_scipy", failing)
+    table = fitter.fit_all_models(_data(), models=MODELS)
+
+    failed = table[table["model"] == "nmr1to1"].iloc[0]
+    assert failed["error"] == "LinAlgError: Singular matrix"
+    assert np.isnan(failed["aic"])
+    assert failed["params"] is None
+    # Failed fits are ranked last
+    assert failed.name == len(table) - 1
+    assert table["error"].iloc[:-1].isna().all()
@@ -0,0 +1,125 @@
+import copy
+
+import numpy as np
+import pytest
+
+from bindfit import fitter, functions, synthetic
+
+
+X_ERROR = [0.01, 0.01]
+Y_ERROR = 0.005
+
+
+def _fitter(xdata, ydata, key="nmr1to2", model="1to2", **kwargs):
+    f = fitter.Fitter.from_arrays(
+        xdata, ydata, functions.construct(key, **kwargs)
+    )
+    f.run_scipy(fitter.model_params(model))
+    return f
+
+
+@pytest.fixture
+def one_to_one():
+    return synthetic.dataset(
+        "nmr1to1", {"k": 1e3}, n_points=15, n_columns=3, noise=0.005, seed=0
+    )
+
+
+def test_monte_carlo_batch_replicates(titration):
+    f = _fitter(*titration)
+    params_arr = f._monte_carlo_batch(
+        4, X_ERROR, Y_ERROR, np.random.default_rng(0)
+    )
+
+    # Regenerate the perturbed data of each replicate and refit it alone
+    rng = np.random.default_rng(0)
+    xdata_shift = f.xdata * (
+        rng.standard_normal((4,) + f.xdata.shape)
+        * np.array(X_ERROR)[:, np.newaxis]
+        + 1
+    )
+    ydata_shift = f.ydata * (
+        rng.standard_normal((4,) + f.ydata.shape) * Y_ERROR + 1
+    )
+
+    params_init = copy.deepcopy(f.params)
+    for (name, param), value in zip(
+        sorted(params_init.items()), f._params_raw
+    ):
+        param["init"] = value
+
+    for p, x, y in zip(params_arr, xdata_shift, ydata_shift):
+        result = f.run_scipy(copy.deepcopy(params_init), False, x, y)
+        np.testing.assert_allclose(p, result.params_raw, rtol=1e-4)
+
+
+def test_monte_carlo_batch_matches_serial(one_to_one):
+    f = _fitter(*one_to_one, "nmr1to1", "1to1")
+    params = copy.deepcopy(f.params)
+
+    serial = copy.deepcopy(f.calc_monte_carlo(100, X_ERROR, Y_ERROR, seed=0))
+    f.params = params
+    batch = f.calc_monte_carlo_batch(100, X_ERROR, Y_ERROR, seed=0)
+
+    # Different perturbations, the same distribution
+    np.testing.assert_allclose(batch["k"]["mc"], serial["k"]["mc"], rtol=0.3)
+
+
+def test_monte_carlo_batch_seed(one_to_one):
+    f = _fitter(*one_to_one, "nmr1to1", "1to1")
+    first = copy.deepcopy(f.calc_monte_carlo_batch(20, X_ERROR, 0.01, seed=1))
+    second = f.calc_monte_carlo_batch(20, X_ERROR, 0.01, seed=1)
+    assert first["k"]["mc"] == second["k"]["mc"]
+
+
+def test_monte_carlo_batch_not_separable(one_to_one):
+    f = _fitter(*one_to_one, "uv1to1", "1to1", normalise=False)
+    with pytest.raises(ValueError):
+        f.calc_monte_carlo_batch(10, X_ERROR, Y_ERROR, seed=0)
+
+
+def test_monte_carlo_adaptive_first_chunk(one_to_one):
+    f = _fitter(*one_to_one, "nmr1to1", "1to1")
+    params = copy.deepcopy(f.params)
+
+    batch = copy.deepcopy(f.calc_monte_carlo_batch(50, X_ERROR, Y_ERROR, 0))
+    f.params = params
+    adaptive = f.calc_monte_carlo_adaptive(
+        X_ERROR, Y_ERROR, chunk_size=50, max_iter=50, seed=0
+    )
+
+    assert adaptive["k"]["mc"] == batch["k"]["mc"]
+    assert adaptive["k"]["mc_iter"] == 50
+    assert np.isnan(adaptive["k"]["mc_precision"])
+
+
+def test_monte_carlo_adaptive_converged(one_to_one):
+    f = _fitter(*one_to_one, "nmr1to1", "1to1")
+    params = copy.deepcopy(f.params)
+
+    batch = copy.deepcopy(f.calc_monte_carlo_batch(5000, X_ERROR, Y_ERROR, 0))
+    f.params = params
+    adaptive = f.calc_monte_carlo_adaptive(
+        X_ERROR, Y_ERROR, tol=0.5, chunk_size=200, max_iter=5000, seed=1
+    )
+
+    assert adaptive["k"]["mc_iter"] < 5000
+    assert adaptive["k"]["mc_iter"] % 200 == 0
+    assert adaptive["k"]["mc_precision"] <= 0.5
+    np.testing.assert_allclose(adaptive["k"]["mc"], batch["k"]["mc"], rtol=0.1)
+
+
+def test_monte_carlo_adaptive_serial(one_to_one):
+    # Non-separable functions refit chunks serially, drawing the same
+    # perturbations as calc_monte_carlo
+    f = _fitter(*one_to_one, "uv1to1", "1to1", normalise=False)
+    params = copy.deepcopy(f.params)
+
+    serial = copy.deepcopy(f.calc_monte_carlo(10, X_ERROR, Y_ERROR, seed=0))
+    f.params = params
+    adaptive = f.calc_monte_carlo_adaptive(
+        X_ERROR, Y_ERROR, chunk_size=5, max_iter=10, seed=0
+    )
+
+    np.testing.assert_allclose(adaptive["k"]["mc"], serial["k"]["mc"])
+    assert adaptive["k"]["mc_iter"] == 10
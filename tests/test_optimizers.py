@@ -0,0 +1,82 @@
+import copy
+
+import numpy as np
+import pytest
+
+from bindfit import fitter, functions, synthetic
+
+
+def _fit(titration, run, key="nmr1to2", model="1to2", **kwargs):
+    xdata, ydata = titration
+    f = fitter.Fitter.from_arrays(xdata, ydata, functions.construct(key))
+    getattr(f, run)(fitter.model_params(model), **kwargs)
+    return f
+
+
+@pytest.mark.parametrize("method", ["trf", "dogbox"])
+def test_least_squares_matches_scipy(titration, method):
+    reference = _fit(titration, "run_scipy")
+    f = _fit(titration, "run_least_squares", method=method)
+
+    np.testing.assert_allclose(f._params_raw, reference._params_raw, rtol=1e-5)
+    np.testing.assert_allclose(f.fit, reference.fit, rtol=1e-6, atol=1e-9)
+    assert f.result.optimizer["success"]
+
+
+def test_least_squares_unbounded(titration):
+    xdata, ydata = titration
+    f = fitter.Fitter.from_arrays(xdata, ydata, functions.construct("nmr1to2"))
+    params = fitter.model_params("1to2")
+    for param in params.values():
+        param["bounds"] = {"min": None, "max": None}
+    f.run_least_squares(copy.deepcopy(params), method="lm")
+
+    reference = _fit(titration, "run_scipy")
+    np.testing.assert_allclose(f._params_raw, reference._params_raw, rtol=1e-5)
+
+
+@pytest.mark.parametrize(
+    "key, model",
+    [("nmr1to2", "1to2"), ("uv1to2", "1to2"), ("nmr1to1", "1to1")],
+)
+def test_varpro_matches_scipy(titration, key, model):
+    reference = _fit(titration, "run_scipy", key, model)
+    f = _fit(titration, "run_varpro", key, model)
+
+    np.testing.assert_allclose(f._params_raw, reference._params_raw, rtol=1e-5)
+    np.testing.assert_allclose(f.fit, reference.fit, rtol=1e-6, atol=1e-9)
+
+
+@pytest.mark.parametrize(
+    "key, params, species",
+    [
+        ("nmr1to2", {"k11": 2e3, "k12": 3e2}, None),
+        ("uvdimer", {"ke": 2e3}, None),
+        ("nmrgeneric", {"b11": 2e3, "b21": 3e5}, [(1, 1), (2, 1)]),
+    ],
+)
+def test_varpro_jacobian(key, params, species):
+    kwargs = {} if species is None else {"species": species}
+    xdata, ydata = synthetic.dataset(
+        key, params, n_points=15, seed=0, **kwargs
+    )
+    function = functions.construct(key, **kwargs)
+    y, _ = fitter.Fitter.from_arrays(xdata, ydata, function)._prepared()
+
+    # Away from the optimum
+    params = 1.5 * np.array([p for _, p in sorted(params.items())])
+    analytic = function.jacobian(params, xdata, y)
+
+    # Central differences of the residual vector, with the linear
+    # coefficients refitted at each step
+    numeric = []
+    for i in range(len(params)):
+        step = np.zeros(len(params))
+        step[i] = 1e-5 * params[i]
+        up = function.residuals(params + step, xdata, y)
+        down = function.residuals(params - step, xdata, y)
+        numeric.append((up - down) / (2 * step[i]))
+    numeric = np.transpose(numeric)
+
+    scale = np.abs(numeric).max(axis=0)
+    np.testing.assert_allclose(analytic / scale, numeric / scale, atol=1e-6)
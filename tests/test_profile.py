@@ -0,0 +1,58 @@
+import copy
+
+import numpy as np
+
+from bindfit import cache, fitter, functions, synthetic
+
+
+TRUE = {"k11": 1e3, "k12": 1e2}
+
+
+def make_fitter(n_columns=3, **kwargs):
+    xdata, ydata = synthetic.dataset(
+        "nmr1to2", TRUE, n_points=20, n_columns=n_columns, seed=1
+    )
+    f = fitter.Fitter.from_arrays(
+        xdata, ydata, functions.construct("nmr1to2"), **kwargs
+    )
+    f.run_scipy(fitter.model_params("1to2"))
+    return f
+
+
+def limits(params, params_raw):
+    # P x 2 array of profile interval limits
+    errors = np.array([p["profile"] for _, p in sorted(params.items())])
+    return params_raw[:, np.newaxis] * (1 + errors / 100)
+
+
+def test_profile_contains_true():
+    f = make_fitter()
+    params = f.calc_profile()
+
+    interval = limits(params, f._params_raw)
+    true = np.array([v for _, v in sorted(TRUE.items())])
+    assert np.all(interval[:, 0] < true)
+    assert np.all(interval[:, 1] > true)
+
+
+def test_profile_pool_with_cache():
+    f = make_fitter(cache=cache.ResultCache())
+    serial = copy.deepcopy(f.calc_profile())
+    pool = f.calc_profile(max_workers=2)
+
+    for name in serial:
+        np.testing.assert_allclose(
+            pool[name]["profile"], serial[name]["profile"]
+        )
+
+
+def test_profile_svd_rank():
+    # Profiles are calculated from the full resolution data
+    full = make_fitter(n_columns=40)
+    compressed = make_fitter(n_columns=40, svd_rank=1)
+
+    interval = limits(full.calc_profile(), full._params_raw)
+    interval_compressed = limits(
+        compressed.calc_profile(), compressed._params_raw
+    )
+    np.testing.assert_allclose(interval_compressed, interval, rtol=1e-3)
@@ -0,0 +1,79 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from bindfit import fitter, functions
+
+
+def fit(titration, **kwargs):
+    xdata, ydata = titration
+    f = fitter.Fitter.from_arrays(
+        xdata, ydata, functions.construct("nmr1to2"), **kwargs
+    )
+    f.run_scipy(fitter.model_params("1to2"))
+    return f
+
+
+def test_result_arrays(titration):
+    f = fit(titration)
+    r = f.result
+
+    assert r.fit.shape == r.residuals.shape == f.ydata.shape
+    np.testing.assert_allclose(r.ssr, np.square(r.residuals).sum())
+    np.testing.assert_allclose(r.covariance, r.covariance.T)
+    assert [p["value"] for _, p in sorted(r.params.items())] == list(
+        r.params_raw
+    )
+
+    # Fitter attributes are views of the result's array block
+    assert np.shares_memory(f.fit, r._block)
+    assert f.fit_curve is f.fit_curve
+
+
+def test_result_dict_keys(titration):
+    r = fit(titration).result
+
+    # Results read as the dict fit runs returned before
+    np.testing.assert_array_equal(r["_params_raw"], r.params_raw)
+    np.testing.assert_array_equal(r["fit"], r.fit)
+    assert r["params"] is r.params
+    assert set(dict(r)) == {
+        "time",
+        "_params_raw",
+        "fit",
+        "residuals",
+        "coeffs",
+        "coeffs_raw",
+        "molefrac",
+        "molefrac_raw",
+        "params",
+    }
+    with pytest.raises(KeyError):
+        r["ssr_raw"]
+
+
+def test_result_pickle(titration):
+    r = fit(titration).result
+    copied = pickle.loads(pickle.dumps(r))
+
+    np.testing.assert_array_equal(copied.fit, r.fit)
+    assert copied.params == r.params
+    assert copied._layout is r._layout
+
+
+def test_lean(titration):
+    full = fit(titration)
+    lean = fit(titration, lean=True)
+
+    np.testing.assert_array_equal(lean._params_raw, full._params_raw)
+    np.testing.assert_array_equal(lean.coeffs, full.coeffs)
+    assert lean.fit is None and lean.residuals is None
+    assert lean.result.ssr == full.result.ssr
+    assert lean.result._block.size < full.result._block.size
+    assert lean.fit_summary["ssr"].iloc[0] == full.result.ssr
+
+    with pytest.raises(ValueError, match="[Ll]ean"):
+        lean.fit_curve
+    with pytest.raises(ValueError, match="lean"):
+        lean.fit_quality
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from bindfit import functions, solvers, synthetic
+
+
+def reference_roots(poly):
+    # Smallest real non-negative root of each polynomial from np.roots
+    x = []
+    for p in poly:
+        roots = np.roots(p)
+        roots = roots[np.abs(roots.imag) <= 1e-9 * np.abs(roots)].real
+        roots = roots[roots >= 0]
+        x.append(roots.min() if roots.size else 0.0)
+    return np.array(x)
+
+
+@pytest.mark.parametrize("degree", [2, 3, 4])
+def test_smallest_positive_root(degree):
+    rng = np.random.default_rng(degree)
+    # Polynomials with known real roots spread over orders of magnitude
+    roots = rng.choice([-1, 1], (200, degree)) * 10 ** rng.uniform(
+        -6, 3, (200, degree)
+    )
+    poly = np.array([np.poly(r) for r in roots])
+
+    np.testing.assert_allclose(
+        solvers.smallest_positive_root(poly), reference_roots(poly), rtol=1e-7
+    )
+
+
+def coek_poly(ke, rho, h0):
+    # Cubic in the free monomer fraction of the cooperative EK model, as in
+    # functions.nmr_coek
+    a = (ke * h0) ** 2 - rho * (ke * h0) ** 2
+    b = 2 * rho * ke * h0 - 2 * ke * h0 - (ke * h0) ** 2
+    c = 2 * ke * h0 + 1
+    d = -np.ones_like(h0)
+    return np.column_stack((a, b, c, d))
+
+
+def test_warm_root_coek_larger_root():
+    # Newton steps from this guess converge to the second smallest root
+    poly = coek_poly(1.296e5, 0.31, np.array([1.485e-3]))
+    expected = reference_roots(poly)
+
+    state = {"x": np.array([5.41e-3])}
+    np.testing.assert_allclose(
+        solvers.positive_root(poly, state), expected, rtol=1e-8
+    )
+    np.testing.assert_allclose(state["x"], expected, rtol=1e-8)
+
+
+def test_warm_root_two_smaller_roots():
+    # Newton steps converge to the root at 3, with two smaller roots (and no
+    # sign change between zero and just below 3)
+    poly = np.array([np.poly([1.0, 2.0, 3.0])])
+
+    state = {"x": np.array([3.0001])}
+    np.testing.assert_allclose(solvers.positive_root(poly, state), [1.0])
+
+
+def test_warm_root_accepted(monkeypatch):
+    # Warm started roots are accepted without solving from scratch,
+    # including zero roots (e.g. of titration points without guest)
+    poly = np.array([np.poly([r, -1.0, 2.0]) for r in [0.0, 1e-3, 0.5]])
+    expected = np.array([0.0, 1e-3, 0.5])
+
+    def fail(poly):
+        raise AssertionError("solved from scratch")
+
+    state = {"x": expected * (1 + 1e-6)}
+    monkeypatch.setattr(solvers, "smallest_positive_root", fail)
+    np.testing.assert_allclose(
+        solvers.positive_root(poly, state), expected, rtol=1e-10
+    )
+
+
+@pytest.mark.parametrize(
+    "f, names",
+    [
+        (functions.nmr_1to2, ["k11", "k12"]),
+        (functions.uv_1to3, ["k11", "k12", "k13"]),
+        (functions.nmr_2to1, ["k11", "k12"]),
+        (functions.uv_3to1, ["k11", "k12", "k13"]),
+        (functions.nmr_coek, ["ke", "rho"]),
+        (functions.uv_coek, ["ke", "rho"]),
+    ],
+)
+def test_warm_start_trajectory(f, names):
+    # Warm started speciation along random, large step parameter
+    # trajectories matches speciation from scratch
+    rng = np.random.default_rng(0)
+    key = "coek" if "coek" in f.__name__ else "1to1"
+    xdata = synthetic.concentrations(key, n_points=30)
+
+    state = {}
+    for _ in range(100):
+        params = 10 ** rng.uniform(0, 5, len(names))
+        if "rho" in names:
+            params[1] = rng.uniform(0, 1)
+
+        warm, _ = f(params, xdata, state=state)
+        cold, _ = f(params, xdata)
+        np.testing.assert_allclose(warm, cold, rtol=1e-6, atol=1e-12)
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from bindfit import fitter, functions
+
+
+INPUT = os.path.join(os.path.dirname(__file__), "..", "input.csv")
+
+
+def test_stream_dataframe():
+    data = pd.read_csv(INPUT).set_index(["Host", "Guest"])
+    function = functions.construct("nmr1to2")
+
+    f = fitter.StreamingFitter(
+        data.iloc[:8], function, params=fitter.model_params("1to2")
+    )
+    f.refit()
+    for i in range(8, len(data)):
+        f.append(data.iloc[i : i + 1])
+
+    full = fitter.Fitter(data, functions.construct("nmr1to2"))
+    full.run_varpro(fitter.model_params("1to2"))
+
+    pd.testing.assert_frame_equal(f.data, data)
+    np.testing.assert_array_equal(f.ydata, full.ydata)
+    np.testing.assert_allclose(f._params_raw, full._params_raw, rtol=1e-6)
+    np.testing.assert_allclose(f.fit, full.fit, rtol=1e-6, atol=1e-9)
+
+    # Warm starting is turned on for the fitter's copy of the function only
+    assert f.function.warm_start
+    assert not function.warm_start
+    assert function._solver_state == {}
+
+
+def test_stream_arrays(titration):
+    xdata, ydata = titration
+
+    f = fitter.StreamingFitter.from_arrays(
+        xdata[:, :6],
+        ydata[:, :6],
+        functions.construct("nmr1to2"),
+        params=fitter.model_params("1to2"),
+        dilution_correction=True,
+    )
+    f.refit()
+    for i in range(6, xdata.shape[1], 3):
+        f.append((xdata[:, i : i + 3], ydata[:, i : i + 3]))
+
+    full = fitter.Fitter.from_arrays(
+        xdata,
+        ydata,
+        functions.construct("nmr1to2"),
+        dilution_correction=True,
+    )
+    full.run_varpro(fitter.model_params("1to2"))
+
+    assert f.data is None
+    np.testing.assert_array_equal(f.xdata, full.xdata)
+    np.testing.assert_allclose(f.ydata, full.ydata, rtol=1e-15)
+    np.testing.assert_allclose(f._params_raw, full._params_raw, rtol=1e-6)
@@ -0,0 +1,97 @@
+import copy
+
+import numpy as np
+import pytest
+
+from bindfit import fitter, functions, synthetic
+
+
+# True parameters, with every complex formed to a measurable extent over
+# the titration
+TRUE = {"k": 1e3, "k11": 1e4, "k12": 1e3, "k13": 1e2, "ke": 1e4, "rho": 0.5}
+
+CASES = [
+    (kind + model, model, flavour)
+    for kind in ("nmr", "uv")
+    for model, flavours in fitter.MODEL_FLAVOURS.items()
+    for flavour in flavours
+]
+
+
+@pytest.mark.parametrize("key, model, flavour", CASES)
+def test_recover_params(key, model, flavour):
+    params = fitter.model_params(model, flavour, init=TRUE)
+    true = np.array([p["init"] for _, p in sorted(params.items())])
+
+    xdata, ydata = synthetic.dataset(
+        key,
+        {name: p["init"] for name, p in params.items()},
+        n_points=30,
+        n_columns=5,
+        noise=1e-4,
+        flavour=flavour,
+        seed=0,
+    )
+
+    # UV aggregation data aren't offset from their initial values, as the
+    # host is diluted
+    normalise = not (key.startswith("uv") and model in ("dimer", "coek"))
+    f = fitter.Fitter.from_arrays(
+        xdata,
+        ydata,
+        functions.construct(key, normalise=normalise, flavour=flavour),
+        normalise=normalise,
+    )
+
+    params_init = copy.deepcopy(params)
+    for p in params_init.values():
+        p["init"] *= 1.5
+    f.run_scipy(params_init)
+
+    np.testing.assert_allclose(f._params_raw, true, rtol=0.05)
+
+
+@pytest.mark.parametrize("kind", ["nmr", "uv"])
+def test_recover_params_generic(kind):
+    species = [(1, 1), (1, 2)]
+    true = {"b11": 1e4, "b12": 1e7}
+    xdata, ydata = synthetic.dataset(
+        kind + "generic", true, noise=1e-4, species=species, seed=0
+    )
+
+    f = fitter.Fitter.from_arrays(
+        xdata,
+        ydata,
+        functions.construct(kind + "generic", species=species),
+    )
+    f.run_scipy(
+        {
+            name: {"init": 1.5 * value, "bounds": {"min": 0.0, "max": None}}
+            for name, value in true.items()
+        }
+    )
+
+    np.testing.assert_allclose(f._params_raw, [1e4, 1e7], rtol=0.05)
+
+
+def test_batches():
+    ranges = {"k11": (1e2, 1e4), "k12": 10.0}
+
+    n = 0
+    for params, xdata, ydata in synthetic.batches(
+        "nmr1to2", ranges, n_datasets=250, batch_size=100, n_columns=3, seed=0
+    ):
+        assert params.shape == (len(ydata), 2)
+        assert xdata.shape == (len(ydata), 2, 20)
+        assert ydata.shape == (len(ydata), 3, 20)
+        assert np.all((params[:, 0] >= 1e2) & (params[:, 0] <= 1e4))
+        np.testing.assert_allclose(params[:, 1], 10.0)
+        n += len(params)
+
+    assert n == 250
+
+
+def test_dataset_reproducible():
+    a = synthetic.dataset("uv1to1", {"k": 1e3}, seed=1)
+    b = synthetic.dataset("uv1to1", {"k": 1e3}, seed=1)
+    np.testing.assert_array_equal(a[1], b[1])